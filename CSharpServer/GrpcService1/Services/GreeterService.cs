@@ -191,7 +191,7 @@ public class DatabaseService : MyDatabaseService.MyDatabaseServiceBase
         return Task.FromResult(new Empty());
     }
 
-    public override Task<Empty> AddNewRow(AddNewRowRequest request, ServerCallContext context)
+    public override Task<AddRowResponse> AddNewRow(AddNewRowRequest request, ServerCallContext context)
     {
         string tableName = request.TableName;
         if (database.tables.ContainsKey(tableName))
@@ -202,7 +202,7 @@ public class DatabaseService : MyDatabaseService.MyDatabaseServiceBase
         {
             throw new RpcException(new Status(StatusCode.NotFound, $"Table '{tableName}' does not exist"));
         }
-        return Task.FromResult(new Empty());
+        return Task.FromResult(new AddRowResponse());
     }
 
     public override Task<Empty> DeleteRow(DeleteRowRequest request, ServerCallContext context)
@@ -0,0 +1,132 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from google.protobuf import struct_pb2
+from my_database_pb2 import AddTableRequest, BatchMutateRequest, GetColumnsInfoRequest, InsertRowMutation, Mutation, QueryRequest, TableInfo
+from db_client import BALANCERS, DatabaseClient
+
+TABLE = 'bench_pool'
+
+REQUESTS = {
+    'GetColumnsInfo': lambda client, i: client.GetColumnsInfo.future(GetColumnsInfoRequest(tableName=TABLE)),
+    'Query': lambda client, i: client.Query.future(QueryRequest(tableName=TABLE, offset=i % 10 * 100, limit=100)),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def start_server(port, max_workers, processes):
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonServer', 'server.py')
+    return subprocess.Popen([sys.executable, server_path, '--port', str(port), '--max-workers', str(max_workers), '--processes', str(processes)], stdout=subprocess.DEVNULL)
+
+
+def prepare(client, rows):
+    client.AddTable(AddTableRequest(tableName=TABLE, columnInfo=[TableInfo(ColumnName='id', ColumnType='System.Int32'), TableInfo(ColumnName='name', ColumnType='System.String')]))
+    mutations = [Mutation(insert=InsertRowMutation(values=[struct_pb2.Value(number_value=i), struct_pb2.Value(string_value=f'row-{i}')])) for i in range(rows)]
+    client.BatchMutate(BatchMutateRequest(tableName=TABLE, mutations=mutations))
+
+
+# Keeps `concurrency` calls in flight for `duration` seconds: every call that
+# finishes starts the next one, until time is up.
+def drive(client, make_call, concurrency, duration):
+    lock = threading.Lock()
+    finished = threading.Event()
+    latencies = []
+    errors = [0]
+    running = [concurrency]
+    issued = iter(range(1 << 62))
+    deadline = time.perf_counter() + duration
+
+    def issue():
+        started = time.perf_counter()
+        make_call(client, next(issued)).add_done_callback(lambda future: done(future, started))
+
+    def done(future, started):
+        elapsed = time.perf_counter() - started
+        with lock:
+            if future.exception() is None:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+        if time.perf_counter() < deadline:
+            issue()
+            return
+        with lock:
+            running[0] -= 1
+            if not running[0]:
+                finished.set()
+
+    for _ in range(concurrency):
+        issue()
+    finished.wait()
+    return latencies, errors[0]
+
+
+def run(target, pool_size, balance, args):
+    with DatabaseClient(target, pool_size=pool_size, balance=balance, timeout=args.timeout) as client:
+        client.wait_ready()
+        drive(client, REQUESTS[args.method], args.concurrency, min(1.0, args.duration))
+        latencies, errors = drive(client, REQUESTS[args.method], args.concurrency, args.duration)
+    return {
+        'pool_size': pool_size,
+        'balance': balance,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure client throughput for different channel pool sizes.')
+    parser.add_argument('--server', help='address of a running server (default: start one on a free port)')
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--balance', choices=BALANCERS, nargs='+', default=['round_robin', 'least_loaded'])
+    parser.add_argument('--method', choices=sorted(REQUESTS), default='GetColumnsInfo')
+    parser.add_argument('--concurrency', type=int, default=256, help='calls kept in flight')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--max-workers', type=int, default=32, help='handler threads of the started server')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes of the started server; connections are spread across them')
+    args = parser.parse_args()
+
+    process = None
+    target = args.server
+    if target is None:
+        port = free_port()
+        process = start_server(port, args.max_workers, args.processes)
+        target = f'127.0.0.1:{port}'
+    try:
+        with DatabaseClient(target, pool_size=1) as client:
+            client.wait_ready()
+            prepare(client, args.rows)
+        print(f'{"pool":>5} {"balance":>13} {"requests":>9} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for pool_size in args.pool_sizes:
+            for balance in args.balance:
+                result = run(target, pool_size, balance, args)
+                print(f'{result["pool_size"]:>5} {result["balance"]:>13} {result["requests"]:>9} {result["throughput"]:>9.0f} {result["p50_ms"]:>8.2f} {result["p99_ms"]:>8.2f} {result["errors"]:>7}')
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
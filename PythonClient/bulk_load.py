@@ -0,0 +1,73 @@
+import argparse
+import os
+import grpc
+from my_database_pb2 import BulkLoadRequest
+from db_client import DatabaseClient
+
+CHUNK_SIZE = 1 << 20
+# A load streams the whole file in one call, so it gets far longer than the
+# client's usual deadline.
+LOAD_TIMEOUT = 3600
+
+FORMATS = {
+    '.csv': BulkLoadRequest.CSV,
+    '.ndjson': BulkLoadRequest.NDJSON,
+    '.jsonl': BulkLoadRequest.NDJSON,
+    '.arrow': BulkLoadRequest.ARROW_IPC,
+    '.arrows': BulkLoadRequest.ARROW_IPC,
+    '.ipc': BulkLoadRequest.ARROW_IPC,
+}
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Cannot tell the format of "{path}"; pass it explicitly')
+    return FORMATS[extension]
+
+
+def bulk_load_requests(table_name, path, file_format, has_header, chunk_size):
+    with open(path, 'rb') as file:
+        first = True
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            if first:
+                yield BulkLoadRequest(tableName=table_name, format=file_format, hasHeader=has_header, chunk=chunk)
+                first = False
+            else:
+                yield BulkLoadRequest(chunk=chunk)
+    if first:
+        yield BulkLoadRequest(tableName=table_name, format=file_format, hasHeader=has_header)
+
+
+def bulk_load_file(stub, table_name, path, file_format=None, has_header=True, chunk_size=CHUNK_SIZE):
+    if file_format is None:
+        file_format = guess_format(path)
+    return stub.BulkLoad(bulk_load_requests(table_name, path, file_format, has_header, chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a CSV, NDJSON or Arrow IPC file into a table.')
+    parser.add_argument('table')
+    parser.add_argument('path')
+    parser.add_argument('--server', default='localhost:5031')
+    parser.add_argument('--format', choices=['csv', 'ndjson', 'arrow'])
+    parser.add_argument('--no-header', action='store_true', help='the CSV file has no header row')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--timeout', type=float, default=LOAD_TIMEOUT, help='seconds the whole load may take')
+    parser.add_argument('--compression', choices=['none', 'gzip', 'deflate'], default='gzip', help='compress the file on the way')
+    args = parser.parse_args()
+
+    file_format = {'csv': BulkLoadRequest.CSV, 'ndjson': BulkLoadRequest.NDJSON, 'arrow': BulkLoadRequest.ARROW_IPC}.get(args.format)
+    with DatabaseClient(args.server, pool_size=1, timeout=args.timeout, compression=args.compression) as stub:
+        try:
+            response = bulk_load_file(stub, args.table, args.path, file_format, not args.no_header, args.chunk_size)
+            print(f'Loaded {response.rowsLoaded} rows in {response.seconds:.2f}s ({response.rowsPerSecond:.0f} rows/s)')
+        except grpc.RpcError as e:
+            print(f"Error: {e.details()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,30 @@
+import functools
+import queue
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from tksheet import Sheet
 import grpc
-from my_database_pb2 import AddTableRequest, AddColumnRequest, DeleteColumnRequest, AddRowRequest, DeleteRowRequest, AddNewRowRequest, RemoveTableRequest, DisplayTableRequest, RemoveDuplicatesRequest, GetColumnsInfoRequest, UpdateTableCellRequest, TableInfo, Empty
-from my_database_pb2_grpc import MyDatabaseServiceStub
+from my_database_pb2 import AddTableRequest, AddColumnRequest, DeleteColumnRequest, AddRowRequest, DeleteRowRequest, AddNewRowRequest, RemoveTableRequest, RemoveDuplicatesRequest, BatchMutateRequest, Mutation, UpdateCellMutation, TableInfo, Empty
+from db_client import DatabaseClient
+from table_cache import TableCache
+from table_watch import TableWatcher
+
+# How often the GUI picks up finished calls and the changes the watch thread
+# has received.
+POLL_MS = 50
+# Deadline for every call the GUI makes, in seconds.
+RPC_TIMEOUT = 10
+# Cell edits made within this long of each other are sent as one batch.
+EDIT_BATCH_MS = 150
+# How often the list of tables is checked for tables added or removed by
+# other clients.
+TABLES_POLL_MS = 2000
+# The sheet only ever holds the rows in view; the scrollbar next to it moves
+# that window over the whole table.
+WINDOW_ROWS = 20
+# Rows read ahead on either side of the window, so scrolling seldom waits for
+# the server.
+PREFETCH_ROWS = 500
 
 class DatabaseGUI:
     def __init__(self, master):
@@ -11,8 +32,7 @@ class DatabaseGUI:
         self.master.title("Database GUI")
 
         grpc_server_address = 'localhost:5031'
-        channel = grpc.insecure_channel(grpc_server_address)
-        self.stub = MyDatabaseServiceStub(channel)
+        self.stub = DatabaseClient(grpc_server_address, timeout=RPC_TIMEOUT)
 
         button_frame = tk.Frame(master)
         button_frame.pack()
@@ -46,31 +66,109 @@ class DatabaseGUI:
 
         self.table_frame = tk.Frame(self.table_canvas)
 
-        self.sheet = Sheet(self.master, data=[], header=[], width=1000, height=500)
+        view_frame = tk.Frame(master)
+        view_frame.pack()
+
+        self.sheet = Sheet(view_frame, data=[], header=[], width=1000, height=500)
         self.sheet.enable_bindings(("single", "edit", "edit_cell"))
         self.sheet.cell_edit_binding(enable=True)
         self.sheet.extra_bindings([("end_edit_cell", self.end_edit_cell)])
-        self.sheet.pack()
-
-        self.display_tables()
-
+        self.sheet.pack(side=tk.LEFT)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.sheet.bind(sequence, self.wheel_rows)
+
+        self.scrollbar = tk.Scrollbar(view_frame, orient=tk.VERTICAL, command=self.scroll_rows)
+        self.scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        # Tables are read through a cache, and the one on screen is kept up to
+        # date by a Watch stream instead of being downloaded again after
+        # every edit. No call is made on the Tk thread: calls complete on
+        # gRPC's threads and events arrive on the watch thread, and both are
+        # queued and handled here, on the Tk thread, in small batches.
+        self.tables = []
+        self.selected_table = None
+        self.column_names = []
+        self.row_ids = []
+        self.first_row = 0
+        self.row_count = 0
+        self.cache = TableCache(self.stub)
+        self.changes = queue.Queue()
+        self.completions = queue.Queue()
+        self.watcher = None
+        self.loading = set()
+        self.tables_loading = False
+        # Edits not yet confirmed by the server, shown over the cached rows,
+        # and the ones among them not sent yet.
+        self.unconfirmed_edits = {}
+        self.pending_edits = {}
+        self.edit_flush = None
+        self.poll_tables()
+        self.master.after(POLL_MS, self.apply_changes)
+
+    # Starts a call without waiting for it. Its response is handed to on_done,
+    # or its error to on_error, on the Tk thread.
+    def call(self, method, request, on_done=None, on_error=None):
+        future = method.future(request)
+        future.add_done_callback(lambda future: self.completions.put((future, on_done, on_error or self.report_error)))
+
+    def report_error(self, error):
+        print(f"Error: {error}")
+
+    # Edits show at once and are sent a moment later, together with the other
+    # edits made meanwhile, as one BatchMutate. The server applies a batch
+    # entirely or not at all, so when it rejects one every cell in it goes
+    # back to what the server holds.
     def end_edit_cell(self, event=None):
-        if event.text is not None:
-            try:
-                res = self.stub.UpdateTableCell(
-                    UpdateTableCellRequest(
-                        tableName=self.selected_table,
-                        row=event.row,
-                        colName=self.column_names[event.column],
-                        value=event.text
-                    )
-                ).success
-                if res:
-                    return event.text
-            except grpc.RpcError as e:
-                print(f"Error: {e}")
-                messagebox.showinfo("Error", "Invalid input", parent=self.master)
-        return None
+        if event.text is None or not self.row_ids[event.row]:
+            return None
+        key = (self.selected_table, self.row_ids[event.row], self.column_names[event.column])
+        self.unconfirmed_edits[key] = event.text
+        self.pending_edits[key] = event.text
+        if self.edit_flush is None:
+            self.edit_flush = self.master.after(EDIT_BATCH_MS, self.send_edits)
+        return event.text
+
+    def send_edits(self):
+        self.edit_flush = None
+        batches = {}
+        for (table_name, row_id, column_name), value in self.pending_edits.items():
+            batches.setdefault(table_name, []).append((row_id, column_name, value))
+        self.pending_edits = {}
+        for table_name, edits in batches.items():
+            mutations = [Mutation(update=UpdateCellMutation(rowId=row_id, colName=column_name, value=value)) for row_id, column_name, value in edits]
+            self.call(self.stub.BatchMutate, BatchMutateRequest(tableName=table_name, mutations=mutations),
+                      functools.partial(self.edits_done, table_name, edits),
+                      functools.partial(self.edits_failed, table_name, edits))
+
+    def edits_done(self, table_name, edits, response):
+        if not response.applied:
+            errors = [result.error for result in response.results if not result.success]
+            self.edits_failed(table_name, edits, errors[0] if errors else None)
+            return
+        # Keep the new values until the watch brings them, so they do not
+        # flicker back meanwhile.
+        table = self.cache.tables.get(table_name)
+        for row_id, column_name, value in edits:
+            row = table.find(row_id) if table is not None else None
+            if row is not None and column_name in table.column_names:
+                row[table.column_names.index(column_name)] = value
+        self.forget_edits(table_name, edits)
+
+    def edits_failed(self, table_name, edits, error):
+        self.forget_edits(table_name, edits)
+        details = error.details() if isinstance(error, grpc.RpcError) else error
+        print(f"Error: {details}")
+        messagebox.showinfo("Error", f"Invalid input: {details}" if details else "Invalid input", parent=self.master)
+
+    # Edits made again while a batch was on its way stay until their own
+    # batch is answered.
+    def forget_edits(self, table_name, edits):
+        for row_id, column_name, value in edits:
+            key = (table_name, row_id, column_name)
+            if self.unconfirmed_edits.get(key) == value and key not in self.pending_edits:
+                del self.unconfirmed_edits[key]
+        if table_name == self.selected_table:
+            self.refresh_selected_table_content()
 
     def convert_to_csharp_type(self, user_type):
         type_mapping = {
@@ -82,168 +180,245 @@ class DatabaseGUI:
         return type_mapping.get(user_type, user_type)
 
     def create_database(self):
-        try:
-            self.stub.CreateDatabase(Empty())
-            self.display_tables()
-            self.sheet.headers([])
-            self.sheet.set_sheet_data(data=[])
-            messagebox.showinfo("Database Created", "Database has been created.", parent=self.master)
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+        self.call(self.stub.CreateDatabase, Empty(), lambda response: self.database_created())
+
+    def database_created(self):
+        self.update_tables()
+        messagebox.showinfo("Database Created", "Database has been created.", parent=self.master)
 
     def add_table(self):
-        try:
-            table_name = simpledialog.askstring("Input", "Enter table name:", parent=self.master)
-            if table_name:
-                self.stub.AddTable(
-                    AddTableRequest(
-                        tableName=table_name,
-                        columnInfo=[
-                            TableInfo(ColumnName="Column1", ColumnType=self.convert_to_csharp_type("str")),
-                        ]
-                    )
-                )
-                self.stub.AddNewRow(AddRowRequest(tableName=table_name))
-                self.display_tables()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+        table_name = simpledialog.askstring("Input", "Enter table name:", parent=self.master)
+        if table_name:
+            self.call(
+                self.stub.AddTable,
+                AddTableRequest(
+                    tableName=table_name,
+                    columnInfo=[
+                        TableInfo(ColumnName="Column1", ColumnType=self.convert_to_csharp_type("str")),
+                    ]
+                ),
+                lambda response: self.call(self.stub.AddNewRow, AddRowRequest(tableName=table_name), lambda response: self.update_tables())
+            )
 
     def delete_table(self):
-        try:
-            if self.selected_table:
-                self.stub.RemoveTable(RemoveTableRequest(tableName=self.selected_table))
-                self.display_tables()
-                if self.tables:
-                    self.display_selected_table_content(self.tables[0])
-                else:
-                    self.sheet.headers([])
-                    self.sheet.set_sheet_data(data=[])
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+        if self.selected_table:
+            self.call(self.stub.RemoveTable, RemoveTableRequest(tableName=self.selected_table), lambda response: self.update_tables())
 
     def add_row(self):
-        try:
-            if self.selected_table:
-                self.stub.AddNewRow(
-                    AddNewRowRequest(
-                        tableName=self.selected_table
-                    )
+        if self.selected_table:
+            self.call(
+                self.stub.AddNewRow,
+                AddNewRowRequest(
+                    tableName=self.selected_table
                 )
-                self.refresh_selected_table_content()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+            )
 
     def delete_row(self):
-        try:
-            row_index = simpledialog.askstring("Input", "Enter row index:", parent=self.master)
-            if self.selected_table and row_index:
-                self.stub.DeleteRow(
-                    DeleteRowRequest(
-                        tableName=self.selected_table,
-                        rowIndex=int(row_index),
-                    )
+        row_index = simpledialog.askstring("Input", "Enter row index:", parent=self.master)
+        if self.selected_table and row_index:
+            # The row is looked up by the id it had when it was displayed,
+            # so a row deleted by another client in between is not mistaken
+            # for the one after it.
+            row_id = 0
+            table = self.cache.tables.get(self.selected_table)
+            row = table.row(int(row_index) - 1) if table is not None and int(row_index) > 0 else None
+            if row is not None:
+                row_id = row[0]
+            self.call(
+                self.stub.DeleteRow,
+                DeleteRowRequest(
+                    tableName=self.selected_table,
+                    rowIndex=int(row_index),
+                    rowId=row_id,
                 )
-                self.refresh_selected_table_content()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+            )
 
     def add_column(self):
-        try:
-            if self.selected_table:
-                column_name = simpledialog.askstring("Input", "Enter column name:", parent=self.master)
-                column_type = simpledialog.askstring("Input", "Enter column type (e.g., int, char, str, real):", parent=self.master)
-                converted_type = self.convert_to_csharp_type(column_type)
-                if column_name and converted_type:
-                    self.stub.AddColumn(
-                        AddColumnRequest(
-                            tableName=self.selected_table,
-                            columnInfo=TableInfo(ColumnName=column_name, ColumnType=converted_type)
-                        )
+        if self.selected_table:
+            column_name = simpledialog.askstring("Input", "Enter column name:", parent=self.master)
+            column_type = simpledialog.askstring("Input", "Enter column type (e.g., int, char, str, real):", parent=self.master)
+            converted_type = self.convert_to_csharp_type(column_type)
+            if column_name and converted_type:
+                self.call(
+                    self.stub.AddColumn,
+                    AddColumnRequest(
+                        tableName=self.selected_table,
+                        columnInfo=TableInfo(ColumnName=column_name, ColumnType=converted_type)
                     )
-                    self.refresh_selected_table_content()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+                )
 
     def delete_column(self):
-        try:
-            if self.selected_table:
-                column_name = simpledialog.askstring("Input", "Enter column name:", parent=self.master)
-                if column_name:
-                    self.stub.DeleteColumn(
-                        DeleteColumnRequest(
-                            tableName=self.selected_table,
-                            columnName=column_name
-                        )
+        if self.selected_table:
+            column_name = simpledialog.askstring("Input", "Enter column name:", parent=self.master)
+            if column_name:
+                self.call(
+                    self.stub.DeleteColumn,
+                    DeleteColumnRequest(
+                        tableName=self.selected_table,
+                        columnName=column_name
                     )
-                    self.refresh_selected_table_content()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
-
-    def get_tables(self):
-        try:
-            tables = self.stub.GetTables(Empty()).tables
-            self.tables = tables
-            table_content = None
-            if tables:
-                table_content = {table: self.stub.DisplayTable(DisplayTableRequest(tableName=table)).rows for table in tables}
-            return tables, table_content
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
-
-    def get_columns_info(self):
-        try:
-            self.columns_info = self.stub.GetColumnsInfo(GetColumnsInfoRequest(tableName=self.selected_table)).columnsInfo
-            self.column_names = [info.ColumnName for info in self.columns_info]
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
+                )
 
     def remove_duplicates(self):
+        if self.selected_table:
+            self.call(self.stub.RemoveDuplicates, RemoveDuplicatesRequest(tableName=self.selected_table))
+
+    def poll_tables(self):
+        self.update_tables()
+        self.master.after(TABLES_POLL_MS, self.poll_tables)
+
+    # Only one GetTables is on its way at a time.
+    def update_tables(self):
+        if not self.tables_loading:
+            self.tables_loading = True
+            self.call(self.stub.GetTables, Empty(), self.tables_loaded, self.tables_failed)
+
+    def tables_failed(self, error):
+        self.tables_loading = False
+        self.report_error(error)
+
+    def tables_loaded(self, response):
+        self.tables_loading = False
+        tables = list(response.tables)
+        self.cache.retain(tables, response.versions)
+        if tables != self.tables:
+            self.display_tables(tables)
+        if self.selected_table not in tables:
+            self.display_selected_table_content(tables[0] if tables else None)
+
+    # Runs the handlers of the calls that finished since the last poll and
+    # applies whatever the watch thread has received, then redraws the table
+    # on screen if any of the changes were to it.
+    def apply_changes(self):
         try:
-            if self.selected_table:
-                self.stub.RemoveDuplicates(RemoveDuplicatesRequest(tableName=self.selected_table))
-                self.refresh_selected_table_content()
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
-
-    def display_tables(self):
+            while True:
+                future, on_done, on_error = self.completions.get_nowait()
+                try:
+                    response = future.result()
+                except grpc.RpcError as e:
+                    on_error(e)
+                    continue
+                if on_done is not None:
+                    on_done(response)
+        except queue.Empty:
+            pass
+        changed = set()
         try:
-            tables, _ = self.get_tables()
-
-            for widget in self.table_frame.winfo_children():
-                widget.destroy()
-
-            if tables:
-                for table in tables:
-                    tk.Button(self.table_frame, text=table, command=lambda t=table: self.display_selected_table_content(t)).pack(side=tk.LEFT, padx=(5, 5), pady=(5, 5))
-
-                self.table_frame.update_idletasks()
-                self.table_frame_id = self.table_canvas.create_window((0, 0), window=self.table_frame, anchor=tk.NW)
-        except grpc.RpcError as e:
-            print(f"Error: {e}")
-
+            while True:
+                changed.add(self.cache.apply(self.changes.get_nowait()))
+        except queue.Empty:
+            pass
+        if self.selected_table in changed or None in changed:
+            self.refresh_selected_table_content()
+        self.master.after(POLL_MS, self.apply_changes)
+
+    def display_tables(self, tables):
+        self.tables = tables
+
+        for widget in self.table_frame.winfo_children():
+            widget.destroy()
+
+        if self.tables:
+            for table in self.tables:
+                tk.Button(self.table_frame, text=table, command=lambda t=table: self.display_selected_table_content(t)).pack(side=tk.LEFT, padx=(5, 5), pady=(5, 5))
+
+            self.table_frame.update_idletasks()
+            self.table_frame_id = self.table_canvas.create_window((0, 0), window=self.table_frame, anchor=tk.NW)
+
+    # Shows the table from its first row and watches it from the version the
+    # cache read it at; a table not cached yet is watched once its first page
+    # has been read. The watch sends no snapshots: the view reads the rows it
+    # shows itself, and only needs to know which ones changed.
     def display_selected_table_content(self, selected_table):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
         self.selected_table = selected_table
+        self.first_row = 0
+        self.cache.watched = {selected_table} if selected_table else set()
+        if selected_table in self.cache.tables:
+            self.watch_selected_table()
         self.refresh_selected_table_content()
 
-    def refresh_selected_table_content(self):
-        _, table_content = self.get_tables()
-
-        if self.selected_table in table_content:
-            rows = table_content[self.selected_table]
-
-            self.get_columns_info()
-
-            print(rows)
-
-            data = []
-            for i in range(len(rows)):
-                data.append([])
-                for column in self.column_names:
-                    data[i].append(rows[i][column])
-            print("data:", data)
+    def watch_selected_table(self):
+        version = self.cache.tables[self.selected_table].version
+        self.watcher = TableWatcher(self.stub, self.changes.put, [self.selected_table], version, skip_snapshots=True)
+        self.watcher.start()
+
+    def load_pages(self, table_name, start, stop):
+        for page in self.cache.missing_pages(table_name, start, stop):
+            if (table_name, page) not in self.loading:
+                self.loading.add((table_name, page))
+                self.call(self.stub.Query, self.cache.page_request(table_name, page),
+                          functools.partial(self.page_loaded, table_name, page),
+                          functools.partial(self.page_failed, table_name, page))
+
+    def page_loaded(self, table_name, page, response):
+        self.loading.discard((table_name, page))
+        self.cache.store_page(table_name, page, response)
+        if table_name == self.selected_table:
+            if self.watcher is None:
+                self.watch_selected_table()
+            self.refresh_selected_table_content()
+
+    def page_failed(self, table_name, page, error):
+        self.loading.discard((table_name, page))
+        self.report_error(error)
+
+    def scroll_rows(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.show_rows(int(float(amount) * self.row_count))
+        elif unit == 'pages':
+            self.show_rows(self.first_row + int(amount) * WINDOW_ROWS)
+        else:
+            self.show_rows(self.first_row + int(amount))
+
+    def wheel_rows(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.show_rows(self.first_row - 3)
+        else:
+            self.show_rows(self.first_row + 3)
+        return "break"
+
+    def show_rows(self, first_row):
+        self.first_row = first_row
+        self.refresh_selected_table_content()
 
-            self.sheet.headers(self.column_names)
-            self.sheet.set_sheet_data(data)
+    # Puts the rows in the window into the sheet as far as they are cached,
+    # and asks for the pages in and around the window that are not. Rows
+    # still on their way show empty until their page arrives.
+    def refresh_selected_table_content(self):
+        table = self.cache.tables.get(self.selected_table)
+        rows = []
+        if self.selected_table:
+            if table is not None:
+                self.first_row = max(0, min(self.first_row, table.row_count - WINDOW_ROWS))
+            self.load_pages(self.selected_table, max(0, self.first_row - PREFETCH_ROWS), self.first_row + WINDOW_ROWS + PREFETCH_ROWS)
+            rows = self.cache.rows(self.selected_table, self.first_row, self.first_row + WINDOW_ROWS)
+        if table is None:
+            self.column_names = []
+            self.row_ids = []
+            self.row_count = 0
+            self.sheet.headers([])
+            self.sheet.set_sheet_data(data=[])
+            self.scrollbar.set(0, 1)
+            return
+
+        self.column_names = table.column_names
+        self.row_count = table.row_count
+        self.row_ids = [row[0] if row is not None else 0 for row in rows]
+        data = [['' if value is None else value for value in row[1]] if row is not None else [''] * len(self.column_names) for row in rows]
+        for row_id, values in zip(self.row_ids, data):
+            for i, column_name in enumerate(self.column_names):
+                values[i] = self.unconfirmed_edits.get((self.selected_table, row_id, column_name), values[i])
+
+        self.sheet.headers(self.column_names)
+        self.sheet.set_sheet_data(data)
+        self.sheet.row_index([str(self.first_row + i + 1) for i in range(len(data))])
+        if self.row_count:
+            self.scrollbar.set(self.first_row / self.row_count, (self.first_row + len(data)) / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+import itertools
+import threading
+import grpc
+from my_database_pb2_grpc import MyDatabaseServiceStub
+
+# Channels in a pool. Each has its own connection, so together they are not
+# held to the limit one HTTP/2 connection puts on concurrent streams.
+POOL_SIZE = 4
+# Deadline for every call, in seconds, unless the call passes its own.
+TIMEOUT = 10
+# Largest message a channel sends or receives; gRPC's default receive limit
+# is 4 MB, which one page of a wide table can exceed.
+MAX_MESSAGE_BYTES = 64 << 20
+# Idle connections are pinged this often, and dropped if a ping goes
+# unanswered for KEEPALIVE_TIMEOUT_MS, so a dead server is noticed before
+# the next call has to wait out its deadline.
+KEEPALIVE_MS = 30000
+KEEPALIVE_TIMEOUT_MS = 10000
+
+BALANCERS = ('round_robin', 'least_loaded')
+
+COMPRESSION = {
+    'none': grpc.Compression.NoCompression,
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate,
+}
+
+# Calls that stream their response can run as long as the caller reads
+# them, so they only get a deadline when one is passed.
+STREAMING_METHODS = {'StreamTable', 'Watch'}
+# With compression on, requests of the methods that carry rows are
+# compressed once they serialize to COMPRESS_ABOVE_BYTES; other requests are
+# small and are not even measured. Streamed requests carry file chunks or
+# batches of rows and are always compressed. The server compresses large
+# responses on its own, whatever the client sends.
+COMPRESS_ABOVE_BYTES = 32 << 10
+LARGE_REQUEST_METHODS = {'BatchMutate', 'AppendTableData'}
+STREAMED_REQUEST_METHODS = {'BatchMutateStream', 'BulkLoad'}
+
+
+def channel_options(max_message_bytes=MAX_MESSAGE_BYTES, keepalive_ms=KEEPALIVE_MS, keepalive_timeout_ms=KEEPALIVE_TIMEOUT_MS):
+    return [
+        ('grpc.max_send_message_length', max_message_bytes),
+        ('grpc.max_receive_message_length', max_message_bytes),
+        ('grpc.keepalive_time_ms', keepalive_ms),
+        ('grpc.keepalive_timeout_ms', keepalive_timeout_ms),
+        ('grpc.keepalive_permit_without_calls', 1),
+        ('grpc.http2.max_pings_without_data', 0),
+        # Channels to the same address with the same options share one
+        # connection unless each keeps its own subchannels.
+        ('grpc.use_local_subchannel_pool', 1),
+    ]
+
+
+# A method of the service that runs every call on the channel the pool
+# picks, with the pool's deadline unless the call passes its own. Calls
+# are made the same way as on a stub: directly, or with .future().
+class PooledMethod:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def _timeout(self, timeout):
+        if timeout is not None or self.name in STREAMING_METHODS:
+            return timeout
+        return self.client.timeout
+
+    def _compression(self, request, kwargs):
+        compression = self.client.compression
+        if 'compression' in kwargs or compression == grpc.Compression.NoCompression:
+            return
+        if self.name in STREAMED_REQUEST_METHODS or (self.name in LARGE_REQUEST_METHODS and request.ByteSize() >= self.client.compress_above):
+            kwargs['compression'] = compression
+
+    def __call__(self, request, timeout=None, **kwargs):
+        self._compression(request, kwargs)
+        channel = self.client.acquire()
+        method = getattr(self.client.stubs[channel], self.name)
+        if self.name in STREAMING_METHODS:
+            try:
+                call = method(request, timeout=self._timeout(timeout), **kwargs)
+            except BaseException:
+                self.client.release(channel)
+                raise
+            call.add_done_callback(lambda call: self.client.release(channel))
+            return call
+        try:
+            return method(request, timeout=self._timeout(timeout), **kwargs)
+        finally:
+            self.client.release(channel)
+
+    def future(self, request, timeout=None, **kwargs):
+        self._compression(request, kwargs)
+        channel = self.client.acquire()
+        try:
+            future = getattr(self.client.stubs[channel], self.name).future(request, timeout=self._timeout(timeout), **kwargs)
+        except BaseException:
+            self.client.release(channel)
+            raise
+        future.add_done_callback(lambda future: self.client.release(channel))
+        return future
+
+
+# Client for the database service over a pool of channels, usable wherever
+# a MyDatabaseServiceStub is. Calls go to the channels in turn, or with
+# balance='least_loaded' to the one with the fewest calls in flight, which
+# keeps slow calls such as large queries from piling up on one connection.
+class DatabaseClient:
+    def __init__(self, target='localhost:5031', pool_size=POOL_SIZE, balance='round_robin', timeout=TIMEOUT,
+                 max_message_bytes=MAX_MESSAGE_BYTES, keepalive_ms=KEEPALIVE_MS, compression='none', compress_above=COMPRESS_ABOVE_BYTES):
+        if balance not in BALANCERS:
+            raise ValueError(f'Unknown balance "{balance}"; use one of {", ".join(BALANCERS)}')
+        if pool_size < 1:
+            raise ValueError('The pool needs at least one channel')
+        options = channel_options(max_message_bytes, keepalive_ms)
+        self.channels = [grpc.insecure_channel(target, options=options) for _ in range(pool_size)]
+        self.stubs = [MyDatabaseServiceStub(channel) for channel in self.channels]
+        self.balance = balance
+        self.timeout = timeout
+        self.compression = COMPRESSION[compression]
+        self.compress_above = compress_above
+        self.in_flight = [0] * pool_size
+        self.lock = threading.Lock()
+        self.turns = itertools.count()
+        self.methods = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not hasattr(self.stubs[0], name):
+            raise AttributeError(name)
+        method = self.methods.get(name)
+        if method is None:
+            method = self.methods[name] = PooledMethod(self, name)
+        return method
+
+    def acquire(self):
+        with self.lock:
+            if self.balance == 'least_loaded':
+                channel = min(range(len(self.in_flight)), key=self.in_flight.__getitem__)
+            else:
+                channel = next(self.turns) % len(self.channels)
+            self.in_flight[channel] += 1
+            return channel
+
+    def release(self, channel):
+        with self.lock:
+            self.in_flight[channel] -= 1
+
+    # Connects every channel, so the first calls do not pay for it.
+    def wait_ready(self, timeout=TIMEOUT):
+        for channel in self.channels:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
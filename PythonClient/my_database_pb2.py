@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11my_database.proto\x12\tdbservice\x1a\x1cgoogle/protobuf/struct.proto\"\x07\n\x05\x45mpty\"3\n\tTableInfo\x12\x12\n\nColumnName\x18\x01 \x01(\t\x12\x12\n\nColumnType\x18\x02 \x01(\t\"\x8b\x01\n\x0c\x44\x61tabaseInfo\x12\x33\n\x06tables\x18\x01 \x03(\x0b\x32#.dbservice.DatabaseInfo.TablesEntry\x1a\x46\n\x0bTablesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12&\n\x05value\x18\x02 \x01(\x0b\x32\x17.dbservice.DynamicTable:\x02\x38\x01\"W\n\x0c\x44ynamicTable\x12)\n\ncolumnInfo\x18\x01 \x03(\x0b\x32\x15.dbservice.ColumnInfo\x12\x1c\n\x04rows\x18\x02 \x03(\x0b\x32\x0e.dbservice.Row\"(\n\nColumnInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\"x\n\x03Row\x12*\n\x06values\x18\x01 \x03(\x0b\x32\x1a.dbservice.Row.ValuesEntry\x1a\x45\n\x0bValuesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12%\n\x05value\x18\x02 \x01(\x0b\x32\x16.google.protobuf.Value:\x02\x38\x01\"\x17\n\x15\x43reateDatabaseRequest\"N\n\x0f\x41\x64\x64TableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12(\n\ncolumnInfo\x18\x02 \x03(\x0b\x32\x14.dbservice.TableInfo\"\'\n\x12RemoveTableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"%\n\x10\x41\x64\x64NewRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"J\n\rAddRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12&\n\x06values\x18\x02 \x03(\x0b\x32\x16.google.protobuf.Value\"7\n\x10\x44\x65leteRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x10\n\x08rowIndex\x18\x02 \x01(\x05\"O\n\x10\x41\x64\x64\x43olumnRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12(\n\ncolumnInfo\x18\x02 \x01(\x0b\x32\x14.dbservice.TableInfo\"<\n\x13\x44\x65leteColumnRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x12\n\ncolumnName\x18\x02 \x01(\t\",\n\x17RemoveDuplicatesRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"*\n\x15GetColumnsInfoRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"@\n\x13\x43olumnsInfoResponse\x12)\n\x0b\x63olumnsInfo\x18\x01 \x03(\x0b\x32\x14.dbservice.TableInfo\" \n\x0eTablesResponse\x12\x0e\n\x06tables\x18\x01 \x03(\t\"(\n\x13\x44isplayTableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"=\n\x14\x44isplayTableResponse\x12%\n\x04rows\x18\x01 \x03(\x0b\x32\x17.google.protobuf.Struct\"X\n\x16UpdateTableCellRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0b\n\x03row\x18\x02 \x01(\x05\x12\x0f\n\x07\x63olName\x18\x03 \x01(\t\x12\r\n\x05value\x18\x04 \x01(\t\"*\n\x17UpdateTableCellResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x32\x82\x07\n\x11MyDatabaseService\x12\x44\n\x0e\x43reateDatabase\x12 .dbservice.CreateDatabaseRequest\x1a\x10.dbservice.Empty\x12\x38\n\x08\x41\x64\x64Table\x12\x1a.dbservice.AddTableRequest\x1a\x10.dbservice.Empty\x12>\n\x0bRemoveTable\x12\x1d.dbservice.RemoveTableRequest\x1a\x10.dbservice.Empty\x12:\n\tAddNewRow\x12\x1b.dbservice.AddNewRowRequest\x1a\x10.dbservice.Empty\x12\x34\n\x06\x41\x64\x64Row\x12\x18.dbservice.AddRowRequest\x1a\x10.dbservice.Empty\x12:\n\tDeleteRow\x12\x1b.dbservice.DeleteRowRequest\x1a\x10.dbservice.Empty\x12:\n\tAddColumn\x12\x1b.dbservice.AddColumnRequest\x1a\x10.dbservice.Empty\x12@\n\x0c\x44\x65leteColumn\x12\x1e.dbservice.DeleteColumnRequest\x1a\x10.dbservice.Empty\x12H\n\x10RemoveDuplicates\x12\".dbservice.RemoveDuplicatesRequest\x1a\x10.dbservice.Empty\x12R\n\x0eGetColumnsInfo\x12 .dbservice.GetColumnsInfoRequest\x1a\x1e.dbservice.ColumnsInfoResponse\x12\x38\n\tGetTables\x12\x10.dbservice.Empty\x1a\x19.dbservice.TablesResponse\x12O\n\x0c\x44isplayTable\x12\x1e.dbservice.DisplayTableRequest\x1a\x1f.dbservice.DisplayTableResponse\x12X\n\x0fUpdateTableCell\x12!.dbservice.UpdateTableCellRequest\x1a\".dbservice.UpdateTableCellResponseB\x0f\xaa\x02\x0cGrpcService1b\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11my_database.proto\x12\tdbservice\x1a\x1cgoogle/protobuf/struct.proto\"\x07\n\x05\x45mpty\"3\n\tTableInfo\x12\x12\n\nColumnName\x18\x01 \x01(\t\x12\x12\n\nColumnType\x18\x02 \x01(\t\"\x8b\x01\n\x0c\x44\x61tabaseInfo\x12\x33\n\x06tables\x18\x01 \x03(\x0b\x32#.dbservice.DatabaseInfo.TablesEntry\x1a\x46\n\x0bTablesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12&\n\x05value\x18\x02 \x01(\x0b\x32\x17.dbservice.DynamicTable:\x02\x38\x01\"W\n\x0c\x44ynamicTable\x12)\n\ncolumnInfo\x18\x01 \x03(\x0b\x32\x15.dbservice.ColumnInfo\x12\x1c\n\x04rows\x18\x02 \x03(\x0b\x32\x0e.dbservice.Row\"(\n\nColumnInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\"x\n\x03Row\x12*\n\x06values\x18\x01 \x03(\x0b\x32\x1a.dbservice.Row.ValuesEntry\x1a\x45\n\x0bValuesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12%\n\x05value\x18\x02 \x01(\x0b\x32\x16.google.protobuf.Value:\x02\x38\x01\"\x17\n\x15\x43reateDatabaseRequest\"N\n\x0f\x41\x64\x64TableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12(\n\ncolumnInfo\x18\x02 \x03(\x0b\x32\x14.dbservice.TableInfo\"\'\n\x12RemoveTableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"%\n\x10\x41\x64\x64NewRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"J\n\rAddRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12&\n\x06values\x18\x02 \x03(\x0b\x32\x16.google.protobuf.Value\"\x1f\n\x0e\x41\x64\x64RowResponse\x12\r\n\x05rowId\x18\x01 \x01(\x03\"F\n\x10\x44\x65leteRowRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x10\n\x08rowIndex\x18\x02 \x01(\x05\x12\r\n\x05rowId\x18\x03 \x01(\x03\"O\n\x10\x41\x64\x64\x43olumnRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12(\n\ncolumnInfo\x18\x02 \x01(\x0b\x32\x14.dbservice.TableInfo\"<\n\x13\x44\x65leteColumnRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x12\n\ncolumnName\x18\x02 \x01(\t\"=\n\x17RemoveDuplicatesRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0f\n\x07\x63olumns\x18\x02 \x03(\t\"*\n\x15GetColumnsInfoRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"@\n\x13\x43olumnsInfoResponse\x12)\n\x0b\x63olumnsInfo\x18\x01 \x03(\x0b\x32\x14.dbservice.TableInfo\"2\n\x0eTablesResponse\x12\x0e\n\x06tables\x18\x01 \x03(\t\x12\x10\n\x08versions\x18\x02 \x03(\x03\"@\n\x13\x44isplayTableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x16\n\x0eifChangedSince\x18\x02 \x01(\x03\"\x9e\x01\n\x14\x44isplayTableResponse\x12%\n\x04rows\x18\x01 \x03(\x0b\x32\x17.google.protobuf.Struct\x12\x0e\n\x06rowIds\x18\x02 \x03(\x03\x12)\n\x0b\x63olumnsInfo\x18\x03 \x03(\x0b\x32\x14.dbservice.TableInfo\x12\x0f\n\x07version\x18\x04 \x01(\x03\x12\x13\n\x0bnotModified\x18\x05 \x01(\x08\"g\n\x16UpdateTableCellRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0b\n\x03row\x18\x02 \x01(\x05\x12\x0f\n\x07\x63olName\x18\x03 \x01(\t\x12\r\n\x05value\x18\x04 \x01(\t\x12\r\n\x05rowId\x18\x05 \x01(\x03\"*\n\x17UpdateTableCellResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"[\n\x12StreamTableRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x11\n\tbatchSize\x18\x02 \x01(\x05\x12\x10\n\x08startRow\x18\x03 \x01(\x05\x12\r\n\x05typed\x18\x04 \x01(\x08\"\x93\x01\n\x13StreamTableResponse\x12%\n\x04rows\x18\x01 \x03(\x0b\x32\x17.google.protobuf.Struct\x12\x10\n\x08startRow\x18\x02 \x01(\x05\x12\x0f\n\x07nextRow\x18\x03 \x01(\x05\x12\"\n\x04\x64\x61ta\x18\x04 \x01(\x0b\x32\x14.dbservice.TableData\x12\x0e\n\x06rowIds\x18\x05 \x03(\x03\"]\n\nColumnData\x12\x11\n\tintValues\x18\x01 \x03(\x11\x12\x14\n\x0c\x64oubleValues\x18\x02 \x03(\x01\x12\x14\n\x0cstringValues\x18\x03 \x03(\t\x12\x10\n\x08validity\x18\x04 \x01(\x0c\"\x80\x01\n\tTableData\x12&\n\x07\x63olumns\x18\x01 \x03(\x0b\x32\x15.dbservice.ColumnInfo\x12)\n\ncolumnData\x18\x02 \x03(\x0b\x32\x15.dbservice.ColumnData\x12\x10\n\x08rowCount\x18\x03 \x01(\x05\x12\x0e\n\x06rowIds\x18\x04 \x03(\x03\";\n\x11InsertRowMutation\x12&\n\x06values\x18\x01 \x03(\x0b\x32\x16.google.protobuf.Value\"/\n\x11\x44\x65leteRowMutation\x12\x0b\n\x03row\x18\x01 \x01(\x05\x12\r\n\x05rowId\x18\x02 \x01(\x03\"P\n\x12UpdateCellMutation\x12\x0b\n\x03row\x18\x01 \x01(\x05\x12\x0f\n\x07\x63olName\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\t\x12\r\n\x05rowId\x18\x04 \x01(\x03\"\xa1\x01\n\x08Mutation\x12.\n\x06insert\x18\x01 \x01(\x0b\x32\x1c.dbservice.InsertRowMutationH\x00\x12.\n\x06\x64\x65lete\x18\x02 \x01(\x0b\x32\x1c.dbservice.DeleteRowMutationH\x00\x12/\n\x06update\x18\x03 \x01(\x0b\x32\x1d.dbservice.UpdateCellMutationH\x00\x42\x04\n\x02op\"O\n\x12\x42\x61tchMutateRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12&\n\tmutations\x18\x02 \x03(\x0b\x32\x13.dbservice.Mutation\"L\n\x0eMutationResult\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12\x0b\n\x03row\x18\x03 \x01(\x05\x12\r\n\x05rowId\x18\x04 \x01(\x03\"R\n\x13\x42\x61tchMutateResponse\x12\x0f\n\x07\x61pplied\x18\x01 \x01(\x08\x12*\n\x07results\x18\x02 \x03(\x0b\x32\x19.dbservice.MutationResult\"\xa7\x01\n\x0f\x42ulkLoadRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x31\n\x06\x66ormat\x18\x02 \x01(\x0e\x32!.dbservice.BulkLoadRequest.Format\x12\x11\n\thasHeader\x18\x03 \x01(\x08\x12\r\n\x05\x63hunk\x18\x04 \x01(\x0c\",\n\x06\x46ormat\x12\x07\n\x03\x43SV\x10\x00\x12\n\n\x06NDJSON\x10\x01\x12\r\n\tARROW_IPC\x10\x02\"N\n\x10\x42ulkLoadResponse\x12\x12\n\nrowsLoaded\x18\x01 \x01(\x03\x12\x0f\n\x07seconds\x18\x02 \x01(\x01\x12\x15\n\rrowsPerSecond\x18\x03 \x01(\x01\"O\n\x16\x41ppendTableDataRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\"\n\x04\x64\x61ta\x18\x02 \x01(\x0b\x32\x14.dbservice.TableData\"\x8b\x01\n\x12\x43reateIndexRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x12\n\ncolumnName\x18\x02 \x01(\t\x12\x30\n\x04kind\x18\x03 \x01(\x0e\x32\".dbservice.CreateIndexRequest.Kind\"\x1c\n\x04Kind\x12\x08\n\x04HASH\x10\x00\x12\n\n\x06SORTED\x10\x01\"9\n\x10\x44ropIndexRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x12\n\ncolumnName\x18\x02 \x01(\t\"\xe1\x01\n\rLookupRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x12\n\ncolumnName\x18\x02 \x01(\t\x12&\n\x06\x65quals\x18\x03 \x01(\x0b\x32\x16.google.protobuf.Value\x12#\n\x03low\x18\x04 \x01(\x0b\x32\x16.google.protobuf.Value\x12$\n\x04high\x18\x05 \x01(\x0b\x32\x16.google.protobuf.Value\x12\x12\n\nexcludeLow\x18\x06 \x01(\x08\x12\x13\n\x0b\x65xcludeHigh\x18\x07 \x01(\x08\x12\r\n\x05limit\x18\x08 \x01(\x05\"B\n\x0eLookupResponse\x12\x0c\n\x04rows\x18\x01 \x03(\x05\x12\"\n\x04\x64\x61ta\x18\x02 \x01(\x0b\x32\x14.dbservice.TableData\"\xe2\x01\n\tPredicate\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12#\n\x02op\x18\x02 \x01(\x0e\x32\x17.dbservice.Predicate.Op\x12%\n\x05value\x18\x03 \x01(\x0b\x32\x16.google.protobuf.Value\x12$\n\x04high\x18\x04 \x01(\x0b\x32\x16.google.protobuf.Value\"S\n\x02Op\x12\x06\n\x02\x45Q\x10\x00\x12\x06\n\x02LT\x10\x01\x12\x06\n\x02GT\x10\x02\x12\x0b\n\x07\x42\x45TWEEN\x10\x03\x12\n\n\x06PREFIX\x10\x04\x12\x0b\n\x07IS_NULL\x10\x05\x12\x0f\n\x0bIS_NOT_NULL\x10\x06\"-\n\x07OrderBy\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12\x12\n\ndescending\x18\x02 \x01(\x08\"\x9b\x01\n\x0cQueryRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0f\n\x07\x63olumns\x18\x02 \x03(\t\x12#\n\x05where\x18\x03 \x03(\x0b\x32\x14.dbservice.Predicate\x12#\n\x07orderBy\x18\x04 \x03(\x0b\x32\x12.dbservice.OrderBy\x12\r\n\x05limit\x18\x05 \x01(\x05\x12\x0e\n\x06offset\x18\x06 \x01(\x05\"e\n\rQueryResponse\x12\"\n\x04\x64\x61ta\x18\x01 \x01(\x0b\x32\x14.dbservice.TableData\x12\x0c\n\x04rows\x18\x02 \x03(\x05\x12\x11\n\ttotalRows\x18\x03 \x01(\x05\x12\x0f\n\x07version\x18\x04 \x01(\x03\"\xa0\x01\n\x0b\x41ggregation\x12\x31\n\x08\x66unction\x18\x01 \x01(\x0e\x32\x1f.dbservice.Aggregation.Function\x12\x0e\n\x06\x63olumn\x18\x02 \x01(\t\"N\n\x08\x46unction\x12\t\n\x05\x43OUNT\x10\x00\x12\x07\n\x03SUM\x10\x01\x12\x07\n\x03MIN\x10\x02\x12\x07\n\x03MAX\x10\x03\x12\x08\n\x04MEAN\x10\x04\x12\x12\n\x0e\x43OUNT_DISTINCT\x10\x05\"d\n\x10\x41ggregateRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0f\n\x07groupBy\x18\x02 \x03(\t\x12,\n\x0c\x61ggregations\x18\x03 \x03(\x0b\x32\x16.dbservice.Aggregation\"7\n\x11\x41ggregateResponse\x12\"\n\x04\x64\x61ta\x18\x01 \x01(\x0b\x32\x14.dbservice.TableData\"\xad\x01\n\x1aSetUniqueConstraintRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\x12\x0f\n\x07\x63olumns\x18\x02 \x03(\t\x12\x44\n\nonConflict\x18\x03 \x01(\x0e\x32\x30.dbservice.SetUniqueConstraintRequest.OnConflict\"%\n\nOnConflict\x12\n\n\x06REJECT\x10\x00\x12\x0b\n\x07REPLACE\x10\x01\"0\n\x1b\x44ropUniqueConstraintRequest\x12\x11\n\ttableName\x18\x01 \x01(\t\"K\n\x0cWatchRequest\x12\x0e\n\x06tables\x18\x01 \x03(\t\x12\x14\n\x0c\x66romSequence\x18\x02 \x01(\x03\x12\x15\n\rskipSnapshots\x18\x03 \x01(\x08\"\xe7\x01\n\x0b\x43hangeEvent\x12\x10\n\x08sequence\x18\x01 \x01(\x03\x12\x11\n\ttableName\x18\x02 \x01(\t\x12)\n\x04kind\x18\x03 \x01(\x0e\x32\x1b.dbservice.ChangeEvent.Kind\x12\"\n\x04\x64\x61ta\x18\x04 \x01(\x0b\x32\x14.dbservice.TableData\x12\x0e\n\x06rowIds\x18\x05 \x03(\x03\"T\n\x04Kind\x12\x0c\n\x08SNAPSHOT\x10\x00\x12\n\n\x06INSERT\x10\x01\x12\n\n\x06UPDATE\x10\x02\x12\n\n\x06\x44\x45LETE\x10\x03\x12\n\n\x06SCHEMA\x10\x04\x12\x0e\n\nDROP_TABLE\x10\x05\"J\n\x0eProfileRequest\x12\x0f\n\x07seconds\x18\x01 \x01(\x01\x12\x12\n\nintervalMs\x18\x02 \x01(\x05\x12\x13\n\x0bincludeIdle\x18\x03 \x01(\x08\";\n\x0fProfileResponse\x12\x17\n\x0f\x63ollapsedStacks\x18\x01 \x01(\t\x12\x0f\n\x07samples\x18\x02 \x01(\x05\x32\xc7\x0f\n\x11MyDatabaseService\x12\x44\n\x0e\x43reateDatabase\x12 .dbservice.CreateDatabaseRequest\x1a\x10.dbservice.Empty\x12\x38\n\x08\x41\x64\x64Table\x12\x1a.dbservice.AddTableRequest\x1a\x10.dbservice.Empty\x12>\n\x0bRemoveTable\x12\x1d.dbservice.RemoveTableRequest\x1a\x10.dbservice.Empty\x12\x43\n\tAddNewRow\x12\x1b.dbservice.AddNewRowRequest\x1a\x19.dbservice.AddRowResponse\x12=\n\x06\x41\x64\x64Row\x12\x18.dbservice.AddRowRequest\x1a\x19.dbservice.AddRowResponse\x12:\n\tDeleteRow\x12\x1b.dbservice.DeleteRowRequest\x1a\x10.dbservice.Empty\x12:\n\tAddColumn\x12\x1b.dbservice.AddColumnRequest\x1a\x10.dbservice.Empty\x12@\n\x0c\x44\x65leteColumn\x12\x1e.dbservice.DeleteColumnRequest\x1a\x10.dbservice.Empty\x12H\n\x10RemoveDuplicates\x12\".dbservice.RemoveDuplicatesRequest\x1a\x10.dbservice.Empty\x12R\n\x0eGetColumnsInfo\x12 .dbservice.GetColumnsInfoRequest\x1a\x1e.dbservice.ColumnsInfoResponse\x12\x38\n\tGetTables\x12\x10.dbservice.Empty\x1a\x19.dbservice.TablesResponse\x12O\n\x0c\x44isplayTable\x12\x1e.dbservice.DisplayTableRequest\x1a\x1f.dbservice.DisplayTableResponse\x12X\n\x0fUpdateTableCell\x12!.dbservice.UpdateTableCellRequest\x1a\".dbservice.UpdateTableCellResponse\x12N\n\x0bStreamTable\x12\x1d.dbservice.StreamTableRequest\x1a\x1e.dbservice.StreamTableResponse0\x01\x12\x44\n\x0cGetTableData\x12\x1e.dbservice.DisplayTableRequest\x1a\x14.dbservice.TableData\x12L\n\x0b\x42\x61tchMutate\x12\x1d.dbservice.BatchMutateRequest\x1a\x1e.dbservice.BatchMutateResponse\x12T\n\x11\x42\x61tchMutateStream\x12\x1d.dbservice.BatchMutateRequest\x1a\x1e.dbservice.BatchMutateResponse(\x01\x12\x45\n\x08\x42ulkLoad\x12\x1a.dbservice.BulkLoadRequest\x1a\x1b.dbservice.BulkLoadResponse(\x01\x12Q\n\x0f\x41ppendTableData\x12!.dbservice.AppendTableDataRequest\x1a\x1b.dbservice.BulkLoadResponse\x12>\n\x0b\x43reateIndex\x12\x1d.dbservice.CreateIndexRequest\x1a\x10.dbservice.Empty\x12:\n\tDropIndex\x12\x1b.dbservice.DropIndexRequest\x1a\x10.dbservice.Empty\x12=\n\x06Lookup\x12\x18.dbservice.LookupRequest\x1a\x19.dbservice.LookupResponse\x12:\n\x05Query\x12\x17.dbservice.QueryRequest\x1a\x18.dbservice.QueryResponse\x12\x46\n\tAggregate\x12\x1b.dbservice.AggregateRequest\x1a\x1c.dbservice.AggregateResponse\x12N\n\x13SetUniqueConstraint\x12%.dbservice.SetUniqueConstraintRequest\x1a\x10.dbservice.Empty\x12P\n\x14\x44ropUniqueConstraint\x12&.dbservice.DropUniqueConstraintRequest\x1a\x10.dbservice.Empty\x12:\n\x05Watch\x12\x17.dbservice.WatchRequest\x1a\x16.dbservice.ChangeEvent0\x01\x12@\n\x07Profile\x12\x19.dbservice.ProfileRequest\x1a\x1a.dbservice.ProfileResponseB\x0f\xaa\x02\x0cGrpcService1b\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -52,28 +52,104 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['_ADDNEWROWREQUEST']._serialized_end=702
   _globals['_ADDROWREQUEST']._serialized_start=704
   _globals['_ADDROWREQUEST']._serialized_end=778
-  _globals['_DELETEROWREQUEST']._serialized_start=780
-  _globals['_DELETEROWREQUEST']._serialized_end=835
-  _globals['_ADDCOLUMNREQUEST']._serialized_start=837
-  _globals['_ADDCOLUMNREQUEST']._serialized_end=916
-  _globals['_DELETECOLUMNREQUEST']._serialized_start=918
-  _globals['_DELETECOLUMNREQUEST']._serialized_end=978
-  _globals['_REMOVEDUPLICATESREQUEST']._serialized_start=980
-  _globals['_REMOVEDUPLICATESREQUEST']._serialized_end=1024
-  _globals['_GETCOLUMNSINFOREQUEST']._serialized_start=1026
-  _globals['_GETCOLUMNSINFOREQUEST']._serialized_end=1068
-  _globals['_COLUMNSINFORESPONSE']._serialized_start=1070
-  _globals['_COLUMNSINFORESPONSE']._serialized_end=1134
-  _globals['_TABLESRESPONSE']._serialized_start=1136
-  _globals['_TABLESRESPONSE']._serialized_end=1168
-  _globals['_DISPLAYTABLEREQUEST']._serialized_start=1170
-  _globals['_DISPLAYTABLEREQUEST']._serialized_end=1210
-  _globals['_DISPLAYTABLERESPONSE']._serialized_start=1212
-  _globals['_DISPLAYTABLERESPONSE']._serialized_end=1273
-  _globals['_UPDATETABLECELLREQUEST']._serialized_start=1275
-  _globals['_UPDATETABLECELLREQUEST']._serialized_end=1363
-  _globals['_UPDATETABLECELLRESPONSE']._serialized_start=1365
-  _globals['_UPDATETABLECELLRESPONSE']._serialized_end=1407
-  _globals['_MYDATABASESERVICE']._serialized_start=1410
-  _globals['_MYDATABASESERVICE']._serialized_end=2308
+  _globals['_ADDROWRESPONSE']._serialized_start=780
+  _globals['_ADDROWRESPONSE']._serialized_end=811
+  _globals['_DELETEROWREQUEST']._serialized_start=813
+  _globals['_DELETEROWREQUEST']._serialized_end=883
+  _globals['_ADDCOLUMNREQUEST']._serialized_start=885
+  _globals['_ADDCOLUMNREQUEST']._serialized_end=964
+  _globals['_DELETECOLUMNREQUEST']._serialized_start=966
+  _globals['_DELETECOLUMNREQUEST']._serialized_end=1026
+  _globals['_REMOVEDUPLICATESREQUEST']._serialized_start=1028
+  _globals['_REMOVEDUPLICATESREQUEST']._serialized_end=1089
+  _globals['_GETCOLUMNSINFOREQUEST']._serialized_start=1091
+  _globals['_GETCOLUMNSINFOREQUEST']._serialized_end=1133
+  _globals['_COLUMNSINFORESPONSE']._serialized_start=1135
+  _globals['_COLUMNSINFORESPONSE']._serialized_end=1199
+  _globals['_TABLESRESPONSE']._serialized_start=1201
+  _globals['_TABLESRESPONSE']._serialized_end=1251
+  _globals['_DISPLAYTABLEREQUEST']._serialized_start=1253
+  _globals['_DISPLAYTABLEREQUEST']._serialized_end=1317
+  _globals['_DISPLAYTABLERESPONSE']._serialized_start=1320
+  _globals['_DISPLAYTABLERESPONSE']._serialized_end=1478
+  _globals['_UPDATETABLECELLREQUEST']._serialized_start=1480
+  _globals['_UPDATETABLECELLREQUEST']._serialized_end=1583
+  _globals['_UPDATETABLECELLRESPONSE']._serialized_start=1585
+  _globals['_UPDATETABLECELLRESPONSE']._serialized_end=1627
+  _globals['_STREAMTABLEREQUEST']._serialized_start=1629
+  _globals['_STREAMTABLEREQUEST']._serialized_end=1720
+  _globals['_STREAMTABLERESPONSE']._serialized_start=1723
+  _globals['_STREAMTABLERESPONSE']._serialized_end=1870
+  _globals['_COLUMNDATA']._serialized_start=1872
+  _globals['_COLUMNDATA']._serialized_end=1965
+  _globals['_TABLEDATA']._serialized_start=1968
+  _globals['_TABLEDATA']._serialized_end=2096
+  _globals['_INSERTROWMUTATION']._serialized_start=2098
+  _globals['_INSERTROWMUTATION']._serialized_end=2157
+  _globals['_DELETEROWMUTATION']._serialized_start=2159
+  _globals['_DELETEROWMUTATION']._serialized_end=2206
+  _globals['_UPDATECELLMUTATION']._serialized_start=2208
+  _globals['_UPDATECELLMUTATION']._serialized_end=2288
+  _globals['_MUTATION']._serialized_start=2291
+  _globals['_MUTATION']._serialized_end=2452
+  _globals['_BATCHMUTATEREQUEST']._serialized_start=2454
+  _globals['_BATCHMUTATEREQUEST']._serialized_end=2533
+  _globals['_MUTATIONRESULT']._serialized_start=2535
+  _globals['_MUTATIONRESULT']._serialized_end=2611
+  _globals['_BATCHMUTATERESPONSE']._serialized_start=2613
+  _globals['_BATCHMUTATERESPONSE']._serialized_end=2695
+  _globals['_BULKLOADREQUEST']._serialized_start=2698
+  _globals['_BULKLOADREQUEST']._serialized_end=2865
+  _globals['_BULKLOADREQUEST_FORMAT']._serialized_start=2821
+  _globals['_BULKLOADREQUEST_FORMAT']._serialized_end=2865
+  _globals['_BULKLOADRESPONSE']._serialized_start=2867
+  _globals['_BULKLOADRESPONSE']._serialized_end=2945
+  _globals['_APPENDTABLEDATAREQUEST']._serialized_start=2947
+  _globals['_APPENDTABLEDATAREQUEST']._serialized_end=3026
+  _globals['_CREATEINDEXREQUEST']._serialized_start=3029
+  _globals['_CREATEINDEXREQUEST']._serialized_end=3168
+  _globals['_CREATEINDEXREQUEST_KIND']._serialized_start=3140
+  _globals['_CREATEINDEXREQUEST_KIND']._serialized_end=3168
+  _globals['_DROPINDEXREQUEST']._serialized_start=3170
+  _globals['_DROPINDEXREQUEST']._serialized_end=3227
+  _globals['_LOOKUPREQUEST']._serialized_start=3230
+  _globals['_LOOKUPREQUEST']._serialized_end=3455
+  _globals['_LOOKUPRESPONSE']._serialized_start=3457
+  _globals['_LOOKUPRESPONSE']._serialized_end=3523
+  _globals['_PREDICATE']._serialized_start=3526
+  _globals['_PREDICATE']._serialized_end=3752
+  _globals['_PREDICATE_OP']._serialized_start=3669
+  _globals['_PREDICATE_OP']._serialized_end=3752
+  _globals['_ORDERBY']._serialized_start=3754
+  _globals['_ORDERBY']._serialized_end=3799
+  _globals['_QUERYREQUEST']._serialized_start=3802
+  _globals['_QUERYREQUEST']._serialized_end=3957
+  _globals['_QUERYRESPONSE']._serialized_start=3959
+  _globals['_QUERYRESPONSE']._serialized_end=4060
+  _globals['_AGGREGATION']._serialized_start=4063
+  _globals['_AGGREGATION']._serialized_end=4223
+  _globals['_AGGREGATION_FUNCTION']._serialized_start=4145
+  _globals['_AGGREGATION_FUNCTION']._serialized_end=4223
+  _globals['_AGGREGATEREQUEST']._serialized_start=4225
+  _globals['_AGGREGATEREQUEST']._serialized_end=4325
+  _globals['_AGGREGATERESPONSE']._serialized_start=4327
+  _globals['_AGGREGATERESPONSE']._serialized_end=4382
+  _globals['_SETUNIQUECONSTRAINTREQUEST']._serialized_start=4385
+  _globals['_SETUNIQUECONSTRAINTREQUEST']._serialized_end=4558
+  _globals['_SETUNIQUECONSTRAINTREQUEST_ONCONFLICT']._serialized_start=4521
+  _globals['_SETUNIQUECONSTRAINTREQUEST_ONCONFLICT']._serialized_end=4558
+  _globals['_DROPUNIQUECONSTRAINTREQUEST']._serialized_start=4560
+  _globals['_DROPUNIQUECONSTRAINTREQUEST']._serialized_end=4608
+  _globals['_WATCHREQUEST']._serialized_start=4610
+  _globals['_WATCHREQUEST']._serialized_end=4685
+  _globals['_CHANGEEVENT']._serialized_start=4688
+  _globals['_CHANGEEVENT']._serialized_end=4919
+  _globals['_CHANGEEVENT_KIND']._serialized_start=4835
+  _globals['_CHANGEEVENT_KIND']._serialized_end=4919
+  _globals['_PROFILEREQUEST']._serialized_start=4921
+  _globals['_PROFILEREQUEST']._serialized_end=4995
+  _globals['_PROFILERESPONSE']._serialized_start=4997
+  _globals['_PROFILERESPONSE']._serialized_end=5056
+  _globals['_MYDATABASESERVICE']._serialized_start=5059
+  _globals['_MYDATABASESERVICE']._serialized_end=7050
 # @@protoc_insertion_point(module_scope)
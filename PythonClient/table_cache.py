@@ -0,0 +1,211 @@
+import bisect
+import collections
+from my_database_pb2 import ChangeEvent, QueryRequest
+from table_watch import decode_rows
+
+# Rows are read from the server in pages of this many rows.
+PAGE_ROWS = 500
+# The cache keeps the schemas of at most MAX_TABLES tables and at most
+# MAX_PAGES pages of rows between them, dropping the ones used longest ago,
+# so its size does not depend on how big the tables are.
+MAX_TABLES = 8
+MAX_PAGES = 200
+
+
+# What the cache knows about one table: its columns, how many rows it has,
+# and the pages of rows read so far. Every page holds the row ids and rows of
+# PAGE_ROWS consecutive positions. version is the feed sequence the table is
+# known to be current as of, read_version the one row_count was read at and
+# applied_version the one of the last Watch event applied to it.
+class CachedTable:
+    def __init__(self, column_info, row_count, version):
+        self.column_info = column_info
+        self.row_count = row_count
+        self.version = version
+        self.read_version = version
+        self.applied_version = 0
+        self.pages = {}
+
+    @property
+    def column_names(self):
+        return [column_name for column_name, _ in self.column_info]
+
+    # Returns the row id and values at a position, or None if its page has not
+    # been read.
+    def row(self, position):
+        page = self.pages.get(position // PAGE_ROWS)
+        if page is None:
+            return None
+        row_ids, rows = page
+        offset = position % PAGE_ROWS
+        if offset >= len(rows):
+            return None
+        return row_ids[offset], rows[offset]
+
+    # Returns the values of the row with the given id, or None if it is not
+    # on a page that has been read. The list is the cached row itself.
+    def find(self, row_id):
+        for row_ids, rows in self.pages.values():
+            if row_ids and row_ids[0] <= row_id <= row_ids[-1]:
+                offset = bisect.bisect_left(row_ids, row_id)
+                return rows[offset] if row_ids[offset] == row_id else None
+        return None
+
+    # Row ids grow with position, so a change to rows with ids of at least
+    # first_id can only move rows on pages that end at or past it. The last
+    # page also gets any rows appended at the end.
+    def stale_pages(self, first_id):
+        last_page = (self.row_count - 1) // PAGE_ROWS if self.row_count else 0
+        return [page for page, (row_ids, _) in self.pages.items() if page >= last_page or not row_ids or row_ids[-1] >= first_id]
+
+    def update(self, row_ids, rows):
+        for row_id, row in zip(row_ids, rows):
+            cached = self.find(row_id)
+            if cached is not None:
+                cached[:] = row
+
+
+# Keeps the pages of tables recently used. The cache does not call the
+# server itself: missing_pages says which pages a range of rows needs,
+# page_request builds the Query that reads one and store_page files the
+# answer, so the caller decides how and on which thread to make the calls
+# (fetch_rows simply makes them in turn). Watch events for cached tables (see
+# TableWatcher with skip_snapshots) are applied in place where they can be,
+# and otherwise drop the pages they make stale, so they are read again the
+# next time they are shown.
+class TableCache:
+    def __init__(self, stub=None, max_tables=MAX_TABLES, max_pages=MAX_PAGES):
+        self.stub = stub
+        self.max_tables = max_tables
+        self.max_pages = max_pages
+        self.tables = collections.OrderedDict()
+        self.pages = collections.OrderedDict()
+        self.watched = set()
+
+    def page_request(self, table_name, page):
+        return QueryRequest(tableName=table_name, offset=page * PAGE_ROWS, limit=PAGE_ROWS)
+
+    # The pages the positions from start to stop are on that are not cached.
+    # Only the first one is known to be needed for a table not read yet.
+    def missing_pages(self, table_name, start, stop):
+        table = self.tables.get(table_name)
+        if table is None:
+            return [start // PAGE_ROWS]
+        self.tables.move_to_end(table_name)
+        stop = min(stop, table.row_count)
+        missing = []
+        for page in range(start // PAGE_ROWS, (stop + PAGE_ROWS - 1) // PAGE_ROWS):
+            if page in table.pages:
+                self.pages.move_to_end((table_name, page))
+            else:
+                missing.append(page)
+        return missing
+
+    # Returns (row id, values) for the positions from start to stop, with None
+    # for the rows on pages that are not cached.
+    def rows(self, table_name, start, stop):
+        table = self.tables.get(table_name)
+        if table is None:
+            return []
+        return [table.row(position) for position in range(start, min(stop, table.row_count))]
+
+    # Reads whatever the rows need and returns them.
+    def fetch_rows(self, table_name, start, stop):
+        missing = self.missing_pages(table_name, start, stop)
+        while missing:
+            for page in missing:
+                self.store_page(table_name, page, self.stub.Query(self.page_request(table_name, page)))
+            missing = self.missing_pages(table_name, start, stop)
+        return self.rows(table_name, start, stop)
+
+    # Files the QueryResponse read for a page. A page read before the last
+    # change the watch applied to the table may lack that change, so it is
+    # dropped and has to be read again; returns whether it was kept.
+    def store_page(self, table_name, page, response):
+        table = self.tables.get(table_name)
+        if table is not None and response.version < table.applied_version:
+            return False
+        column_info = [(column.name, column.type) for column in response.data.columns]
+        if table is None or table.column_info != column_info:
+            self._drop_table(table_name)
+            table = CachedTable(column_info, response.totalRows, response.version)
+            self.tables[table_name] = table
+        if response.version >= table.read_version:
+            table.row_count = response.totalRows
+            table.read_version = response.version
+        table.version = max(table.version, response.version)
+        table.pages[page] = (list(response.data.rowIds), decode_rows(column_info, response.data))
+        self.pages[(table_name, page)] = None
+        self.pages.move_to_end((table_name, page))
+        self._evict()
+        return True
+
+    def _evict(self):
+        while len(self.pages) > self.max_pages:
+            (table_name, page), _ = self.pages.popitem(last=False)
+            self.tables[table_name].pages.pop(page, None)
+        while len(self.tables) > self.max_tables:
+            table_name = next(iter(self.tables))
+            self._drop_table(table_name)
+
+    def _drop_table(self, table_name):
+        table = self.tables.pop(table_name, None)
+        if table is not None:
+            for page in table.pages:
+                del self.pages[(table_name, page)]
+
+    def _drop_pages(self, table_name, pages):
+        table = self.tables[table_name]
+        for page in pages:
+            del table.pages[page]
+            del self.pages[(table_name, page)]
+
+    # Forgets tables that are no longer on the server and the pages of tables
+    # that changed since they were read. versions are the ones GetTables
+    # reports for table_names.
+    def retain(self, table_names, versions):
+        current = dict(zip(table_names, versions or [0] * len(table_names)))
+        for table_name in list(self.tables):
+            if table_name not in current:
+                self._drop_table(table_name)
+            elif current[table_name] > self.tables[table_name].version and table_name not in self.watched:
+                self._drop_table(table_name)
+
+    # Returns the name of the table the event changed, or None if it marked
+    # every watched table as possibly stale.
+    def apply(self, event):
+        table_name = event.tableName
+        if event.kind == ChangeEvent.DROP_TABLE and not table_name:
+            for table_name in self.watched:
+                if table_name in self.tables:
+                    self._drop_pages(table_name, list(self.tables[table_name].pages))
+                    self.tables[table_name].applied_version = event.sequence
+            return None
+        table = self.tables.get(table_name)
+        if table is None:
+            return table_name
+        if event.kind == ChangeEvent.DROP_TABLE:
+            self._drop_table(table_name)
+            return table_name
+        # Changes from before the last page read are already counted in
+        # row_count, but may still have moved rows on pages read earlier.
+        counted = event.sequence <= table.read_version
+        if event.kind == ChangeEvent.UPDATE:
+            table.update(event.data.rowIds, decode_rows(table.column_info, event.data))
+        elif event.kind == ChangeEvent.INSERT:
+            self._drop_pages(table_name, table.stale_pages(event.data.rowIds[0]))
+            if not counted:
+                table.row_count += event.data.rowCount
+        elif event.kind == ChangeEvent.DELETE:
+            self._drop_pages(table_name, table.stale_pages(min(event.rowIds)))
+            if not counted:
+                table.row_count -= len(event.rowIds)
+        else:
+            # A new schema, or a table created again under the same name.
+            self._drop_pages(table_name, list(table.pages))
+            table.column_info = [(column.name, column.type) for column in event.data.columns]
+            if event.kind == ChangeEvent.SNAPSHOT:
+                table.row_count = event.data.rowCount
+        table.applied_version = event.sequence
+        table.version = max(table.version, event.sequence)
+        return table_name
@@ -0,0 +1,72 @@
+import logging
+import threading
+import grpc
+from my_database_pb2 import WatchRequest
+
+# How long to wait before reconnecting a watch the server dropped.
+RECONNECT_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def decode_column(column_type, column_data, row_count):
+    if column_type == 'System.Int32':
+        values = list(column_data.intValues)
+    elif column_type == 'System.Double':
+        values = list(column_data.doubleValues)
+    else:
+        values = list(column_data.stringValues)
+    values.extend([None] * (row_count - len(values)))
+    if column_data.validity:
+        validity = format(int.from_bytes(column_data.validity, 'little'), 'b').zfill(row_count)[::-1]
+        values = [value if flag == '1' else None for value, flag in zip(values, validity)]
+    return values
+
+
+def decode_rows(column_info, table_data):
+    if not column_info:
+        return [[] for _ in range(table_data.rowCount)]
+    columns = [decode_column(column_type, column_data, table_data.rowCount) for (_, column_type), column_data in zip(column_info, table_data.columnData)]
+    return [list(row) for row in zip(*columns)]
+
+
+# Runs a Watch call on a background thread and hands every event to the
+# callback, reconnecting from the last sequence it saw whenever the stream
+# breaks. Each break is handed to on_error as the grpc.RpcError, or logged as
+# a warning if there is no on_error. Both callbacks run on the watch thread.
+class TableWatcher:
+    def __init__(self, stub, callback, tables=(), sequence=0, skip_snapshots=False, on_error=None):
+        self.stub = stub
+        self.callback = callback
+        self.on_error = on_error
+        self.tables = list(tables)
+        self.sequence = sequence
+        self.skip_snapshots = skip_snapshots
+        self.call = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        call = self.call
+        if call is not None:
+            call.cancel()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.call = self.stub.Watch(WatchRequest(tables=self.tables, fromSequence=self.sequence, skipSnapshots=self.skip_snapshots))
+            try:
+                for event in self.call:
+                    self.sequence = max(self.sequence, event.sequence)
+                    self.callback(event)
+            except grpc.RpcError as e:
+                if self.stopped.is_set():
+                    return
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    logger.warning('Watch of %s interrupted: %s; reconnecting', self.tables or 'all tables', e.code())
+            self.stopped.wait(RECONNECT_SECONDS)
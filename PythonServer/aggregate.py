@@ -0,0 +1,215 @@
+from my_database_pb2 import Aggregation
+from query import find_column
+from storage import DynamicTable, is_dictionary_type
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Key spaces up to this size are renumbered by counting rather than sorting.
+DENSE_KEYS = 1 << 22
+
+
+def aggregate_name(function, column_name):
+    return f'{Aggregation.Function.Name(function).lower()}({column_name or "*"})'
+
+
+def aggregate_type(function, column_type):
+    if function in (Aggregation.COUNT, Aggregation.COUNT_DISTINCT):
+        return 'System.Int32'
+    if function in (Aggregation.SUM, Aggregation.MEAN):
+        return 'System.Double'
+    return column_type
+
+
+# The row-at-a-time fallback used when numpy is not installed.
+def python_aggregate(function, group_ids, group_count, values):
+    if values is None:
+        counts = [0] * group_count
+        for group_id in group_ids:
+            counts[group_id] += 1
+        return counts
+    buckets = [[] for _ in range(group_count)]
+    for group_id, value in zip(group_ids, values):
+        if value is not None:
+            buckets[group_id].append(value)
+    if function == Aggregation.COUNT:
+        return [len(bucket) for bucket in buckets]
+    if function == Aggregation.COUNT_DISTINCT:
+        return [len(set(bucket)) for bucket in buckets]
+    if function == Aggregation.SUM:
+        return [float(sum(bucket)) if bucket else None for bucket in buckets]
+    if function == Aggregation.MEAN:
+        return [sum(bucket) / len(bucket) if bucket else None for bucket in buckets]
+    if function == Aggregation.MIN:
+        return [min(bucket) if bucket else None for bucket in buckets]
+    return [max(bucket) if bucket else None for bucket in buckets]
+
+
+# Values and validity of the first row_count rows as numpy arrays. Slicing an
+# array copies it, so writers can keep appending to the live column while
+# numpy holds the buffer; a column mapped from a checkpoint is not copied.
+def column_arrays(column, row_count):
+    dtype = np.float64 if column.typecode == 'd' else np.int32
+    if row_count == 0:
+        return np.zeros(0, dtype), np.zeros(0, bool)
+    values = np.frombuffer(column.data[:row_count], dtype=dtype)
+    bits = np.frombuffer(bytes(column.valid.bits[:(row_count + 7) >> 3]), dtype=np.uint8)
+    valid = np.unpackbits(bits, bitorder='little')[:row_count].astype(bool)
+    return values, valid
+
+
+# Renumbers keys from [0, space) to 0..count-1, keeping their order.
+def compact(keys, space):
+    if space <= DENSE_KEYS:
+        present = np.zeros(space, bool)
+        present[keys] = True
+        remap = np.cumsum(present) - 1
+        return remap[keys], int(remap[-1]) + 1
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    return inverse.reshape(-1), len(uniques)
+
+
+# Gives every row a small integer standing for its key, with one extra code
+# for null, and returns the codes and how many there can be.
+def key_codes(column, values, valid):
+    if column.dictionary is not None:
+        null_code = len(column.dictionary)
+        return np.where(valid, values, null_code).astype(np.int64), null_code + 1
+    present = values[valid]
+    if len(present) == 0:
+        return np.zeros(len(values), np.int64), 1
+    if column.typecode == 'i':
+        low = int(present.min())
+        span = int(present.max()) - low + 1
+        if span <= DENSE_KEYS:
+            return np.where(valid, values.astype(np.int64) - low, span), span + 1
+    uniques, inverse = np.unique(present, return_inverse=True)
+    codes = np.full(len(values), len(uniques), np.int64)
+    codes[valid] = inverse.reshape(-1)
+    return codes, len(uniques) + 1
+
+
+def numpy_aggregate(function, group_ids, group_count, column, values, valid):
+    if column is None:
+        return np.bincount(group_ids, minlength=group_count).tolist()
+    group_ids = group_ids[valid]
+    values = values[valid]
+    counts = np.bincount(group_ids, minlength=group_count)
+    if function == Aggregation.COUNT:
+        return counts.tolist()
+    if function == Aggregation.COUNT_DISTINCT:
+        if column.dictionary is None:
+            _, values = np.unique(values, return_inverse=True)
+            values = values.reshape(-1)
+        if len(values) == 0:
+            return counts.tolist()
+        # Sorting the (group, value) pairs and counting where they change is
+        # cheaper than hashing them.
+        width = int(values.max()) + 1
+        pairs = np.sort(group_ids * width + values.astype(np.int64))
+        first = np.empty(len(pairs), bool)
+        first[0] = True
+        np.not_equal(pairs[1:], pairs[:-1], out=first[1:])
+        return np.bincount(pairs[first] // width, minlength=group_count).tolist()
+    if function in (Aggregation.SUM, Aggregation.MEAN):
+        results = np.bincount(group_ids, weights=values, minlength=group_count)
+        if function == Aggregation.MEAN:
+            results = results / np.maximum(counts, 1)
+    else:
+        # Strings are compared through their rank in the sorted dictionary.
+        if column.dictionary is not None:
+            dictionary = list(column.dictionary)
+            order = sorted(range(len(dictionary)), key=dictionary.__getitem__)
+            rank = np.empty(len(dictionary), np.int64)
+            rank[order] = np.arange(len(dictionary))
+            values = rank[values]
+        reduce = np.minimum if function == Aggregation.MIN else np.maximum
+        results = np.zeros(group_count, values.dtype)
+        if len(values):
+            results[:] = values.max() if function == Aggregation.MIN else values.min()
+            reduce.at(results, group_ids, values)
+        if column.dictionary is not None:
+            results = [dictionary[order[position]] for position in results.tolist()]
+            return [value if count else None for value, count in zip(results, counts.tolist())]
+    return [value if count else None for value, count in zip(results.tolist(), counts.tolist())]
+
+
+def iter_keys(snapshot, group_indexes, row_count):
+    if not group_indexes:
+        return iter([()] * row_count)
+    return zip(*(snapshot.columns[i].values(0, row_count) for i in group_indexes))
+
+
+# A validated AggregateRequest. Runs over a snapshot and returns the result as
+# a small DynamicTable: the group-by columns followed by one column per
+# aggregation, one row per group, ordered by the group values.
+class AggregatePlan:
+    def __init__(self, request, column_info):
+        column_names = [column_name for column_name, _ in column_info]
+        self.group_indexes = [find_column(column_names, column_name) for column_name in request.groupBy]
+        self.aggregations = []
+        result_info = [column_info[i] for i in self.group_indexes]
+        for aggregation in request.aggregations:
+            function_name = Aggregation.Function.Name(aggregation.function)
+            column_index = None
+            column_type = None
+            if aggregation.column:
+                column_index = find_column(column_names, aggregation.column)
+                column_type = column_info[column_index][1]
+            elif aggregation.function != Aggregation.COUNT:
+                raise ValueError(f'{function_name} needs a column')
+            if aggregation.function in (Aggregation.SUM, Aggregation.MEAN) and is_dictionary_type(column_type):
+                raise ValueError(f'{function_name} needs a numeric column, "{aggregation.column}" is {column_type}')
+            self.aggregations.append((aggregation.function, column_index))
+            result_info.append((aggregate_name(aggregation.function, aggregation.column), aggregate_type(aggregation.function, column_type)))
+        self.result_table = DynamicTable(result_info)
+
+    def run(self, snapshot):
+        if np is not None:
+            groups, results = self._run_numpy(snapshot)
+        else:
+            groups, results = self._run_python(snapshot)
+        order = sorted(range(len(groups)), key=lambda group: [(value is not None, value) for value in groups[group]])
+        columns = [[groups[group][i] for group in order] for i in range(len(self.group_indexes))]
+        columns.extend([values[group] for group in order] for values in results)
+        self.result_table.extend_columns(columns)
+        return self.result_table
+
+    def _run_python(self, snapshot):
+        row_count = len(snapshot)
+        keys = list(iter_keys(snapshot, self.group_indexes, row_count))
+        groups = {} if self.group_indexes else {(): 0}
+        for key in keys:
+            groups.setdefault(key, len(groups))
+        group_ids = [groups[key] for key in keys]
+        results = []
+        for function, column_index in self.aggregations:
+            values = snapshot.columns[column_index].values(0, row_count) if column_index is not None else None
+            results.append(python_aggregate(function, group_ids, len(groups), values))
+        return list(groups), results
+
+    def _run_numpy(self, snapshot):
+        row_count = len(snapshot)
+        arrays = {}
+        for column_index in self.group_indexes + [column_index for _, column_index in self.aggregations]:
+            if column_index is not None and column_index not in arrays:
+                arrays[column_index] = column_arrays(snapshot.columns[column_index], row_count)
+        group_ids = np.zeros(row_count, np.int64)
+        group_count = 1
+        for column_index in self.group_indexes:
+            codes, cardinality = key_codes(snapshot.columns[column_index], *arrays[column_index])
+            group_ids, group_count = compact(group_ids * cardinality + codes, group_count * cardinality)
+        groups = [()]
+        if self.group_indexes:
+            # Any row of a group can stand for it; the last write wins.
+            representatives = np.empty(group_count, np.int64)
+            representatives[group_ids] = np.arange(row_count)
+            groups = [tuple(snapshot.columns[i].get(row) for i in self.group_indexes) for row in representatives.tolist()]
+        results = []
+        for function, column_index in self.aggregations:
+            column = snapshot.columns[column_index] if column_index is not None else None
+            values, valid = arrays.get(column_index, (None, None))
+            results.append(numpy_aggregate(function, group_ids, group_count, column, values, valid))
+        return groups, results
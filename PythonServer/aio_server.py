@@ -0,0 +1,209 @@
+import asyncio
+import contextvars
+import functools
+import grpc
+from concurrent import futures
+from my_database_pb2 import DESCRIPTOR
+from my_database_pb2_grpc import add_MyDatabaseServiceServicer_to_server
+from server import KEEPALIVE_OPTIONS
+
+SERVICE = DESCRIPTOR.services_by_name['MyDatabaseService']
+# A streaming handler's messages are pulled from it in runs of up to this many
+# messages or bytes per executor hop, so that busy streams do not crowd the
+# unary calls out of the executor with a hop for every message.
+STREAM_PREFETCH_MESSAGES = 64
+STREAM_PREFETCH_BYTES = 256 << 10
+
+
+# Handed to the synchronous handlers instead of the grpc.aio context, which
+# must only be touched from the event loop. Status and compression settings
+# are recorded here and copied onto the real context once the handler is done.
+class CallContext:
+    def __init__(self, context):
+        self._context = context
+        self._code = None
+        self._details = None
+        self._compression = None
+        self.cancelled = False
+
+    def set_code(self, code):
+        self._code = code
+
+    def set_details(self, details):
+        self._details = details
+
+    def set_compression(self, compression):
+        self._compression = compression
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+    def is_active(self):
+        return not self.cancelled
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+    def apply(self):
+        if self._code is not None:
+            self._context.set_code(self._code)
+        if self._details is not None:
+            self._context.set_details(self._details)
+        if self._compression is not None:
+            self._context.set_compression(self._compression)
+
+
+# Lets a handler running on a worker thread pull messages from the async
+# request stream owned by the event loop.
+class RequestIterator:
+    def __init__(self, request_iterator, loop):
+        self._iterator = request_iterator.__aiter__()
+        self._loop = loop
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return asyncio.run_coroutine_threadsafe(self._iterator.__anext__(), self._loop).result()
+        except StopAsyncIteration:
+            raise StopIteration
+
+
+# The next run of messages from a streaming handler; empty once it is done.
+def take_messages(responses):
+    messages = []
+    size = 0
+    for response in responses:
+        messages.append(response)
+        size += response.ByteSize()
+        if len(messages) >= STREAM_PREFETCH_MESSAGES or size >= STREAM_PREFETCH_BYTES:
+            break
+    return messages
+
+
+# Advances a generator by one item. Returns (True, item), or (False, the
+# generator's return value) once it is done; StopIteration cannot cross an
+# executor future.
+def step(generator):
+    try:
+        return True, next(generator)
+    except StopIteration as stop:
+        return False, stop.value
+
+
+# Exposes the synchronous DatabaseService on a grpc.aio server. Calls wait on
+# the event loop, so idle and streaming clients cost no thread; only the time
+# actually spent in a handler runs on the executor, which keeps the loop
+# responsive while a handler waits on a table lock. Watch is served natively
+# (see below), since the synchronous one blocks its thread while idle.
+class AsyncDatabaseService:
+    def __init__(self, service, executor):
+        self.service = service
+        self.executor = executor
+        for method in SERVICE.methods:
+            if method.name == 'Watch':
+                continue
+            handler = getattr(service, method.name)
+            if method.server_streaming:
+                wrapper = self._stream_response(handler, method.client_streaming)
+            else:
+                wrapper = self._unary_response(handler, method.client_streaming)
+            setattr(self, method.name, wrapper)
+
+    # Handlers run in a copy of the call's context, so what the interceptors
+    # put there (the slow request log's trace) reaches them.
+    def _run(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(contextvars.copy_context().run, function, *args))
+
+    def _unary_response(self, handler, client_streaming):
+        async def call(request, context):
+            if client_streaming:
+                request = RequestIterator(request, asyncio.get_running_loop())
+            call_context = CallContext(context)
+            try:
+                return await self._run(handler, request, call_context)
+            finally:
+                call_context.apply()
+        return call
+
+    def _stream_response(self, handler, client_streaming):
+        async def call(request, context):
+            if client_streaming:
+                request = RequestIterator(request, asyncio.get_running_loop())
+            call_context = CallContext(context)
+            responses = handler(request, call_context)
+            try:
+                while True:
+                    messages = await self._run(take_messages, responses)
+                    if not messages:
+                        break
+                    for response in messages:
+                        yield response
+            finally:
+                call_context.cancelled = True
+                await self._run(responses.close)
+                call_context.apply()
+        return call
+
+    # The same stream as DatabaseService.Watch, but an idle watcher waits on
+    # the event loop: the feed wakes it through call_soon_threadsafe when one
+    # of its tables changes. Only building snapshots runs on the executor.
+    async def Watch(self, request, context):
+        feed = self.service.feed
+        table_names = set(request.tables)
+        loop = asyncio.get_running_loop()
+        published = asyncio.Event()
+
+        # A change published while the server shuts down may find the loop
+        # already closed; there is nobody left to tell then.
+        def listener():
+            try:
+                loop.call_soon_threadsafe(published.set)
+            except RuntimeError:
+                pass
+
+        after = feed.subscribe(listener, table_names)
+        try:
+            restart = not (request.fromSequence and feed.can_resume(request.fromSequence))
+            if not restart:
+                after = request.fromSequence
+            while True:
+                if restart:
+                    snapshots = self.service._watch_snapshots(table_names, request.skipSnapshots)
+                    try:
+                        more, value = await self._run(step, snapshots)
+                        while more:
+                            yield value
+                            more, value = await self._run(step, snapshots)
+                        after = value
+                    finally:
+                        await self._run(snapshots.close)
+                published.clear()
+                events = feed.poll(after)
+                restart = events is None
+                if restart:
+                    continue
+                if not events:
+                    await published.wait()
+                for event in events:
+                    after = event.sequence
+                    if not table_names or event.tableName in table_names:
+                        yield event
+        finally:
+            feed.unsubscribe(listener)
+
+
+async def serve(service, port=5031, max_workers=10, options=(), interceptors=(), compression=None):
+    server = grpc.aio.server(options=KEEPALIVE_OPTIONS + list(options), interceptors=interceptors, compression=compression)
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+    add_MyDatabaseServiceServicer_to_server(AsyncDatabaseService(service, executor), server)
+    server.add_insecure_port(f'[::]:{port}')
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,120 @@
+import argparse
+import os
+import random
+import time
+import zlib
+import grpc
+from my_database_pb2 import DisplayTableRequest
+from my_database_pb2_grpc import MyDatabaseServiceStub
+from bench_encoding import build_table, encode_struct, encode_typed, timed
+from benchmark import COLUMN_TYPES, MAX_MESSAGE_BYTES, create_table, make_columns
+from loadtest import free_port, percentile, start_server
+
+# zlib window bits of the two formats gRPC offers: gzip framing, and the
+# zlib framing gRPC calls deflate.
+WBITS = {'gzip': 31, 'deflate': 15}
+# zlib's default, which is also what gRPC compresses with.
+LEVEL = 6
+
+
+def compress(algorithm):
+    return lambda payload: zlib.compress(payload, LEVEL, WBITS[algorithm])
+
+
+def decompress(algorithm):
+    return lambda payload: zlib.decompress(payload, WBITS[algorithm])
+
+
+# User and system CPU time a process has used so far, in seconds. Linux only;
+# elsewhere the server's CPU is not reported.
+def process_cpu(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            fields = file.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+# Sizes and CPU cost of compressing one response of each encoding, and the
+# time it would take to send over a link of link_mbps, compressing and
+# decompressing included.
+def offline(args):
+    print(f'{"rows":>8} {"format":>7} {"codec":>8} {"bytes":>12} {"ratio":>6} {"comp ms":>8} {"decomp ms":>9} {"total ms":>9}')
+    for row_count in args.rows:
+        table = build_table(row_count, args.null_ratio)
+        for name, encode in (('struct', encode_struct), ('typed', encode_typed)):
+            payload = encode(table)
+            print(f'{row_count:>8} {name:>7} {"none":>8} {len(payload):>12} {1:>6.1f} {0:>8.1f} {0:>9.1f} {transfer_ms(len(payload), args.link_mbps):>9.1f}')
+            for algorithm in WBITS:
+                compressed, compress_time = timed(compress(algorithm), payload, args.repeat)
+                _, decompress_time = timed(decompress(algorithm), compressed, args.repeat)
+                total = compress_time * 1000 + decompress_time * 1000 + transfer_ms(len(compressed), args.link_mbps)
+                print(f'{row_count:>8} {name:>7} {algorithm:>8} {len(compressed):>12} {len(payload) / len(compressed):>6.1f} '
+                      f'{compress_time * 1000:>8.1f} {decompress_time * 1000:>9.1f} {total:>9.1f}')
+
+
+def transfer_ms(size, link_mbps):
+    return size * 8 / (link_mbps * 1000)
+
+
+# Reads a whole table from servers started with each --compression, and
+# reports the latency of a call and the CPU it costs the client and the
+# server. Over loopback the bandwidth saved does not show; the CPU does.
+def end_to_end(args):
+    columns = make_columns(args.columns)
+    print(f'{"rows":>8} {"method":>13} {"codec":>8} {"p50 ms":>8} {"client cpu ms":>13} {"server cpu ms":>13}')
+    for algorithm in ['none', *WBITS]:
+        port = free_port()
+        process = start_server('thread', port, args.max_workers, ['--compression', algorithm, '--compress-above-kb', str(args.compress_above_kb)])
+        try:
+            channel = grpc.insecure_channel(f'127.0.0.1:{port}', options=[('grpc.max_send_message_length', MAX_MESSAGE_BYTES), ('grpc.max_receive_message_length', MAX_MESSAGE_BYTES)])
+            grpc.channel_ready_future(channel).result(timeout=10)
+            stub = MyDatabaseServiceStub(channel)
+            rng = random.Random(args.seed)
+            for row_count in args.rows:
+                table_name = f'bench_{row_count}'
+                create_table(stub, table_name, columns, row_count, rng)
+                for method in ('DisplayTable', 'GetTableData'):
+                    call = getattr(stub, method)
+                    request = DisplayTableRequest(tableName=table_name)
+                    call(request)
+                    latencies = []
+                    client_started = time.process_time()
+                    server_started = process_cpu(process.pid)
+                    for _ in range(args.calls):
+                        started = time.perf_counter()
+                        call(request)
+                        latencies.append(time.perf_counter() - started)
+                    client_cpu = (time.process_time() - client_started) / args.calls
+                    server_finished = process_cpu(process.pid)
+                    server_cpu = f'{(server_finished - server_started) / args.calls * 1000:>13.1f}' if server_started is not None else f'{"-":>13}'
+                    print(f'{row_count:>8} {method:>13} {algorithm:>8} {percentile(latencies, 0.5) * 1000:>8.1f} {client_cpu * 1000:>13.1f} {server_cpu}')
+            channel.close()
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure what compressing table responses costs and saves.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--null-ratio', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--link-mbps', type=float, default=100, help='link speed the offline transfer times assume')
+    parser.add_argument('--end-to-end', action='store_true', help='also time calls against started servers')
+    parser.add_argument('--columns', nargs='+', choices=list(COLUMN_TYPES), default=['int', 'str', 'real', 'char'], help='column types of the end-to-end tables, in order')
+    parser.add_argument('--calls', type=int, default=20, help='calls timed per method in the end-to-end run')
+    parser.add_argument('--compress-above-kb', type=float, default=32)
+    parser.add_argument('--max-workers', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    offline(args)
+    if args.end_to_end:
+        print()
+        end_to_end(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import random
+import time
+from my_database_pb2 import DisplayTableResponse, TableData
+from storage import DynamicTable
+from encoding import encode_table_data, decode_table_data
+from server import struct_row
+
+COLUMNS = [
+    ('id', 'System.Int32'),
+    ('name', 'System.String'),
+    ('price', 'System.Double'),
+    ('grade', 'System.Char'),
+    ('quantity', 'System.Int32'),
+]
+
+
+def build_table(row_count, null_ratio):
+    rng = random.Random(42)
+    table = DynamicTable(COLUMNS)
+    for i in range(row_count):
+        values = [i, f'item-{rng.randrange(1000)}', rng.uniform(0, 1000), rng.choice('ABCDEF'), rng.randrange(-500, 500)]
+        table.add_row([None if j and rng.random() < null_ratio else value for j, value in enumerate(values)])
+    return table
+
+
+def encode_struct(table):
+    column_names = [column_name for column_name, _ in table.column_info]
+    return DisplayTableResponse(rows=[struct_row(column_names, row) for row in table.iter_rows()]).SerializeToString()
+
+
+def decode_struct(payload):
+    return [{key: value.string_value for key, value in row.fields.items()} for row in DisplayTableResponse.FromString(payload).rows]
+
+
+def encode_typed(table):
+    return encode_table_data(table).SerializeToString()
+
+
+def decode_typed(payload):
+    return decode_table_data(TableData.FromString(payload))
+
+
+def timed(function, argument, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Struct and typed columnar table encodings.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--null-ratio', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"rows":>8} {"format":>7} {"bytes":>12} {"bytes/row":>10} {"encode ms":>10} {"decode ms":>10}')
+    for row_count in args.rows:
+        table = build_table(row_count, args.null_ratio)
+        for name, encode, decode in (('struct', encode_struct, decode_struct), ('typed', encode_typed, decode_typed)):
+            payload, encode_time = timed(encode, table, args.repeat)
+            _, decode_time = timed(decode, payload, args.repeat)
+            print(f'{row_count:>8} {name:>7} {len(payload):>12} {len(payload) / max(row_count, 1):>10.1f} {encode_time * 1000:>10.1f} {decode_time * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
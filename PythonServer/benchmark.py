@@ -0,0 +1,353 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent import futures
+import grpc
+from google.protobuf import struct_pb2
+from my_database_pb2 import (AddColumnRequest, AddNewRowRequest, AddRowRequest, AddTableRequest, Aggregation, AggregateRequest, BatchMutateRequest, CreateIndexRequest,
+                             DeleteColumnRequest, DisplayTableRequest, Empty, GetColumnsInfoRequest, InsertRowMutation, LookupRequest, Mutation, QueryRequest,
+                             RemoveDuplicatesRequest, RemoveTableRequest, StreamTableRequest, TableInfo, UpdateTableCellRequest)
+from my_database_pb2_grpc import MyDatabaseServiceStub, add_MyDatabaseServiceServicer_to_server
+from loadtest import free_port, percentile, start_server
+
+COLUMN_TYPES = {
+    'int': 'System.Int32',
+    'real': 'System.Double',
+    'char': 'System.Char',
+    'str': 'System.String',
+}
+# Rows sent per BatchMutate while filling a table, small enough to stay under
+# the default message size limit for any column mix.
+FILL_BATCH_ROWS = 5000
+# Rows inserted by one call of the BatchMutate benchmark.
+BATCH_ROWS = 100
+# Rows read by one call of the Query benchmark.
+PAGE_ROWS = 100
+MAX_MESSAGE_BYTES = 256 << 20
+
+
+def make_columns(types):
+    return [(f'c{i}_{column_type}', COLUMN_TYPES[column_type]) for i, column_type in enumerate(types)]
+
+
+def random_text(column_type, rng):
+    if column_type == 'System.Int32':
+        return str(rng.randrange(-1000000, 1000000))
+    if column_type == 'System.Double':
+        return repr(rng.uniform(-1000, 1000))
+    if column_type == 'System.Char':
+        return rng.choice('ABCDEFGH')
+    return f'text-{rng.randrange(100000)}'
+
+
+def random_value(column_type, rng):
+    text = random_text(column_type, rng)
+    if column_type in ('System.Int32', 'System.Double'):
+        return struct_pb2.Value(number_value=float(text))
+    return struct_pb2.Value(string_value=text)
+
+
+def random_row(columns, rng):
+    return [random_value(column_type, rng) for _, column_type in columns]
+
+
+# Every benchmark gets a table of its own, filled with args.rows random rows.
+def create_table(stub, table_name, columns, rows, rng):
+    stub.AddTable(AddTableRequest(tableName=table_name, columnInfo=[TableInfo(ColumnName=name, ColumnType=column_type) for name, column_type in columns]))
+    for start in range(0, rows, FILL_BATCH_ROWS):
+        mutations = [Mutation(insert=InsertRowMutation(values=random_row(columns, rng))) for _ in range(min(FILL_BATCH_ROWS, rows - start))]
+        stub.BatchMutate(BatchMutateRequest(tableName=table_name, mutations=mutations))
+
+
+def setup_lookup(stub, table_name, columns):
+    stub.CreateIndex(CreateIndexRequest(tableName=table_name, columnName=columns[0][0], kind=CreateIndexRequest.HASH))
+
+
+# Each benchmark builds the request for call i of a worker and makes the
+# call, returning the request and the response messages so their sizes can
+# be recorded. The work done after the timed call, if any, undoes it.
+def call_add_row(stub, table_name, columns, rows, rng, i):
+    request = AddRowRequest(tableName=table_name, values=random_row(columns, rng))
+    return request, [stub.AddRow(request)]
+
+
+def call_add_new_row(stub, table_name, columns, rows, rng, i):
+    request = AddNewRowRequest(tableName=table_name)
+    return request, [stub.AddNewRow(request)]
+
+
+def call_update_table_cell(stub, table_name, columns, rows, rng, i):
+    column_name, column_type = rng.choice(columns)
+    request = UpdateTableCellRequest(tableName=table_name, row=rng.randrange(rows), colName=column_name, value=random_text(column_type, rng))
+    return request, [stub.UpdateTableCell(request)]
+
+
+def call_batch_mutate(stub, table_name, columns, rows, rng, i):
+    request = BatchMutateRequest(tableName=table_name, mutations=[Mutation(insert=InsertRowMutation(values=random_row(columns, rng))) for _ in range(BATCH_ROWS)])
+    return request, [stub.BatchMutate(request)]
+
+
+def call_display_table(stub, table_name, columns, rows, rng, i):
+    request = DisplayTableRequest(tableName=table_name)
+    return request, [stub.DisplayTable(request)]
+
+
+def call_get_table_data(stub, table_name, columns, rows, rng, i):
+    request = DisplayTableRequest(tableName=table_name)
+    return request, [stub.GetTableData(request)]
+
+
+def call_stream_table(stub, table_name, columns, rows, rng, i):
+    request = StreamTableRequest(tableName=table_name, typed=True)
+    return request, list(stub.StreamTable(request))
+
+
+def call_query(stub, table_name, columns, rows, rng, i):
+    request = QueryRequest(tableName=table_name, offset=rng.randrange(max(1, rows - PAGE_ROWS)), limit=PAGE_ROWS)
+    return request, [stub.Query(request)]
+
+
+def call_lookup(stub, table_name, columns, rows, rng, i):
+    request = LookupRequest(tableName=table_name, columnName=columns[0][0], equals=random_value(columns[0][1], rng))
+    return request, [stub.Lookup(request)]
+
+
+def call_aggregate(stub, table_name, columns, rows, rng, i):
+    request = AggregateRequest(tableName=table_name, groupBy=[columns[0][0]], aggregations=[Aggregation(function=Aggregation.COUNT)])
+    return request, [stub.Aggregate(request)]
+
+
+def call_remove_duplicates(stub, table_name, columns, rows, rng, i):
+    request = RemoveDuplicatesRequest(tableName=table_name)
+    return request, [stub.RemoveDuplicates(request)]
+
+
+def call_add_column(stub, table_name, columns, rows, rng, i):
+    request = AddColumnRequest(tableName=table_name, columnInfo=TableInfo(ColumnName=f'added_{threading.get_ident()}_{i}', ColumnType='System.String'))
+    return request, [stub.AddColumn(request)]
+
+
+def undo_add_column(stub, request):
+    stub.DeleteColumn(DeleteColumnRequest(tableName=request.tableName, columnName=request.columnInfo.ColumnName))
+
+
+def call_get_columns_info(stub, table_name, columns, rows, rng, i):
+    request = GetColumnsInfoRequest(tableName=table_name)
+    return request, [stub.GetColumnsInfo(request)]
+
+
+def call_get_tables(stub, table_name, columns, rows, rng, i):
+    request = Empty()
+    return request, [stub.GetTables(request)]
+
+
+# name: (call, setup after the table is filled, undo after every call)
+BENCHMARKS = {
+    'AddRow': (call_add_row, None, None),
+    'AddNewRow': (call_add_new_row, None, None),
+    'UpdateTableCell': (call_update_table_cell, None, None),
+    'BatchMutate': (call_batch_mutate, None, None),
+    'DisplayTable': (call_display_table, None, None),
+    'GetTableData': (call_get_table_data, None, None),
+    'StreamTable': (call_stream_table, None, None),
+    'Query': (call_query, None, None),
+    'Lookup': (call_lookup, setup_lookup, None),
+    'Aggregate': (call_aggregate, None, None),
+    'RemoveDuplicates': (call_remove_duplicates, None, None),
+    'AddColumn': (call_add_column, None, undo_add_column),
+    'GetColumnsInfo': (call_get_columns_info, None, None),
+    'GetTables': (call_get_tables, None, None),
+}
+
+
+# Peak resident memory of a process since it was last reset. Writing 5 to
+# clear_refs resets the peak, so each benchmark reports its own; both are
+# Linux only, and elsewhere the peak is not reported.
+def reset_peak_rss(pid):
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss(pid):
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_in_process(port, max_workers):
+    from server import DatabaseService
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=[('grpc.max_send_message_length', MAX_MESSAGE_BYTES), ('grpc.max_receive_message_length', MAX_MESSAGE_BYTES)])
+    add_MyDatabaseServiceServicer_to_server(DatabaseService(), server)
+    server.add_insecure_port(f'127.0.0.1:{port}')
+    server.start()
+    return server
+
+
+def run_benchmark(stub, name, columns, args, server_pid):
+    call, setup, undo = BENCHMARKS[name]
+    table_name = f'bench_{name}'
+    rng = random.Random(args.seed)
+    create_table(stub, table_name, columns, args.rows, rng)
+    if setup is not None:
+        setup(stub, table_name, columns)
+
+    lock = threading.Lock()
+    latencies = []
+    request_bytes = []
+    response_bytes = []
+    errors = [0]
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+
+    def worker(worker_id):
+        worker_rng = random.Random(args.seed * 1000 + worker_id)
+        i = 0
+        while True:
+            call_started = time.perf_counter()
+            if call_started >= deadline:
+                return
+            try:
+                request, responses = call(stub, table_name, columns, args.rows, worker_rng, i)
+                elapsed = time.perf_counter() - call_started
+                failed = False
+            except grpc.RpcError:
+                failed = True
+            i += 1
+            if call_started >= measure_from:
+                with lock:
+                    if failed:
+                        errors[0] += 1
+                    else:
+                        latencies.append(elapsed)
+                        request_bytes.append(request.ByteSize())
+                        response_bytes.append(sum(response.ByteSize() for response in responses))
+            if undo is not None and not failed:
+                undo(stub, request)
+
+    if server_pid is not None:
+        reset_peak_rss(server_pid)
+    threads = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'request_bytes': sum(request_bytes) / len(request_bytes) if request_bytes else 0,
+        'response_bytes': sum(response_bytes) / len(response_bytes) if response_bytes else 0,
+        'peak_rss_bytes': peak_rss(server_pid) if server_pid is not None else None,
+    }
+    stub.RemoveTable(RemoveTableRequest(tableName=table_name))
+    return result
+
+
+# A benchmark regressed if it got slower or its messages or memory grew by
+# more than threshold (a fraction) against the baseline. Returns the
+# complaints, one line each.
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        if result['throughput'] < before['throughput'] * (1 - threshold):
+            regressions.append(f'{name}: throughput {result["throughput"]:.0f}/s, was {before["throughput"]:.0f}/s')
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'request_bytes', 'response_bytes', 'peak_rss_bytes'):
+            if result.get(key) is not None and before.get(key) and result[key] > before[key] * (1 + threshold):
+                regressions.append(f'{name}: {key} {result[key]:.2f}, was {before[key]:.2f}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every RPC of the Python server and report JSON.')
+    parser.add_argument('--server', help='address of a running server (default: start one)')
+    parser.add_argument('--in-process', action='store_true', help='run the server in this process instead of a child process; its peak memory then includes the clients')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--rows', type=int, default=10000, help='rows in each benchmark table before it starts')
+    parser.add_argument('--columns', nargs='+', choices=list(COLUMN_TYPES), default=['int', 'str', 'real', 'char'], help='column types of the benchmark tables, in order')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads calling at once')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds measured per benchmark')
+    parser.add_argument('--warmup', type=float, default=0.5, help='seconds run before measuring')
+    parser.add_argument('--max-workers', type=int, default=10, help='handler threads of the started server')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare against; exits with 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change against the baseline counted as a regression')
+    args = parser.parse_args()
+
+    columns = make_columns(args.columns)
+    process = server = None
+    server_pid = None
+    target = args.server
+    if target is None:
+        port = free_port()
+        target = f'127.0.0.1:{port}'
+        if args.in_process:
+            server = start_in_process(port, args.max_workers)
+            server_pid = os.getpid()
+        else:
+            process = start_server('thread', port, args.max_workers)
+            server_pid = process.pid
+    try:
+        channel = grpc.insecure_channel(target, options=[('grpc.max_send_message_length', MAX_MESSAGE_BYTES), ('grpc.max_receive_message_length', MAX_MESSAGE_BYTES)])
+        grpc.channel_ready_future(channel).result(timeout=10)
+        stub = MyDatabaseServiceStub(channel)
+        results = {}
+        for name in args.benchmarks:
+            results[name] = run_benchmark(stub, name, columns, args, server_pid)
+            print(f'{name:>17} {results[name]["throughput"]:>9.0f} req/s  p99 {results[name]["p99_ms"]:>8.2f} ms', file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if server is not None:
+            server.stop(None)
+
+    report = {
+        'config': {
+            'server': 'external' if args.server else 'in-process' if args.in_process else 'process',
+            'rows': args.rows,
+            'columns': args.columns,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get('config') != report['config']:
+            print('Warning: the baseline was run with a different configuration', file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
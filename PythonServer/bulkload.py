@@ -0,0 +1,165 @@
+import codecs
+import csv
+import io
+import json
+
+try:
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+BATCH_ROWS = 10000
+
+# JSON and Arrow hand over numbers rather than text; an Int32 column only
+# takes the integral ones, the way parse_value does for protobuf values.
+def to_int(value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{value} is not an integer')
+    return int(value)
+
+
+CONVERTERS = {
+    'System.Int32': to_int,
+    'System.Double': float,
+}
+
+
+def convert_column(column_type, values):
+    convert = CONVERTERS.get(column_type, str)
+    if convert is str:
+        return [None if value is None else str(value) for value in values]
+    return [None if value is None or value == '' else convert(value) for value in values]
+
+
+def iter_chunks(requests):
+    for request in requests:
+        if request.chunk:
+            yield request.chunk
+
+
+def iter_lines(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+class ChunkReader(io.RawIOBase):
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            self.buffer = next(self.chunks, None)
+            if self.buffer is None:
+                self.buffer = b''
+                return 0
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+class BulkLoader:
+    def __init__(self, table, extend=None):
+        self.table = table
+        self.extend = extend or self.extend_locked
+        self.rows_loaded = 0
+
+    def source_positions(self, names):
+        column_names = [column_name for column_name, _ in self.table.column_info]
+        unknown = [name for name in names if name not in column_names]
+        if unknown:
+            raise ValueError(f'Unknown columns: {", ".join(unknown)}')
+        return [names.index(column_name) if column_name in names else None for column_name in column_names]
+
+    # Rows are converted a column at a time and appended in batches, so the
+    # per-row work is a list lookup; parsing runs in map-like comprehensions.
+    def append_rows(self, rows, positions):
+        columns = []
+        for (_, column_type), position in zip(self.table.column_info, positions):
+            if position is None:
+                values = [None] * len(rows)
+            else:
+                values = [row[position] if position < len(row) else None for row in rows]
+            columns.append(convert_column(column_type, values))
+        self.append_columns(columns)
+
+    def extend_locked(self, columns):
+        with self.table.lock.write_locked():
+            self.table.extend_columns(columns)
+
+    def append_columns(self, columns):
+        self.extend(columns)
+        self.rows_loaded += len(columns[0]) if columns else 0
+
+    def load_csv(self, chunks, has_header):
+        reader = csv.reader(iter_lines(chunks))
+        positions = list(range(len(self.table.column_info)))
+        if has_header:
+            header = next(reader, None)
+            if header is None:
+                return
+            positions = self.source_positions(header)
+        width = len(header) if has_header else len(positions)
+        batch = []
+        try:
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) > width:
+                    raise ValueError(f'Line {reader.line_num}: expected {width} values, got {len(row)}')
+                batch.append(row)
+                if len(batch) == BATCH_ROWS:
+                    self.append_rows(batch, positions)
+                    batch = []
+        except csv.Error as e:
+            raise ValueError(f'Line {reader.line_num}: {e}')
+        if batch:
+            self.append_rows(batch, positions)
+
+    def load_ndjson(self, chunks):
+        column_names = [column_name for column_name, _ in self.table.column_info]
+        batch = []
+        for line_number, line in enumerate(iter_lines(chunks), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Line {line_number}: {e}')
+            if not isinstance(record, dict):
+                raise ValueError(f'Line {line_number}: expected a JSON object')
+            unknown = [name for name in record if name not in column_names]
+            if unknown:
+                raise ValueError(f'Line {line_number}: unknown columns: {", ".join(unknown)}')
+            batch.append([record.get(column_name) for column_name in column_names])
+            if len(batch) == BATCH_ROWS:
+                self.append_rows(batch, range(len(column_names)))
+                batch = []
+        if batch:
+            self.append_rows(batch, range(len(column_names)))
+
+    def load_arrow(self, chunks):
+        if pyarrow is None:
+            raise NotImplementedError('Arrow IPC loading requires pyarrow')
+        reader = pyarrow.ipc.open_stream(io.BufferedReader(ChunkReader(chunks)))
+        positions = self.source_positions(reader.schema.names)
+        for batch in reader:
+            columns = []
+            for (_, column_type), position in zip(self.table.column_info, positions):
+                if position is None:
+                    columns.append([None] * batch.num_rows)
+                else:
+                    columns.append(convert_column(column_type, batch.column(position).to_pylist()))
+            self.append_columns(columns)
@@ -0,0 +1,151 @@
+import collections
+import threading
+import time
+from my_database_pb2 import ChangeEvent
+from encoding import encode_table_data
+
+# Rows per event when a snapshot or a large insert is split up, so no single
+# message gets near the gRPC size limit.
+EVENT_ROWS = 10000
+# How many events are kept for watchers that fall behind or reconnect.
+FEED_EVENTS = 10000
+# How long events are still kept after the last watcher has gone, so a
+# client that reconnects in that time only gets what it missed.
+RESUME_SECONDS = 60
+
+
+# Builds the events describing one change to a table. Called by the table
+# while it holds its write lock, so the rows read here are the rows the
+# change produced.
+def change_events(table_name, table, kind, argument):
+    if kind == 'INSERT':
+        start, stop = argument
+        return insert_events(table_name, table, ChangeEvent.INSERT, start, stop)
+    if kind == 'UPDATE':
+        data = encode_table_data(table, argument, argument + 1, header=False)
+        return [ChangeEvent(tableName=table_name, kind=ChangeEvent.UPDATE, data=data)]
+    if kind == 'DELETE':
+        return [ChangeEvent(tableName=table_name, kind=ChangeEvent.DELETE, rowIds=argument[start:start + EVENT_ROWS]) for start in range(0, len(argument), EVENT_ROWS)]
+    if kind == 'DROP_TABLE':
+        return [ChangeEvent(tableName=table_name, kind=ChangeEvent.DROP_TABLE)]
+    return [ChangeEvent(tableName=table_name, kind=ChangeEvent.SCHEMA, data=encode_table_data(table, 0, 0))]
+
+
+# A SNAPSHOT replaces the whole table with its rows; the rows that do not fit
+# in it follow as INSERT events under the same sequence number.
+def snapshot_events(table_name, table, sequence):
+    events = insert_events(table_name, table, ChangeEvent.SNAPSHOT, 0, len(table))
+    for event in events:
+        event.sequence = sequence
+    return events
+
+
+def insert_events(table_name, table, kind, start, stop):
+    events = [ChangeEvent(tableName=table_name, kind=kind, data=encode_table_data(table, start, min(start + EVENT_ROWS, stop)))]
+    for chunk_start in range(start + EVENT_ROWS, stop, EVENT_ROWS):
+        data = encode_table_data(table, chunk_start, min(chunk_start + EVENT_ROWS, stop), header=False)
+        events.append(ChangeEvent(tableName=table_name, kind=ChangeEvent.INSERT, data=data))
+    return events
+
+
+# Orders every change to every table under one sequence number and keeps the
+# latest FEED_EVENTS of them, so a watcher can pick up where it left off.
+# Events are only built while someone is watching, or has been within the
+# last RESUME_SECONDS; otherwise publishing just moves the sequence on, and a
+# watcher resuming from before that point gets a fresh snapshot instead. Sequence numbers start from the clock in
+# microseconds, so they keep growing across restarts and a resume token
+# from an earlier run is recognised as too old.
+class ChangeFeed:
+    def __init__(self, max_events=FEED_EVENTS):
+        self.condition = threading.Condition()
+        self.max_events = max_events
+        self.sequence = int(time.time() * 1000000)
+        self.first_retained = self.sequence + 1
+        self.events = collections.deque()
+        self.watchers = 0
+        self.last_watched = None
+        # Each listener's table names, and the published event count when it
+        # was last called.
+        self.listeners = {}
+        self.published = 0
+
+    def watched(self):
+        return self.watchers or (self.last_watched is not None and time.monotonic() - self.last_watched < RESUME_SECONDS)
+
+    # Returns the sequence number given to the change.
+    def publish(self, build_events):
+        events = build_events() if self.watched() else None
+        with self.condition:
+            self.sequence += 1
+            sequence = self.sequence
+            if events is None:
+                self.events.clear()
+                self.first_retained = sequence + 1
+                return sequence
+            for event in events:
+                event.sequence = sequence
+                self.events.append(event)
+            while len(self.events) > self.max_events:
+                self.first_retained = self.events.popleft().sequence + 1
+            self.condition.notify_all()
+            self.published += len(events)
+            table_names = {event.tableName for event in events}
+            listeners = []
+            for listener, watched in self.listeners.items():
+                if not watched[0] or watched[0] & table_names or self.published - watched[1] >= self.max_events // 2:
+                    watched[1] = self.published
+                    listeners.append(listener)
+        for listener in listeners:
+            listener()
+        return sequence
+
+    # A watcher that cannot block a thread in wait() passes a listener, which
+    # is called without arguments after a change to one of the named tables
+    # (any table if none are named) and then reads the new events with poll().
+    # It is also called once half of the retained events have gone by since
+    # the last call, so a quiet watcher keeps up with the feed instead of
+    # finding its events dropped. Listeners run on the publishing thread, so
+    # they should only hand the news on.
+    def subscribe(self, listener=None, table_names=()):
+        with self.condition:
+            self.watchers += 1
+            if listener is not None:
+                self.listeners[listener] = [set(table_names), self.published]
+            return self.sequence
+
+    def unsubscribe(self, listener=None):
+        with self.condition:
+            self.watchers -= 1
+            self.listeners.pop(listener, None)
+            self.last_watched = time.monotonic()
+
+    def can_resume(self, sequence):
+        with self.condition:
+            return self.first_retained - 1 <= sequence <= self.sequence
+
+    # Returns the events after the given sequence number, waiting up to
+    # timeout seconds for one to arrive, or None if some of them are no
+    # longer retained.
+    def wait(self, after, timeout):
+        with self.condition:
+            if after < self.first_retained - 1:
+                return None
+            if self.sequence <= after:
+                self.condition.wait(timeout)
+            return self._events_after(after)
+
+    # Like wait(), but returns at once.
+    def poll(self, after):
+        with self.condition:
+            return self._events_after(after)
+
+    def _events_after(self, after):
+        if after < self.first_retained - 1:
+            return None
+        events = []
+        for event in reversed(self.events):
+            if event.sequence <= after:
+                break
+            events.append(event)
+        events.reverse()
+        return events
@@ -0,0 +1,177 @@
+import itertools
+import json
+import mmap
+import struct
+import sys
+from array import array
+from storage import Bitmap, Column, DynamicTable, RowIds
+
+# File layout: the magic and the header length, a JSON header describing every
+# table and where each column's buffers live, then the raw buffers. Buffer
+# offsets are relative to the first aligned byte after the header and every
+# buffer starts on an ALIGNMENT boundary, so a loaded column is a typed
+# memoryview straight over the mapped file:
+#   data        the column's int32 or float64 values (codes for strings)
+#   validity    one bit per row, least significant bit first
+#   offsets     int64 character offsets of each dictionary entry, plus the end
+#   text        the dictionary entries concatenated, utf-8 encoded
+# and each table's int64 row ids are one more such buffer.
+MAGIC = b'DBCKPT01'
+PREFIX = struct.Struct('<8sQ')
+ALIGNMENT = 64
+COPY_ROWS = 1 << 20
+
+# Checkpoints mapped by load_tables, by path. Windows cannot delete a file
+# while it is mapped, so a checkpoint is only deleted once release() closes
+# its mapping, which mmap refuses while any column still reads from it.
+mappings = {}
+
+
+def aligned(size):
+    return (size + ALIGNMENT - 1) & ~(ALIGNMENT - 1)
+
+
+def validity_bytes(valid, row_count):
+    bits = bytearray(valid.bits[:(row_count + 7) >> 3])
+    if row_count & 7:
+        bits[-1] &= (1 << (row_count & 7)) - 1
+    return bytes(bits)
+
+
+# The snapshot's columns may still be growing, so they are copied out in
+# slices; a memoryview over a live array would stop writers from appending.
+def data_chunks(data, row_count):
+    for start in range(0, row_count, COPY_ROWS):
+        yield data[start:min(start + COPY_ROWS, row_count)].tobytes()
+
+
+class CheckpointWriter:
+    def __init__(self):
+        self.size = 0
+        self.buffers = []
+
+    def place(self, size, chunks):
+        position = [self.size, size]
+        self.buffers.append((size, chunks))
+        self.size = aligned(self.size + size)
+        return position
+
+    def add_column(self, column, row_count):
+        info = {'name': column.name, 'type': column.type}
+        info['data'] = self.place(column.data.itemsize * row_count, data_chunks(column.data, row_count))
+        validity = validity_bytes(column.valid, row_count)
+        info['validity'] = self.place(len(validity), [validity])
+        if column.dictionary is not None:
+            dictionary = list(column.dictionary)
+            text = ''.join(dictionary).encode('utf-8')
+            offsets = array('q', itertools.accumulate(map(len, dictionary), initial=0))
+            info['offsets'] = self.place(offsets.itemsize * len(offsets), [offsets.tobytes()])
+            info['text'] = self.place(len(text), [text])
+        return info
+
+    def write(self, file, snapshots):
+        tables = []
+        for table_name, snapshot, definition in snapshots:
+            columns = [self.add_column(column, len(snapshot)) for column in snapshot.columns]
+            row_ids = self.place(8 * len(snapshot), data_chunks(snapshot.row_ids.data, len(snapshot)))
+            tables.append({'name': table_name, 'rows': len(snapshot), 'columns': columns, 'rowIds': row_ids, 'nextId': snapshot.next_id,
+                           'indexes': definition['indexes'], 'unique': definition['unique']})
+        header = json.dumps({'byteorder': sys.byteorder, 'tables': tables}).encode('utf-8')
+        file.write(PREFIX.pack(MAGIC, len(header)))
+        file.write(header)
+        file.write(bytes(aligned(PREFIX.size + len(header)) - PREFIX.size - len(header)))
+        for size, chunks in self.buffers:
+            for chunk in chunks:
+                file.write(chunk)
+            file.write(bytes(aligned(size) - size))
+
+
+# A table's index kinds and unique constraint. They are not versioned like its
+# rows, so they are taken under the same lock as its snapshot and written with
+# it; read later, they could include a change the snapshot predates.
+def table_definition(table):
+    unique = table.unique
+    if unique is not None:
+        unique = {'columns': list(unique.column_names), 'onConflict': unique.on_conflict}
+    return {'indexes': {column_name: index.kind for column_name, index in table.indexes.items()}, 'unique': unique}
+
+
+# snapshots holds (table name, snapshot, table_definition()) triples.
+def write_tables(file, snapshots):
+    CheckpointWriter().write(file, snapshots)
+
+
+def load_buffer(view, position, typecode, swap):
+    offset, size = position
+    if not swap:
+        return view[offset:offset + size].cast(typecode)
+    data = array(typecode)
+    data.frombytes(view[offset:offset + size])
+    data.byteswap()
+    return data
+
+
+def load_column(view, info, row_count, swap):
+    column = Column(info['name'], info['type'])
+    column.data = load_buffer(view, info['data'], column.typecode, swap)
+    offset, size = info['validity']
+    column.valid = Bitmap()
+    column.valid.length = row_count
+    column.valid.bits = view[offset:offset + size]
+    if column.dictionary is not None:
+        offset, size = info['offsets']
+        offsets = array('q')
+        offsets.frombytes(view[offset:offset + size])
+        if swap:
+            offsets.byteswap()
+        offset, size = info['text']
+        text = str(view[offset:offset + size], 'utf-8')
+        column.dictionary = [text[start:stop] for start, stop in zip(offsets, offsets[1:])]
+        column.codes = {value: code for code, value in enumerate(column.dictionary)}
+    return column
+
+
+# Maps the file read-only and builds the tables over it without reading the
+# column buffers; pages come in from the OS as queries touch them. Only
+# dictionaries are decoded, which costs the number of distinct strings, not
+# the number of rows.
+def load_tables(path):
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, header_length = PREFIX.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f'"{path}" is not a checkpoint file')
+    header = json.loads(mapped[PREFIX.size:PREFIX.size + header_length])
+    view = memoryview(mapped)[aligned(PREFIX.size + header_length):]
+    swap = header['byteorder'] != sys.byteorder
+    tables = {}
+    for table_info in header['tables']:
+        table = DynamicTable()
+        table.columns = [load_column(view, column_info, table_info['rows'], swap) for column_info in table_info['columns']]
+        table.row_count = table_info['rows']
+        table.row_ids = RowIds(load_buffer(view, table_info['rowIds'], 'q', swap))
+        table.next_id = table_info['nextId']
+        # Only index definitions are stored; the indexes are rebuilt here.
+        for column_name, kind in table_info['indexes'].items():
+            if table.has_column(column_name):
+                table.create_index(column_name, kind)
+        unique = table_info['unique']
+        if unique is not None:
+            table.set_unique(unique['columns'], unique['onConflict'])
+        tables[table_info['name']] = table
+    mappings[path] = mapped
+    return tables
+
+
+# Closes the mapping of a checkpoint once every column loaded from it has been
+# cloned or dropped, and says whether the file is free to delete.
+def release(path):
+    mapped = mappings.get(path)
+    if mapped is None:
+        return True
+    try:
+        mapped.close()
+    except BufferError:
+        return False
+    del mappings[path]
+    return True
@@ -0,0 +1,130 @@
+from my_database_pb2 import ColumnData, ColumnInfo, TableData
+from storage import Bitmap, parse_text
+
+
+def parse_value(column_type, value):
+    kind = value.WhichOneof('kind')
+    if kind is None or kind == 'null_value':
+        return None
+    if kind == 'number_value':
+        if column_type == 'System.Int32':
+            if not value.number_value.is_integer():
+                raise ValueError(f'{value.number_value} is not an integer')
+            return int(value.number_value)
+        elif column_type == 'System.Double':
+            return value.number_value
+        return parse_text(column_type, str(value.number_value))
+    if kind == 'bool_value':
+        return parse_text(column_type, str(value.bool_value))
+    return parse_text(column_type, value.string_value)
+
+
+def fill_values(column_data, column, values):
+    if column.type == 'System.Int32':
+        column_data.intValues.extend(values)
+    elif column.type == 'System.Double':
+        column_data.doubleValues.extend(values)
+    else:
+        dictionary = column.dictionary
+        column_data.stringValues.extend([dictionary[code] for code in values])
+
+
+def encode_column(column, start, stop):
+    column_data = ColumnData()
+    fill_values(column_data, column, column.data[start:stop])
+    # An empty validity bitmap means every cell in the range is set.
+    if not column.valid.all_set(start, stop):
+        column_data.validity = column.valid.slice(start, stop)
+    return column_data
+
+
+def encode_column_rows(column, rows):
+    column_data = ColumnData()
+    data, valid = column.data, column.valid
+    fill_values(column_data, column, [data[row] for row in rows])
+    flags = [valid[row] for row in rows]
+    if not all(flags):
+        validity = Bitmap()
+        validity.extend_flags(flags)
+        column_data.validity = bytes(validity.bits)
+    return column_data
+
+
+def encode_table_data(table, start=0, stop=None, header=True, row_ids=True):
+    stop = len(table) if stop is None else min(stop, len(table))
+    start = min(start, stop)
+    table_data = TableData(rowCount=stop - start)
+    if header:
+        table_data.columns.extend(ColumnInfo(name=column.name, type=column.type) for column in table.columns)
+    # A live table may have deleted slots before the rows, but not between
+    # them: only a single row or newly appended ones are read from one.
+    first = table.slot(start) if stop > start else start
+    start, stop = first, first + stop - start
+    table_data.columnData.extend(encode_column(column, start, stop) for column in table.columns)
+    if row_ids:
+        table_data.rowIds.extend(table.row_ids.data[start:stop].tolist())
+    return table_data
+
+
+# Like encode_table_data, for rows picked out by position, in the given order,
+# and optionally only some of the columns.
+def encode_table_rows(table, rows, header=True, columns=None):
+    columns = table.columns if columns is None else columns
+    table_data = TableData(rowCount=len(rows))
+    if header:
+        table_data.columns.extend(ColumnInfo(name=column.name, type=column.type) for column in columns)
+    table_data.columnData.extend(encode_column_rows(column, rows) for column in columns)
+    data = table.row_ids.data
+    table_data.rowIds.extend([data[row] for row in rows])
+    return table_data
+
+
+def decode_column(column_type, column_data, row_count):
+    if column_type == 'System.Int32':
+        values = list(column_data.intValues)
+    elif column_type == 'System.Double':
+        values = list(column_data.doubleValues)
+    else:
+        values = list(column_data.stringValues)
+    values.extend([None] * (row_count - len(values)))
+    if column_data.validity:
+        validity = format(int.from_bytes(column_data.validity, 'little'), 'b').zfill(row_count)[::-1]
+        values = [value if flag == '1' else None for value, flag in zip(values, validity)]
+    return values
+
+
+def decode_table_data(table_data, column_info=None):
+    if column_info is None:
+        column_info = [(column.name, column.type) for column in table_data.columns]
+    if not column_info:
+        return [()] * table_data.rowCount
+    columns = [decode_column(column_type, column_data, table_data.rowCount) for (_, column_type), column_data in zip(column_info, table_data.columnData)]
+    return list(zip(*columns))
+
+
+# Decodes into one value list per column of column_info. When the data carries
+# a header its columns are matched by name, so they may come in any order and
+# columns it leaves out are filled with nulls.
+def decode_columns(table_data, column_info):
+    if table_data.columns:
+        sources = {column.name: (i, column.type) for i, column in enumerate(table_data.columns)}
+        unknown = [name for name in sources if name not in dict(column_info)]
+        if unknown:
+            raise ValueError(f'Unknown columns: {", ".join(unknown)}')
+        positions = []
+        for column_name, column_type in column_info:
+            position, source_type = sources.get(column_name, (None, column_type))
+            if source_type != column_type:
+                raise ValueError(f'Column "{column_name}" is {column_type}, not {source_type}')
+            positions.append(position)
+    else:
+        if len(table_data.columnData) > len(column_info):
+            raise ValueError("Number of values must match the number of columns")
+        positions = list(range(len(column_info)))
+    columns = []
+    for (_, column_type), position in zip(column_info, positions):
+        if position is None or position >= len(table_data.columnData):
+            columns.append([None] * table_data.rowCount)
+        else:
+            columns.append(decode_column(column_type, table_data.columnData[position], table_data.rowCount))
+    return columns
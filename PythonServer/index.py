@@ -0,0 +1,173 @@
+import bisect
+
+# Secondary indexes map cell values to the ids of the rows holding them. Row
+# ids never change, so deleting a row only drops its own entry and nothing
+# has to be renumbered. Null cells are not indexed. DynamicTable keeps its
+# indexes in step with every change under the table's write lock.
+
+# A SortedIndex compacts its lists once this share of the entries in them
+# are removed ones.
+REMOVED_SHARE = 0.25
+
+
+# Each value maps to a dict used as an ordered set of row ids, so a row is
+# removed in constant time however many rows share its value.
+class HashIndex:
+    kind = 'HASH'
+
+    def __init__(self, row_ids, values):
+        self.entries = {}
+        self.extend(row_ids, values)
+
+    def add(self, row_id, value):
+        if value is not None:
+            self.entries.setdefault(value, {})[row_id] = None
+
+    def extend(self, row_ids, values):
+        for row_id, value in zip(row_ids, values):
+            if value is not None:
+                self.entries.setdefault(value, {})[row_id] = None
+
+    def remove(self, row_id, value):
+        if value is not None:
+            row_ids = self.entries[value]
+            del row_ids[row_id]
+            if not row_ids:
+                del self.entries[value]
+
+    # Appended rows come in id order, so only restored rows leave anything
+    # for the sort to do.
+    def equal(self, value):
+        return sorted(self.entries.get(value, ()))
+
+    def range(self, low, high, exclude_low=False, exclude_high=False):
+        raise ValueError('Range lookups need a SORTED index')
+
+
+# Keys and row ids are kept in two parallel lists sorted by (key, row id).
+# Removing an entry only records it as removed, so no list moves; lookups skip
+# removed entries, and the lists are rebuilt without them once they make up
+# REMOVED_SHARE of the entries.
+class SortedIndex:
+    kind = 'SORTED'
+
+    def __init__(self, row_ids, values):
+        self.keys = []
+        self.row_ids = []
+        self.removed = set()
+        self.extend(row_ids, values)
+
+    def _position(self, row_id, value):
+        start = bisect.bisect_left(self.keys, value)
+        stop = bisect.bisect_right(self.keys, value, start)
+        return bisect.bisect_left(self.row_ids, row_id, start, stop)
+
+    def add(self, row_id, value):
+        if value is not None:
+            if (value, row_id) in self.removed:
+                self.removed.discard((value, row_id))
+                return
+            position = self._position(row_id, value)
+            self.keys.insert(position, value)
+            self.row_ids.insert(position, row_id)
+
+    # Only the batch is sorted, and each new entry is placed by bisection.
+    # New rows get ids above every indexed one, so a new entry goes after
+    # the existing ones with the same key. The existing entries between two
+    # new ones are copied over as slices, and entries before the smallest
+    # new key are not touched, so appending rows in key order costs the
+    # batch alone.
+    def extend(self, row_ids, values):
+        entries = sorted((value, row_id) for row_id, value in zip(row_ids, values) if value is not None)
+        if not entries:
+            return
+        keys, ids = self.keys, self.row_ids
+        start = previous = bisect.bisect_right(keys, entries[0][0])
+        merged_keys, merged_ids = [], []
+        for value, row_id in entries:
+            position = bisect.bisect_right(keys, value, previous)
+            merged_keys += keys[previous:position]
+            merged_ids += ids[previous:position]
+            merged_keys.append(value)
+            merged_ids.append(row_id)
+            previous = position
+        merged_keys += keys[previous:]
+        merged_ids += ids[previous:]
+        keys[start:] = merged_keys
+        ids[start:] = merged_ids
+
+    def remove(self, row_id, value):
+        if value is not None:
+            self.removed.add((value, row_id))
+            if len(self.removed) > len(self.keys) * REMOVED_SHARE:
+                self.compact()
+
+    def compact(self):
+        removed = self.removed
+        entries = [(key, row_id) for key, row_id in zip(self.keys, self.row_ids) if (key, row_id) not in removed]
+        self.keys = [key for key, _ in entries]
+        self.row_ids = [row_id for _, row_id in entries]
+        self.removed = set()
+
+    def equal(self, value):
+        return self.range(value, value)
+
+    # Row ids come back in key order. Missing bounds leave that end open.
+    def range(self, low, high, exclude_low=False, exclude_high=False):
+        if low is None:
+            start = 0
+        elif exclude_low:
+            start = bisect.bisect_right(self.keys, low)
+        else:
+            start = bisect.bisect_left(self.keys, low)
+        if high is None:
+            stop = len(self.keys)
+        elif exclude_high:
+            stop = bisect.bisect_left(self.keys, high)
+        else:
+            stop = bisect.bisect_right(self.keys, high)
+        if not self.removed:
+            return self.row_ids[start:stop]
+        removed = self.removed
+        return [row_id for key, row_id in zip(self.keys[start:stop], self.row_ids[start:stop]) if (key, row_id) not in removed]
+
+
+# Enforces that no two rows share a key, a tuple of values of the constrained
+# columns, and maps each key to the id of its row. As in SQL, keys containing a null
+# are not constrained, so rows can still be added empty and filled in.
+# on_conflict says what happens to a new row whose key is taken:
+#   REJECT   the change fails
+#   REPLACE  the new values overwrite the row holding the key
+class UniqueConstraint:
+    def __init__(self, column_names, on_conflict, row_ids, keys):
+        if on_conflict not in ('REJECT', 'REPLACE'):
+            raise ValueError(f'Unknown conflict mode "{on_conflict}"')
+        if not column_names:
+            raise ValueError('A unique constraint needs at least one column')
+        self.column_names = list(column_names)
+        self.on_conflict = on_conflict
+        self.row_ids = {}
+        self.extend(row_ids, keys)
+
+    def find(self, key):
+        if None in key:
+            return None
+        return self.row_ids.get(key)
+
+    def add(self, row_id, key):
+        if None not in key:
+            self.row_ids[key] = row_id
+
+    def extend(self, row_ids, keys):
+        existing = self.row_ids
+        for row_id, key in zip(row_ids, keys):
+            if None not in key:
+                if existing.setdefault(key, row_id) != row_id:
+                    raise ValueError(f'Row ids {existing[key]} and {row_id} have the same key {key}; remove the duplicates first')
+
+    def remove(self, row_id, key):
+        if None not in key and self.row_ids.get(key) == row_id:
+            del self.row_ids[key]
+
+
+INDEX_TYPES = {index_type.kind: index_type for index_type in (HashIndex, SortedIndex)}
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import grpc
+from google.protobuf import struct_pb2
+from my_database_pb2 import (AddTableRequest, BatchMutateRequest, GetColumnsInfoRequest, InsertRowMutation, Mutation, StreamTableRequest, TableInfo, UpdateTableCellRequest, WatchRequest)
+from my_database_pb2_grpc import MyDatabaseServiceStub
+
+TABLE = 'loadtest'
+# Watched by the idle streams and never written to, so they get nothing after
+# their opening event.
+IDLE_TABLE = 'loadtest_idle'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def start_server(mode, port, max_workers, extra_args=()):
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+    return subprocess.Popen([sys.executable, server_path, '--mode', mode, '--port', str(port), '--max-workers', str(max_workers), *extra_args], stdout=subprocess.DEVNULL)
+
+
+async def prepare(stub, rows):
+    await stub.AddTable(AddTableRequest(tableName=TABLE, columnInfo=[TableInfo(ColumnName='id', ColumnType='System.Int32'), TableInfo(ColumnName='name', ColumnType='System.String')]))
+    mutations = [Mutation(insert=InsertRowMutation(values=[struct_pb2.Value(number_value=i), struct_pb2.Value(string_value=f'row-{i}')])) for i in range(rows)]
+    await stub.BatchMutate(BatchMutateRequest(tableName=TABLE, mutations=mutations))
+
+
+async def unary_client(stub, deadline, latencies, client_id, rows):
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if i % 2:
+            await stub.UpdateTableCell(UpdateTableCellRequest(tableName=TABLE, row=(client_id + i) % rows, colName='name', value=f'c{client_id}-{i}'))
+        else:
+            await stub.GetColumnsInfo(GetColumnsInfoRequest(tableName=TABLE))
+        latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+# Opens Watch streams on a table nobody writes to, the way dashboards wait for
+# changes, and counts how many got their opening event in time. After that
+# they are truly idle: the server has nothing to send them.
+async def idle_streams(stub, count, timeout):
+    calls = [stub.Watch(WatchRequest(tables=[IDLE_TABLE], skipSnapshots=True)) for _ in range(count)]
+    return calls, await first_messages(calls, timeout)
+
+
+# Opens StreamTable calls of one row per batch that read their first batch and
+# then stop reading, the way a stalled client would. The server keeps sending
+# until the table is sent or the stream's flow control window is full, so
+# these streams are busy while the unary calls start.
+async def stalled_streams(stub, count, timeout):
+    calls = [stub.StreamTable(StreamTableRequest(tableName=TABLE, batchSize=1)) for _ in range(count)]
+    return calls, await first_messages(calls, timeout)
+
+
+async def first_messages(calls, timeout):
+    results = await asyncio.gather(*(asyncio.wait_for(call.read(), timeout) for call in calls), return_exceptions=True)
+    return sum(1 for result in results if not isinstance(result, BaseException))
+
+
+STREAM_KINDS = {'idle': idle_streams, 'stalled': stalled_streams}
+
+
+async def run_mode(mode, args):
+    port = free_port()
+    process = start_server(mode, port, args.max_workers)
+    try:
+        async with grpc.aio.insecure_channel(f'127.0.0.1:{port}') as channel:
+            await asyncio.wait_for(channel.channel_ready(), 10)
+            stub = MyDatabaseServiceStub(channel)
+            await prepare(stub, args.rows)
+
+            calls, served = await STREAM_KINDS[args.stream_kind](stub, args.streams, args.stream_timeout)
+
+            latencies = []
+            deadline = time.perf_counter() + args.duration
+            await asyncio.gather(*(unary_client(stub, deadline, latencies, i, args.rows) for i in range(args.clients)))
+            for call in calls:
+                call.cancel()
+        return {
+            'mode': mode,
+            'requests': len(latencies),
+            'throughput': len(latencies) / args.duration,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'streams_served': served,
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the threaded and grpc.aio servers under load.')
+    parser.add_argument('--modes', nargs='+', choices=['thread', 'aio'], default=['thread', 'aio'])
+    parser.add_argument('--clients', type=int, default=50, help='concurrent clients issuing unary calls')
+    parser.add_argument('--streams', type=int, default=200, help='streams held open during the run')
+    parser.add_argument('--stream-kind', choices=list(STREAM_KINDS), default='idle', help='idle Watch calls, or StreamTable calls that stop reading after their first batch')
+    parser.add_argument('--stream-timeout', type=float, default=2.0, help='seconds a stream may wait for its first message')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--max-workers', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'{"mode":>6} {"requests":>9} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"streams served":>15}')
+    for mode in args.modes:
+        result = asyncio.run(run_mode(mode, args))
+        print(f'{result["mode"]:>6} {result["requests"]:>9} {result["throughput"]:>9.0f} {result["p50_ms"]:>8.2f} {result["p99_ms"]:>8.2f} {result["streams_served"]:>9}/{args.streams}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import asyncio
+import bisect
+import collections
+import http.server
+import threading
+import time
+import grpc
+
+# Upper bounds of the histogram buckets: call latency in seconds, and the
+# size of single request or response messages on the wire in bytes.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{format_labels(dict(labels, le=bound))} {cumulative}'
+        yield f'{name}_bucket{format_labels(dict(labels, le="+Inf"))} {self.count}'
+        yield f'{name}_sum{format_labels(labels)} {self.sum}'
+        yield f'{name}_count{format_labels(labels)} {self.count}'
+
+
+# Per-method counters and histograms filled in by the interceptors, plus
+# gauges that are only computed when the metrics are read, so keeping them
+# costs the handlers nothing. render() gives the Prometheus text format.
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.in_flight = collections.Counter()
+        self.latency = collections.defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_bytes = collections.defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.response_bytes = collections.defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.collectors = []
+
+    def started(self, method):
+        with self.lock:
+            self.in_flight[method] += 1
+
+    def finished(self, method, code, seconds):
+        with self.lock:
+            self.in_flight[method] -= 1
+            self.requests[(method, code.name)] += 1
+            self.latency[method].observe(seconds)
+
+    def received(self, method, size):
+        with self.lock:
+            self.request_bytes[method].observe(size)
+
+    def sent(self, method, size):
+        with self.lock:
+            self.response_bytes[method].observe(size)
+
+    # collect() returns (name, help, [(labels, value)]) for every gauge it
+    # reports, and runs on the thread serving the metrics.
+    def add_collector(self, collect):
+        self.collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines.append('# HELP grpc_server_handled_total Calls finished, by method and status code.')
+            lines.append('# TYPE grpc_server_handled_total counter')
+            for (method, code), count in sorted(self.requests.items()):
+                lines.append(f'grpc_server_handled_total{format_labels({"method": method, "code": code})} {count}')
+            lines.append('# HELP grpc_server_in_flight Calls being handled, by method.')
+            lines.append('# TYPE grpc_server_in_flight gauge')
+            for method, count in sorted(self.in_flight.items()):
+                lines.append(f'grpc_server_in_flight{format_labels({"method": method})} {count}')
+            for name, help_text, histograms in (
+                ('grpc_server_handling_seconds', 'Time from receiving a call to finishing it, by method.', self.latency),
+                ('grpc_server_request_bytes', 'Size of request messages, by method.', self.request_bytes),
+                ('grpc_server_response_bytes', 'Size of response messages, by method.', self.response_bytes),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for method, histogram in sorted(histograms.items()):
+                    lines.extend(histogram.lines(name, {'method': method}))
+        for collect in self.collectors:
+            for name, help_text, samples in collect():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                for labels, value in samples:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Gauges for the tables of a DatabaseService. Row counts and sizes are read
+# without the table locks, so a table being written to may be reported a
+# change early or late.
+def table_collector(service):
+    def collect():
+        with service.catalog_lock.read_locked():
+            tables = sorted(service.tables.items())
+        return [
+            ('db_tables', 'Tables in the database.', [({}, len(tables))]),
+            ('db_table_rows', 'Rows in each table.', [({'table': table_name}, len(table)) for table_name, table in tables]),
+            ('db_table_bytes', 'Estimated memory held by the columns of each table.', [({'table': table_name}, table.nbytes()) for table_name, table in tables]),
+        ]
+    return collect
+
+
+def status_code(context, completed):
+    code = context.code()
+    if code is not None:
+        return code
+    return grpc.StatusCode.OK if completed else grpc.StatusCode.UNKNOWN
+
+
+# Message sizes come from the (de)serializers the server runs anyway, so
+# measuring them costs a len() per message.
+def counted_serializers(metrics, method, handler):
+    request_deserializer = handler.request_deserializer
+    response_serializer = handler.response_serializer
+
+    def deserialize(data):
+        metrics.received(method, len(data))
+        return request_deserializer(data)
+
+    def serialize(message):
+        data = response_serializer(message)
+        metrics.sent(method, len(data))
+        return data
+
+    return {
+        'request_deserializer': deserialize if request_deserializer is not None else None,
+        'response_serializer': serialize if response_serializer is not None else None,
+    }
+
+
+def instrument(metrics, method, handler):
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        def behavior(request, context):
+            metrics.started(method)
+            started = time.perf_counter()
+            completed = cancelled = False
+            try:
+                yield from inner(request, context)
+                completed = True
+            except GeneratorExit:
+                cancelled = True
+                raise
+            finally:
+                code = status_code(context, completed)
+                if code == grpc.StatusCode.UNKNOWN and (cancelled or not context.is_active()):
+                    code = grpc.StatusCode.CANCELLED
+                metrics.finished(method, code, time.perf_counter() - started)
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        def behavior(request, context):
+            metrics.started(method)
+            started = time.perf_counter()
+            completed = False
+            try:
+                response = inner(request, context)
+                completed = True
+                return response
+            finally:
+                metrics.finished(method, status_code(context, completed), time.perf_counter() - started)
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, **counted_serializers(metrics, method, handler))
+
+
+def instrument_async(metrics, method, handler):
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        async def behavior(request, context):
+            metrics.started(method)
+            started = time.perf_counter()
+            completed = cancelled = False
+            try:
+                async for response in inner(request, context):
+                    yield response
+                completed = True
+            except (asyncio.CancelledError, GeneratorExit):
+                cancelled = True
+                raise
+            finally:
+                code = status_code(context, completed)
+                if code == grpc.StatusCode.UNKNOWN and (cancelled or context.cancelled()):
+                    code = grpc.StatusCode.CANCELLED
+                metrics.finished(method, code, time.perf_counter() - started)
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        async def behavior(request, context):
+            metrics.started(method)
+            started = time.perf_counter()
+            completed = False
+            try:
+                response = await inner(request, context)
+                completed = True
+                return response
+            finally:
+                metrics.finished(method, status_code(context, completed), time.perf_counter() - started)
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, **counted_serializers(metrics, method, handler))
+
+
+# The wrapped handler of a method is built once and reused for as long as the
+# server hands out the same handler for it.
+class MetricsInterceptor(grpc.ServerInterceptor):
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.handlers = {}
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, instrument(self.metrics, handler_call_details.method.rsplit('/', 1)[-1], handler))
+        return cached[1]
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.handlers = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, instrument_async(self.metrics, handler_call_details.method.rsplit('/', 1)[-1], handler))
+        return cached[1]
+
+
+# Serves the metrics at /metrics from a background thread.
+def start_http_server(metrics, port, host='127.0.0.1'):
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
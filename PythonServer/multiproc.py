@@ -0,0 +1,208 @@
+import itertools
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import zlib
+from concurrent import futures
+import grpc
+import my_database_pb2
+from my_database_pb2 import DESCRIPTOR, BatchMutateResponse, TablesResponse
+from my_database_pb2_grpc import MyDatabaseServiceStub, add_MyDatabaseServiceServicer_to_server
+from server import KEEPALIVE_OPTIONS, compression_interceptors, create_service, monitoring_interceptors, take_watch_slot, watch_slots
+
+SERVICE = DESCRIPTOR.services_by_name['MyDatabaseService']
+
+# Calls without a deadline report an effectively infinite time_remaining().
+NO_DEADLINE = 10 ** 9
+# Calls between workers are not size limited; the public server's limits
+# already apply to what clients send and receive.
+INTERNAL_OPTIONS = [('grpc.max_send_message_length', -1), ('grpc.max_receive_message_length', -1)]
+
+
+def table_owner(table_name, workers):
+    return zlib.crc32(table_name.encode('utf-8')) % workers
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Every worker accepts connections on the shared public port and owns the
+# tables whose names hash to its index. Calls for a table owned by another
+# worker are forwarded to that worker's internal port, which serves its
+# DatabaseService directly, so each table lives in exactly one process.
+class RoutingService:
+    def __init__(self, service, worker_index, internal_addresses, max_workers):
+        self.service = service
+        self.worker_index = worker_index
+        self.workers = len(internal_addresses)
+        # A routed watch holds a public handler thread, and the internal
+        # server limits the watches it serves through service.watch_slots.
+        self.watch_slots = watch_slots(max_workers)
+        self.peers = [None if i == worker_index else MyDatabaseServiceStub(grpc.insecure_channel(address, options=INTERNAL_OPTIONS)) for i, address in enumerate(internal_addresses)]
+        for method in SERVICE.methods:
+            if method.name == 'CreateDatabase':
+                wrapper = self._broadcast(method)
+            elif method.name == 'GetTables':
+                wrapper = self._gather_tables
+            elif method.name == 'BatchMutateStream':
+                wrapper = self._route_batches
+            elif method.name == 'Watch':
+                wrapper = self._route_watch
+            elif 'tableName' in method.input_type.fields_by_name:
+                wrapper = self._route(method)
+            else:
+                wrapper = getattr(service, method.name)
+            setattr(self, method.name, wrapper)
+
+    def _call(self, owner, method_name, request, context):
+        if owner == self.worker_index:
+            return getattr(self.service, method_name)(request, context)
+        remaining = context.time_remaining()
+        timeout = remaining if remaining < NO_DEADLINE else None
+        return getattr(self.peers[owner], method_name)(request, timeout=timeout, wait_for_ready=True)
+
+    def _failed(self, context, error, response_class):
+        context.set_code(error.code())
+        context.set_details(error.details())
+        return response_class()
+
+    def _route(self, method):
+        response_class = getattr(my_database_pb2, method.output_type.name)
+
+        def route_unary(request, context):
+            try:
+                return self._call(table_owner(request.tableName, self.workers), method.name, request, context)
+            except grpc.RpcError as e:
+                return self._failed(context, e, response_class)
+
+        def route_stream(request, context):
+            try:
+                yield from self._call(table_owner(request.tableName, self.workers), method.name, request, context)
+            except grpc.RpcError as e:
+                self._failed(context, e, response_class)
+
+        # Client streams are routed on the table named by their first message.
+        def route_request_stream(request_iterator, context):
+            first = next(request_iterator, None)
+            if first is None:
+                return response_class()
+            requests = itertools.chain([first], request_iterator)
+            try:
+                return self._call(table_owner(first.tableName, self.workers), method.name, requests, context)
+            except grpc.RpcError as e:
+                return self._failed(context, e, response_class)
+
+        if method.client_streaming:
+            return route_request_stream
+        return route_stream if method.server_streaming else route_unary
+
+    def _broadcast(self, method):
+        response_class = getattr(my_database_pb2, method.output_type.name)
+
+        def broadcast(request, context):
+            try:
+                for owner in range(self.workers):
+                    response = self._call(owner, method.name, request, context)
+                return response
+            except grpc.RpcError as e:
+                return self._failed(context, e, response_class)
+        return broadcast
+
+    def _gather_tables(self, request, context):
+        response = TablesResponse()
+        try:
+            for owner in range(self.workers):
+                worker_tables = self._call(owner, 'GetTables', request, context)
+                response.tables.extend(worker_tables.tables)
+                response.versions.extend(worker_tables.versions)
+        except grpc.RpcError as e:
+            return self._failed(context, e, TablesResponse)
+        return response
+
+    # Messages of one stream may name different tables, so each one is sent
+    # to its owner as a unary BatchMutate and the results are merged. As in
+    # DatabaseService.BatchMutateStream, the stream stops at the first
+    # message that fails.
+    def _route_batches(self, request_iterator, context):
+        response = BatchMutateResponse(applied=True)
+        for applied_messages, request in enumerate(request_iterator):
+            try:
+                result = self._call(table_owner(request.tableName, self.workers), 'BatchMutate', request, context)
+            except grpc.RpcError as e:
+                self._failed(context, e, BatchMutateResponse)
+            if context.code() not in (None, grpc.StatusCode.OK):
+                details = context.details()
+                if isinstance(details, bytes):
+                    details = details.decode('utf-8')
+                context.set_details(f'{details} Messages applied before it: {applied_messages}.')
+                return BatchMutateResponse()
+            response.results.extend(result.results)
+            if not result.applied:
+                response.applied = False
+                return response
+        return response
+
+
+    # Each worker keeps its own change feed with its own sequence numbers, so
+    # a watch can only follow tables that live in one worker.
+    def _route_watch(self, request, context):
+        owners = {table_owner(table_name, self.workers) for table_name in request.tables}
+        if len(owners) != 1:
+            context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+            context.set_details('With several worker processes a watch must name its tables, and they must live in one worker; open one watch per table.')
+            return
+        if not take_watch_slot(self.watch_slots, context):
+            return
+        try:
+            yield from self._call(owners.pop(), 'Watch', request, context)
+        except grpc.RpcError as e:
+            self._failed(context, e, my_database_pb2.ChangeEvent)
+        finally:
+            self.watch_slots.release()
+
+
+def run_worker(worker_index, port, internal_addresses, max_workers, log_options, monitor_options=None, transport_options=None):
+    # Each worker journals the tables it owns into its own directory. Table
+    # ownership follows the worker count, so restart with the same count.
+    if log_options is not None:
+        log_options = dict(log_options, directory=os.path.join(log_options['directory'], f'worker-{worker_index}'))
+    service = create_service(log_options)
+    service.watch_slots = watch_slots(max_workers)
+    internal_server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=KEEPALIVE_OPTIONS + INTERNAL_OPTIONS)
+    add_MyDatabaseServiceServicer_to_server(service, internal_server)
+    internal_server.add_insecure_port(internal_addresses[worker_index])
+    transport_options = transport_options or {}
+    interceptors = compression_interceptors(transport_options.get('compression', 'none'), transport_options.get('compress_above', 0))
+    # Only calls from clients are measured; a call forwarded to the owner of
+    # its table was already counted by the worker that received it.
+    interceptors += monitoring_interceptors(service, monitor_options or {}, worker_index=worker_index)
+    public_server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=[('grpc.so_reuseport', 1)] + KEEPALIVE_OPTIONS + transport_options.get('options', []), interceptors=interceptors)
+    add_MyDatabaseServiceServicer_to_server(RoutingService(service, worker_index, internal_addresses, max_workers), public_server)
+    public_server.add_insecure_port(f'[::]:{port}')
+    internal_server.start()
+    public_server.start()
+    public_server.wait_for_termination()
+
+
+def serve_processes(port, processes, max_workers, log_options=None, monitor_options=None, transport_options=None):
+    internal_addresses = [f'127.0.0.1:{free_port()}' for _ in range(processes)]
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(i, port, internal_addresses, max_workers, log_options, monitor_options, transport_options)) for i in range(processes)]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
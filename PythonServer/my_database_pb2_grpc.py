@@ -32,12 +32,12 @@ class MyDatabaseServiceStub(object):
         self.AddNewRow = channel.unary_unary(
                 '/dbservice.MyDatabaseService/AddNewRow',
                 request_serializer=my__database__pb2.AddNewRowRequest.SerializeToString,
-                response_deserializer=my__database__pb2.Empty.FromString,
+                response_deserializer=my__database__pb2.AddRowResponse.FromString,
                 )
         self.AddRow = channel.unary_unary(
                 '/dbservice.MyDatabaseService/AddRow',
                 request_serializer=my__database__pb2.AddRowRequest.SerializeToString,
-                response_deserializer=my__database__pb2.Empty.FromString,
+                response_deserializer=my__database__pb2.AddRowResponse.FromString,
                 )
         self.DeleteRow = channel.unary_unary(
                 '/dbservice.MyDatabaseService/DeleteRow',
@@ -79,6 +79,81 @@ class MyDatabaseServiceStub(object):
                 request_serializer=my__database__pb2.UpdateTableCellRequest.SerializeToString,
                 response_deserializer=my__database__pb2.UpdateTableCellResponse.FromString,
                 )
+        self.StreamTable = channel.unary_stream(
+                '/dbservice.MyDatabaseService/StreamTable',
+                request_serializer=my__database__pb2.StreamTableRequest.SerializeToString,
+                response_deserializer=my__database__pb2.StreamTableResponse.FromString,
+                )
+        self.GetTableData = channel.unary_unary(
+                '/dbservice.MyDatabaseService/GetTableData',
+                request_serializer=my__database__pb2.DisplayTableRequest.SerializeToString,
+                response_deserializer=my__database__pb2.TableData.FromString,
+                )
+        self.BatchMutate = channel.unary_unary(
+                '/dbservice.MyDatabaseService/BatchMutate',
+                request_serializer=my__database__pb2.BatchMutateRequest.SerializeToString,
+                response_deserializer=my__database__pb2.BatchMutateResponse.FromString,
+                )
+        self.BatchMutateStream = channel.stream_unary(
+                '/dbservice.MyDatabaseService/BatchMutateStream',
+                request_serializer=my__database__pb2.BatchMutateRequest.SerializeToString,
+                response_deserializer=my__database__pb2.BatchMutateResponse.FromString,
+                )
+        self.BulkLoad = channel.stream_unary(
+                '/dbservice.MyDatabaseService/BulkLoad',
+                request_serializer=my__database__pb2.BulkLoadRequest.SerializeToString,
+                response_deserializer=my__database__pb2.BulkLoadResponse.FromString,
+                )
+        self.AppendTableData = channel.unary_unary(
+                '/dbservice.MyDatabaseService/AppendTableData',
+                request_serializer=my__database__pb2.AppendTableDataRequest.SerializeToString,
+                response_deserializer=my__database__pb2.BulkLoadResponse.FromString,
+                )
+        self.CreateIndex = channel.unary_unary(
+                '/dbservice.MyDatabaseService/CreateIndex',
+                request_serializer=my__database__pb2.CreateIndexRequest.SerializeToString,
+                response_deserializer=my__database__pb2.Empty.FromString,
+                )
+        self.DropIndex = channel.unary_unary(
+                '/dbservice.MyDatabaseService/DropIndex',
+                request_serializer=my__database__pb2.DropIndexRequest.SerializeToString,
+                response_deserializer=my__database__pb2.Empty.FromString,
+                )
+        self.Lookup = channel.unary_unary(
+                '/dbservice.MyDatabaseService/Lookup',
+                request_serializer=my__database__pb2.LookupRequest.SerializeToString,
+                response_deserializer=my__database__pb2.LookupResponse.FromString,
+                )
+        self.Query = channel.unary_unary(
+                '/dbservice.MyDatabaseService/Query',
+                request_serializer=my__database__pb2.QueryRequest.SerializeToString,
+                response_deserializer=my__database__pb2.QueryResponse.FromString,
+                )
+        self.Aggregate = channel.unary_unary(
+                '/dbservice.MyDatabaseService/Aggregate',
+                request_serializer=my__database__pb2.AggregateRequest.SerializeToString,
+                response_deserializer=my__database__pb2.AggregateResponse.FromString,
+                )
+        self.SetUniqueConstraint = channel.unary_unary(
+                '/dbservice.MyDatabaseService/SetUniqueConstraint',
+                request_serializer=my__database__pb2.SetUniqueConstraintRequest.SerializeToString,
+                response_deserializer=my__database__pb2.Empty.FromString,
+                )
+        self.DropUniqueConstraint = channel.unary_unary(
+                '/dbservice.MyDatabaseService/DropUniqueConstraint',
+                request_serializer=my__database__pb2.DropUniqueConstraintRequest.SerializeToString,
+                response_deserializer=my__database__pb2.Empty.FromString,
+                )
+        self.Watch = channel.unary_stream(
+                '/dbservice.MyDatabaseService/Watch',
+                request_serializer=my__database__pb2.WatchRequest.SerializeToString,
+                response_deserializer=my__database__pb2.ChangeEvent.FromString,
+                )
+        self.Profile = channel.unary_unary(
+                '/dbservice.MyDatabaseService/Profile',
+                request_serializer=my__database__pb2.ProfileRequest.SerializeToString,
+                response_deserializer=my__database__pb2.ProfileResponse.FromString,
+                )
 
 
 class MyDatabaseServiceServicer(object):
@@ -162,6 +237,96 @@ class MyDatabaseServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamTable(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetTableData(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchMutate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchMutateStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BulkLoad(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AppendTableData(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreateIndex(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DropIndex(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Lookup(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Query(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Aggregate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SetUniqueConstraint(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DropUniqueConstraint(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Watch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Profile(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MyDatabaseServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -183,12 +348,12 @@ def add_MyDatabaseServiceServicer_to_server(servicer, server):
             'AddNewRow': grpc.unary_unary_rpc_method_handler(
                     servicer.AddNewRow,
                     request_deserializer=my__database__pb2.AddNewRowRequest.FromString,
-                    response_serializer=my__database__pb2.Empty.SerializeToString,
+                    response_serializer=my__database__pb2.AddRowResponse.SerializeToString,
             ),
             'AddRow': grpc.unary_unary_rpc_method_handler(
                     servicer.AddRow,
                     request_deserializer=my__database__pb2.AddRowRequest.FromString,
-                    response_serializer=my__database__pb2.Empty.SerializeToString,
+                    response_serializer=my__database__pb2.AddRowResponse.SerializeToString,
             ),
             'DeleteRow': grpc.unary_unary_rpc_method_handler(
                     servicer.DeleteRow,
@@ -230,6 +395,81 @@ def add_MyDatabaseServiceServicer_to_server(servicer, server):
                     request_deserializer=my__database__pb2.UpdateTableCellRequest.FromString,
                     response_serializer=my__database__pb2.UpdateTableCellResponse.SerializeToString,
             ),
+            'StreamTable': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamTable,
+                    request_deserializer=my__database__pb2.StreamTableRequest.FromString,
+                    response_serializer=my__database__pb2.StreamTableResponse.SerializeToString,
+            ),
+            'GetTableData': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetTableData,
+                    request_deserializer=my__database__pb2.DisplayTableRequest.FromString,
+                    response_serializer=my__database__pb2.TableData.SerializeToString,
+            ),
+            'BatchMutate': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchMutate,
+                    request_deserializer=my__database__pb2.BatchMutateRequest.FromString,
+                    response_serializer=my__database__pb2.BatchMutateResponse.SerializeToString,
+            ),
+            'BatchMutateStream': grpc.stream_unary_rpc_method_handler(
+                    servicer.BatchMutateStream,
+                    request_deserializer=my__database__pb2.BatchMutateRequest.FromString,
+                    response_serializer=my__database__pb2.BatchMutateResponse.SerializeToString,
+            ),
+            'BulkLoad': grpc.stream_unary_rpc_method_handler(
+                    servicer.BulkLoad,
+                    request_deserializer=my__database__pb2.BulkLoadRequest.FromString,
+                    response_serializer=my__database__pb2.BulkLoadResponse.SerializeToString,
+            ),
+            'AppendTableData': grpc.unary_unary_rpc_method_handler(
+                    servicer.AppendTableData,
+                    request_deserializer=my__database__pb2.AppendTableDataRequest.FromString,
+                    response_serializer=my__database__pb2.BulkLoadResponse.SerializeToString,
+            ),
+            'CreateIndex': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreateIndex,
+                    request_deserializer=my__database__pb2.CreateIndexRequest.FromString,
+                    response_serializer=my__database__pb2.Empty.SerializeToString,
+            ),
+            'DropIndex': grpc.unary_unary_rpc_method_handler(
+                    servicer.DropIndex,
+                    request_deserializer=my__database__pb2.DropIndexRequest.FromString,
+                    response_serializer=my__database__pb2.Empty.SerializeToString,
+            ),
+            'Lookup': grpc.unary_unary_rpc_method_handler(
+                    servicer.Lookup,
+                    request_deserializer=my__database__pb2.LookupRequest.FromString,
+                    response_serializer=my__database__pb2.LookupResponse.SerializeToString,
+            ),
+            'Query': grpc.unary_unary_rpc_method_handler(
+                    servicer.Query,
+                    request_deserializer=my__database__pb2.QueryRequest.FromString,
+                    response_serializer=my__database__pb2.QueryResponse.SerializeToString,
+            ),
+            'Aggregate': grpc.unary_unary_rpc_method_handler(
+                    servicer.Aggregate,
+                    request_deserializer=my__database__pb2.AggregateRequest.FromString,
+                    response_serializer=my__database__pb2.AggregateResponse.SerializeToString,
+            ),
+            'SetUniqueConstraint': grpc.unary_unary_rpc_method_handler(
+                    servicer.SetUniqueConstraint,
+                    request_deserializer=my__database__pb2.SetUniqueConstraintRequest.FromString,
+                    response_serializer=my__database__pb2.Empty.SerializeToString,
+            ),
+            'DropUniqueConstraint': grpc.unary_unary_rpc_method_handler(
+                    servicer.DropUniqueConstraint,
+                    request_deserializer=my__database__pb2.DropUniqueConstraintRequest.FromString,
+                    response_serializer=my__database__pb2.Empty.SerializeToString,
+            ),
+            'Watch': grpc.unary_stream_rpc_method_handler(
+                    servicer.Watch,
+                    request_deserializer=my__database__pb2.WatchRequest.FromString,
+                    response_serializer=my__database__pb2.ChangeEvent.SerializeToString,
+            ),
+            'Profile': grpc.unary_unary_rpc_method_handler(
+                    servicer.Profile,
+                    request_deserializer=my__database__pb2.ProfileRequest.FromString,
+                    response_serializer=my__database__pb2.ProfileResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'dbservice.MyDatabaseService', rpc_method_handlers)
@@ -304,7 +544,7 @@ class MyDatabaseService(object):
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/AddNewRow',
             my__database__pb2.AddNewRowRequest.SerializeToString,
-            my__database__pb2.Empty.FromString,
+            my__database__pb2.AddRowResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
@@ -321,7 +561,7 @@ class MyDatabaseService(object):
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/AddRow',
             my__database__pb2.AddRowRequest.SerializeToString,
-            my__database__pb2.Empty.FromString,
+            my__database__pb2.AddRowResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
@@ -460,3 +700,258 @@ class MyDatabaseService(object):
             my__database__pb2.UpdateTableCellResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamTable(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/dbservice.MyDatabaseService/StreamTable',
+            my__database__pb2.StreamTableRequest.SerializeToString,
+            my__database__pb2.StreamTableResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetTableData(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/GetTableData',
+            my__database__pb2.DisplayTableRequest.SerializeToString,
+            my__database__pb2.TableData.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def BatchMutate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/BatchMutate',
+            my__database__pb2.BatchMutateRequest.SerializeToString,
+            my__database__pb2.BatchMutateResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def BatchMutateStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/dbservice.MyDatabaseService/BatchMutateStream',
+            my__database__pb2.BatchMutateRequest.SerializeToString,
+            my__database__pb2.BatchMutateResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def BulkLoad(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/dbservice.MyDatabaseService/BulkLoad',
+            my__database__pb2.BulkLoadRequest.SerializeToString,
+            my__database__pb2.BulkLoadResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def AppendTableData(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/AppendTableData',
+            my__database__pb2.AppendTableDataRequest.SerializeToString,
+            my__database__pb2.BulkLoadResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CreateIndex(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/CreateIndex',
+            my__database__pb2.CreateIndexRequest.SerializeToString,
+            my__database__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def DropIndex(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/DropIndex',
+            my__database__pb2.DropIndexRequest.SerializeToString,
+            my__database__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Lookup(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/Lookup',
+            my__database__pb2.LookupRequest.SerializeToString,
+            my__database__pb2.LookupResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Query(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/Query',
+            my__database__pb2.QueryRequest.SerializeToString,
+            my__database__pb2.QueryResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Aggregate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/Aggregate',
+            my__database__pb2.AggregateRequest.SerializeToString,
+            my__database__pb2.AggregateResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SetUniqueConstraint(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/SetUniqueConstraint',
+            my__database__pb2.SetUniqueConstraintRequest.SerializeToString,
+            my__database__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def DropUniqueConstraint(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/DropUniqueConstraint',
+            my__database__pb2.DropUniqueConstraintRequest.SerializeToString,
+            my__database__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Watch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/dbservice.MyDatabaseService/Watch',
+            my__database__pb2.WatchRequest.SerializeToString,
+            my__database__pb2.ChangeEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Profile(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/dbservice.MyDatabaseService/Profile',
+            my__database__pb2.ProfileRequest.SerializeToString,
+            my__database__pb2.ProfileResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
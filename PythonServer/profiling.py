@@ -0,0 +1,288 @@
+import collections
+import contextvars
+import json
+import os
+import selectors
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import grpc
+
+DEFAULT_PROFILE_SECONDS = 10
+MAX_PROFILE_SECONDS = 300
+DEFAULT_INTERVAL_MS = 5
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LOCKS_FILE = os.path.join(SOURCE_DIRECTORY, 'locks.py')
+# A thread whose innermost frame is in one of these is waiting on a
+# condition, an event or a socket.
+WAITING_FILES = {os.path.abspath(threading.__file__), os.path.abspath(selectors.__file__)}
+
+
+def frame_label(code):
+    return f'{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}'
+
+
+# A thread is idle when it runs none of the server's code (gRPC's own
+# threads, idle pool workers), or when it is parked waiting (a Watch waiting
+# for changes, the main thread waiting for shutdown, the aio event loop
+# waiting for sockets). Waiting for a table lock is contention, not
+# idleness, and is kept.
+def is_idle(codes):
+    if not any(code.co_filename.startswith(SOURCE_DIRECTORY) for code in codes):
+        return True
+    if codes[-1].co_filename in WAITING_FILES:
+        waiter = next((code for code in reversed(codes) if code.co_filename not in WAITING_FILES), None)
+        return waiter is None or waiter.co_filename != LOCKS_FILE
+    return False
+
+
+# Samples the stacks of every other thread every interval seconds for the
+# given time, or until active() turns false, and returns how often each stack
+# was seen, keyed by its frames from the outermost in, plus the number of
+# samples taken. A sampler thread needs the GIL to look, so a handler that
+# holds it for long is seen late but not missed.
+def sample_stacks(seconds, interval, include_idle=False, active=None):
+    stacks = collections.Counter()
+    own_thread = threading.get_ident()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and (active is None or active()):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            if include_idle or not is_idle(codes):
+                stacks[tuple(frame_label(code) for code in codes)] += 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+
+# The collapsed-stack format flamegraph.pl and speedscope read: one line per
+# stack, frames joined by semicolons, then the number of samples.
+def collapse(stacks):
+    return ''.join(f'{";".join(stack)} {count}\n' for stack, count in stacks.most_common())
+
+
+def profile_seconds(seconds):
+    if seconds <= 0:
+        return DEFAULT_PROFILE_SECONDS
+    return min(seconds, MAX_PROFILE_SECONDS)
+
+
+# kill -USR1 <pid> profiles the process for `seconds` on a background thread
+# and writes the collapsed stacks to a file in directory. Not available on
+# Windows, which has no SIGUSR1.
+def install_signal_handler(directory, seconds=DEFAULT_PROFILE_SECONDS, interval=DEFAULT_INTERVAL_MS / 1000):
+    import signal
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+
+    def write_profile():
+        stacks, samples = sample_stacks(seconds, interval)
+        path = os.path.join(directory, f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.folded')
+        with open(path, 'w') as file:
+            file.write(collapse(stacks))
+        print(f'Wrote {samples} samples to {path}', file=sys.stderr)
+
+    signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=write_profile, daemon=True).start())
+    return True
+
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+# Where the time of one call went. The handler's time is split into named
+# phases by phase(); the rest is 'handler'. Serializing the response and,
+# for streams, waiting for the client to take each message are timed by the
+# slow request interceptors.
+class RequestTrace:
+    def __init__(self, method):
+        self.method = method
+        self.table = None
+        self.table_rows = None
+        self.result_rows = None
+        self.phases = collections.defaultdict(float)
+        self.phase = 'handler'
+        self.started = self.phase_started = time.perf_counter()
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        self.phases[self.phase] += now - self.phase_started
+        previous, self.phase, self.phase_started = self.phase, phase, now
+        return previous
+
+    def finish(self):
+        self.enter(None)
+        return time.perf_counter() - self.started
+
+    def record(self, seconds):
+        entry = {'method': self.method, 'ms': round(seconds * 1000, 3)}
+        if self.table is not None:
+            entry['table'] = self.table
+        if self.table_rows is not None:
+            entry['tableRows'] = self.table_rows
+        if self.result_rows is not None:
+            entry['resultRows'] = self.result_rows
+        entry['phases'] = {phase: round(phase_seconds * 1000, 3) for phase, phase_seconds in self.phases.items()}
+        return entry
+
+
+# Handlers mark their phases and what they worked on with these; both do
+# nothing unless a slow request log is tracing the call.
+@contextmanager
+def phase(name):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    previous = trace.enter(name)
+    try:
+        yield
+    finally:
+        trace.enter(previous)
+
+
+def note(table=None, table_rows=None, result_rows=None):
+    trace = _current_trace.get()
+    if trace is not None:
+        if table is not None:
+            trace.table = table
+        if table_rows is not None:
+            trace.table_rows = table_rows
+        if result_rows is not None:
+            trace.result_rows = result_rows
+
+
+# Writes a JSON line for every call that took at least threshold seconds.
+class SlowRequestLog:
+    def __init__(self, threshold, path=None):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', buffering=1) if path else sys.stderr
+
+    def finished(self, trace):
+        seconds = trace.finish()
+        if seconds >= self.threshold:
+            line = json.dumps(trace.record(seconds))
+            with self.lock:
+                self.file.write(line + '\n')
+
+
+# The interceptors serialize responses inside the call, so that time is part
+# of the trace, and hand gRPC the bytes through a pass-through serializer.
+def passthrough(data):
+    return data
+
+
+def traced(log, method, handler):
+    serialize = handler.response_serializer or passthrough
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        def behavior(request, context):
+            trace = RequestTrace(method)
+            token = _current_trace.set(trace)
+            try:
+                for response in inner(request, context):
+                    trace.enter('serialize')
+                    data = serialize(response)
+                    trace.enter('send')
+                    yield data
+                    trace.enter('handler')
+            finally:
+                # A stream dropped by the client may be closed from another
+                # thread, where the token does not apply.
+                try:
+                    _current_trace.reset(token)
+                except ValueError:
+                    pass
+                log.finished(trace)
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        def behavior(request, context):
+            trace = RequestTrace(method)
+            token = _current_trace.set(trace)
+            try:
+                response = inner(request, context)
+                trace.enter('serialize')
+                return serialize(response)
+            finally:
+                _current_trace.reset(token)
+                log.finished(trace)
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, response_serializer=passthrough)
+
+
+# The handlers of the aio server run on executor threads; AsyncDatabaseService
+# runs them in a copy of the caller's context, which carries the trace there.
+def traced_async(log, method, handler):
+    serialize = handler.response_serializer or passthrough
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        async def behavior(request, context):
+            trace = RequestTrace(method)
+            _current_trace.set(trace)
+            try:
+                async for response in inner(request, context):
+                    trace.enter('serialize')
+                    data = serialize(response)
+                    trace.enter('send')
+                    yield data
+                    trace.enter('handler')
+            finally:
+                log.finished(trace)
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        async def behavior(request, context):
+            trace = RequestTrace(method)
+            _current_trace.set(trace)
+            try:
+                response = await inner(request, context)
+                trace.enter('serialize')
+                return serialize(response)
+            finally:
+                log.finished(trace)
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, response_serializer=passthrough)
+
+
+class SlowRequestInterceptor(grpc.ServerInterceptor):
+    def __init__(self, log):
+        self.log = log
+        self.handlers = {}
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, traced(self.log, handler_call_details.method.rsplit('/', 1)[-1], handler))
+        return cached[1]
+
+
+class AsyncSlowRequestInterceptor(grpc.aio.ServerInterceptor):
+    def __init__(self, log):
+        self.log = log
+        self.handlers = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, traced_async(self.log, handler_call_details.method.rsplit('/', 1)[-1], handler))
+        return cached[1]
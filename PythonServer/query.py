@@ -0,0 +1,144 @@
+from my_database_pb2 import Predicate
+from encoding import parse_value
+from storage import is_dictionary_type
+
+NULL_OPS = (Predicate.IS_NULL, Predicate.IS_NOT_NULL)
+
+
+# Numeric columns compare against the number as given, so "< 2.5" works on an
+# Int32 column as well.
+def predicate_value(column_type, value):
+    if not is_dictionary_type(column_type) and value.WhichOneof('kind') == 'number_value':
+        return value.number_value
+    return parse_value(column_type, value)
+
+
+# String columns are dictionary encoded, so a predicate on one is turned into
+# the set of codes whose strings match; the scan then only compares ints.
+def matching_codes(dictionary, op, value, high):
+    if op == Predicate.EQ:
+        return {code for code, entry in enumerate(dictionary) if entry == value}
+    if op == Predicate.LT:
+        return {code for code, entry in enumerate(dictionary) if entry < value}
+    if op == Predicate.GT:
+        return {code for code, entry in enumerate(dictionary) if entry > value}
+    if op == Predicate.BETWEEN:
+        return {code for code, entry in enumerate(dictionary) if value <= entry <= high}
+    return {code for code, entry in enumerate(dictionary) if entry.startswith(value)}
+
+
+# Null flags of the given rows as '1' (set) or '0' (null), indexed by row.
+# Decoding the whole bitmap at once is cheapest for a scan, but costs the
+# size of the table, so a few rows, such as an index lookup's, read their
+# own bits instead.
+def null_flags(column, row_count, rows):
+    if len(rows) * 8 >= row_count:
+        return column.valid.flags(0, row_count)
+    valid = column.valid
+    return {row: '1' if valid[row] else '0' for row in rows}
+
+
+def filter_rows(column, row_count, rows, op, value, high):
+    flags = null_flags(column, row_count, rows)
+    data = column.data
+    if op == Predicate.IS_NULL:
+        return [row for row in rows if flags[row] == '0']
+    if op == Predicate.IS_NOT_NULL:
+        return [row for row in rows if flags[row] == '1']
+    if column.dictionary is not None:
+        codes = matching_codes(column.dictionary, op, value, high)
+        return [row for row in rows if flags[row] == '1' and data[row] in codes]
+    if op == Predicate.EQ:
+        return [row for row in rows if flags[row] == '1' and data[row] == value]
+    if op == Predicate.LT:
+        return [row for row in rows if flags[row] == '1' and data[row] < value]
+    if op == Predicate.GT:
+        return [row for row in rows if flags[row] == '1' and data[row] > value]
+    return [row for row in rows if flags[row] == '1' and value <= data[row] <= high]
+
+
+# Nulls sort before every value, so they come first in ascending order and
+# last in descending order.
+def sort_key(column, row_count, rows):
+    flags = null_flags(column, row_count, rows)
+    data, dictionary = column.data, column.dictionary
+    if dictionary is None:
+        return lambda row: (flags[row] == '1', data[row])
+    return lambda row: (flags[row] == '1', dictionary[data[row]])
+
+
+def find_column(column_names, column_name):
+    if column_name not in column_names:
+        raise ValueError(f'Column "{column_name}" does not exist')
+    return column_names.index(column_name)
+
+
+# A validated QueryRequest with every column resolved to its position and
+# every value parsed for its column's type. Predicates are ANDed together.
+class QueryPlan:
+    def __init__(self, request, column_info):
+        column_names = [column_name for column_name, _ in column_info]
+        self.column_indexes = [find_column(column_names, column_name) for column_name in request.columns] or list(range(len(column_names)))
+        self.predicates = []
+        for predicate in request.where:
+            column_index = find_column(column_names, predicate.column)
+            column_type = column_info[column_index][1]
+            value = high = None
+            if predicate.op not in NULL_OPS:
+                value = predicate_value(column_type, predicate.value)
+                if value is None:
+                    raise ValueError(f'The predicate on "{predicate.column}" needs a value; use IS_NULL to match nulls')
+            if predicate.op == Predicate.BETWEEN:
+                high = predicate_value(column_type, predicate.high)
+                if high is None:
+                    raise ValueError(f'BETWEEN on "{predicate.column}" needs a high value')
+            if predicate.op == Predicate.PREFIX and not is_dictionary_type(column_type):
+                raise ValueError(f'PREFIX needs a string column, "{predicate.column}" is {column_type}')
+            self.predicates.append((column_index, predicate.op, value, high))
+        self.order = [(find_column(column_names, order.column), order.descending) for order in request.orderBy]
+        if request.limit < 0 or request.offset < 0:
+            raise ValueError('limit and offset must not be negative')
+        self.limit = request.limit
+        self.offset = request.offset
+
+    # Answers the first predicate an index can serve from that index. Must be
+    # called under the table's read lock, and the snapshot the rest of the
+    # query reads must be pinned under the same lock so the row ids the index
+    # returns are turned into the positions that snapshot sees.
+    # Returns the candidate rows, or None for a full scan, and the predicates
+    # still to be checked.
+    def index_candidates(self, table):
+        for n, (column_index, op, value, high) in enumerate(self.predicates):
+            index = table.indexes.get(table.columns[column_index].name)
+            if index is None:
+                continue
+            if op == Predicate.EQ:
+                rows = index.equal(value)
+            elif index.kind == 'SORTED' and op == Predicate.LT:
+                rows = index.range(None, value, exclude_high=True)
+            elif index.kind == 'SORTED' and op == Predicate.GT:
+                rows = index.range(value, None, exclude_low=True)
+            elif index.kind == 'SORTED' and op == Predicate.BETWEEN:
+                rows = index.range(value, high)
+            else:
+                continue
+            return sorted(table.positions(rows)), self.predicates[:n] + self.predicates[n + 1:]
+        return None, self.predicates
+
+    # Returns the requested page of matching row positions and how many rows
+    # matched in total.
+    def run(self, snapshot, rows, predicates):
+        row_count = len(snapshot)
+        stop = self.offset + self.limit if self.limit else None
+        if rows is None and not predicates and not self.order:
+            # A plain page of the table needs no scan.
+            return list(range(row_count)[self.offset:stop]), row_count
+        if rows is None:
+            rows = range(row_count)
+        for column_index, op, value, high in predicates:
+            rows = filter_rows(snapshot.columns[column_index], row_count, rows, op, value, high)
+        rows = list(rows)
+        # Stable sorts from the last key to the first give a multi-key order.
+        for column_index, descending in reversed(self.order):
+            rows.sort(key=sort_key(snapshot.columns[column_index], row_count, rows), reverse=descending)
+        return rows[self.offset:stop], len(rows)
@@ -1,257 +1,975 @@
+import argparse
+import asyncio
+import functools
 import grpc
+import itertools
+import os
+import threading
+import time
 from concurrent import futures
+from contextlib import ExitStack, contextmanager
 from google.protobuf import struct_pb2
-from my_database_pb2 import (Empty, ColumnsInfoResponse, TablesResponse, DisplayTableResponse, UpdateTableCellResponse, TableInfo)
+from my_database_pb2 import (Empty, AddRowResponse, ProfileResponse, ColumnsInfoResponse, TablesResponse, DisplayTableResponse, UpdateTableCellResponse, TableInfo, StreamTableResponse, TableData, MutationResult, BatchMutateResponse, BulkLoadRequest, BulkLoadResponse, AppendTableDataRequest, CreateIndexRequest, LookupResponse, QueryResponse, AggregateResponse, SetUniqueConstraintRequest, ChangeEvent)
 from my_database_pb2_grpc import MyDatabaseServiceServicer, add_MyDatabaseServiceServicer_to_server
+from storage import DynamicTable, UniqueViolation, parse_text
+from encoding import encode_table_data, encode_table_rows, decode_columns, parse_value
+from bulkload import BulkLoader, iter_chunks
+from locks import ReadWriteLock
+from query import QueryPlan
+from aggregate import AggregatePlan
+from wal import WriteAheadLog, recover, write_checkpoint
+from checkpoint import table_definition
+from changefeed import ChangeFeed, change_events, snapshot_events
+import profiling
+import wire_compression
 
-class DynamicTable:
-    def __init__(self):
-        self.column_info = []
-        self.rows = []
-
-    def add_column(self, column_name, column_type):
-        if any(col[0] == column_name for col in self.column_info):
-            raise ValueError(f'Column "{column_name}" already exists')
-        self.column_info.append((column_name, column_type))
-        for row in self.rows:
-            row[column_name] = None
-
-    def delete_column(self, column_name):
-        if not any(col[0] == column_name for col in self.column_info):
-            raise ValueError(f'Column "{column_name}" does not exist')
-        index = next(i for i, col in enumerate(self.column_info) if col[0] == column_name)
-        del self.column_info[index]
-        for row in self.rows:
-            del row[column_name]
-
-    def add_row(self, values):
-        if len(values) != len(self.column_info):
-            raise ValueError("Number of values must match the number of columns")
-        validated_values = []
-        for (column_name, column_type), value in zip(self.column_info, values):
-            if not isinstance(value, column_type):
-                raise ValueError(f'Invalid type for column "{column_name}". Expected {column_type}, got {type(value)}')
-            validated_values.append(value)
-        row = dict(zip((col[0] for col in self.column_info), validated_values))
-        self.rows.append(row)
-
-    def add_new_row(self):
-        list_values = [None] * len(self.column_info)
-        self.add_row(list_values)
-
-    def remove_row(self, row_index):
-        if not (0 <= row_index < len(self.rows)):
-            raise ValueError("Invalid row index")
-        del self.rows[row_index]
-
-    def remove_duplicates(self):
-        seen_rows = set(tuple(row.values()) for row in self.rows)
-        unique_rows = [dict(zip((col[0] for col in self.column_info), values)) for values in seen_rows]
-        self.rows = unique_rows
+DEFAULT_STREAM_BATCH_SIZE = 1000
+MAX_STREAM_BATCH_SIZE = 10000
+DEFAULT_CHECKPOINT_BYTES = 64 << 20
+# gRPC only accepts messages of up to 4 MB by default, less than a BulkLoad
+# chunk or BatchMutate of a wide table can need.
+DEFAULT_MAX_RECEIVE_BYTES = 64 << 20
+# PythonClient pings its connections every 30 s, also while no call is open,
+# to notice a server that went away without a word. gRPC's default policy only
+# takes such pings every 5 minutes and answers more frequent ones with GOAWAY
+# too_many_pings, which dropped idle Watch streams, so servers accept them
+# down to MIN_PING_INTERVAL_MS.
+MIN_PING_INTERVAL_MS = 10000
+KEEPALIVE_OPTIONS = [
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.min_ping_interval_without_data_ms', MIN_PING_INTERVAL_MS),
+]
+# How often an idle Watch stream checks whether its client has gone.
+WATCH_POLL_SECONDS = 1.0
+
+def parse_row(column_info, values):
+    if len(values) > len(column_info):
+        raise ValueError("Number of values must match the number of columns")
+    row = [parse_value(column_type, value) for (_, column_type), value in zip(column_info, values)]
+    row.extend([None] * (len(column_info) - len(row)))
+    return row
+
+# Rows are addressed by their id when the request carries one and by position
+# otherwise. Returns None for a row that does not exist.
+def find_row(table, row_id, row_index):
+    if row_id:
+        try:
+            return table.position(row_id)
+        except ValueError:
+            return None
+    return row_index if 0 <= row_index < len(table) else None
+
+def mutation_row(table, mutation):
+    if mutation.rowId:
+        return table.position(mutation.rowId)
+    return mutation.row
+
+# Watch streams on a thread pool server hold a handler thread for as long as
+# they are open, idle or not, so only max_workers - 1 of them are let in and
+# other calls always find a thread.
+def watch_slots(max_workers):
+    return threading.BoundedSemaphore(max(max_workers - 1, 0))
+
+# Takes one of the slots for a new Watch stream, or fails the call if none is
+# free. slots is None where watchers cost no thread.
+def take_watch_slot(slots, context):
+    if slots is None or slots.acquire(blocking=False):
+        return True
+    context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+    context.set_details('Too many open watches for the server\'s handler threads; close one or raise --max-workers.')
+    return False
+
+def struct_row(column_names, row):
+    struct_values = {key: struct_pb2.Value(string_value=str(value)) if value != None else struct_pb2.Value(string_value="") for key, value in zip(column_names, row)}
+    return struct_pb2.Struct(fields=struct_values)
+
+# Mutating handlers journal their request once the change has been applied,
+# while they still hold the lock that orders it, so a rejected request is
+# never replayed. They wait for it to be durable only after letting go, so
+# writers to other tables (or the same one) can share a single fsync.
+def durable(handler):
+    @functools.wraps(handler)
+    def wrapper(self, request, context):
+        try:
+            return handler(self, request, context)
+        finally:
+            if self.wal is not None:
+                self.wal.commit()
+    return wrapper
 
 class DatabaseService(MyDatabaseServiceServicer):
     def __init__(self):
         self.tables = {}
+        self.catalog_lock = ReadWriteLock()
+        self.wal = None
+        self.checkpoint_bytes = DEFAULT_CHECKPOINT_BYTES
+        self.checkpoint_lock = threading.Lock()
+        self.feed = ChangeFeed()
+        # The sequence number of the latest change to each table. Sequence
+        # numbers only grow, also across restarts and when a table is dropped
+        # and created again, so a client can tell from it whether a copy it
+        # holds is still current.
+        self.versions = {}
+        # Limits open Watch streams when the service runs on a thread pool
+        # server; see watch_slots().
+        self.watch_slots = None
+
+    # Restores the tables from the data directory and journals every later
+    # change there. Must be called before the server starts.
+    def open_log(self, directory, sync_mode='request', sync_interval=0.01, checkpoint_bytes=DEFAULT_CHECKPOINT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        replayed_bytes = recover(self, directory)
+        # Tables loaded from a checkpoint do not report their changes yet.
+        for table_name, table in self.tables.items():
+            table.observer = functools.partial(self._table_changed, table_name, table)
+            self.versions[table_name] = self.feed.sequence
+        self.wal = WriteAheadLog(directory, sync_mode, sync_interval)
+        self.checkpoint_bytes = checkpoint_bytes
+        if replayed_bytes >= checkpoint_bytes:
+            self._start_checkpoint()
+
+    def _log(self, method, request):
+        if self.wal is None:
+            return
+        self.wal.append(method, request)
+        if self.wal.segment_bytes >= self.checkpoint_bytes:
+            self._start_checkpoint()
+
+    # Writers hold the catalog read lock, so under the write lock every table
+    # can be pinned and the log cut over to a new segment at one consistent
+    # point, together with their index and constraint definitions, which are
+    # not versioned. The snapshots are written out after the lock is dropped;
+    # once the checkpoint is on disk the segments it covers are deleted, so
+    # recovery only replays what was written since.
+    def checkpoint(self):
+        with self.checkpoint_lock:
+            self._checkpoint()
 
+    def _checkpoint(self):
+        with self.catalog_lock.write_locked():
+            snapshots = [(table_name, table.snapshot(), table_definition(table)) for table_name, table in self.tables.items()]
+            segment = self.wal.rotate()
+        try:
+            write_checkpoint(self.wal.directory, segment, snapshots, sync=self.wal.sync_mode != 'off')
+        finally:
+            for _, snapshot, _ in snapshots:
+                snapshot.release()
+        self.wal.remove_segments(segment)
+
+    def _start_checkpoint(self):
+        if self.checkpoint_lock.acquire(blocking=False):
+            threading.Thread(target=self._background_checkpoint, daemon=True).start()
+
+    def _background_checkpoint(self):
+        try:
+            self._checkpoint()
+        finally:
+            self.checkpoint_lock.release()
+
+    # Looks a table up under the catalog read lock and then holds the table's
+    # own lock. The catalog lock is kept for the whole call so a concurrent
+    # RemoveTable or CreateDatabase cannot swap the table out from under it.
+    @contextmanager
+    def _locked_table(self, table_name, write=False):
+        with ExitStack() as stack:
+            with profiling.phase('lookup'):
+                stack.enter_context(self.catalog_lock.read_locked())
+                table = self.tables.get(table_name)
+                if table is not None:
+                    stack.enter_context(table.lock.write_locked() if write else table.lock.read_locked())
+            if table is not None:
+                profiling.note(table=table_name, table_rows=len(table))
+            yield table
+
+    # Pins a snapshot of the table and drops every lock before the caller reads
+    # it, so a long scan never holds up writers.
+    @contextmanager
+    def _table_snapshot(self, table_name):
+        with self._locked_table(table_name) as table:
+            snapshot = table.snapshot() if table is not None else None
+        if snapshot is None:
+            yield None
+            return
+        with snapshot:
+            yield snapshot
+
+    # Table changes are published while the writer still holds the table's
+    # write lock, and catalog changes under the catalog write lock, so the
+    # feed orders them exactly as they were applied.
+    def _table_changed(self, table_name, table, kind, argument):
+        self.versions[table_name] = self.feed.publish(lambda: change_events(table_name, table, kind, argument))
+
+    def _table_dropped(self, table_name, table):
+        table.observer = None
+        self.versions.pop(table_name, None)
+        self.feed.publish(lambda: change_events(table_name, table, 'DROP_TABLE', None))
+
+    def _get_table(self, table_name):
+        with self.catalog_lock.read_locked():
+            return self.tables.get(table_name)
+
+    @durable
     def CreateDatabase(self, request, context):
-        self.tables = {}
+        with self.catalog_lock.write_locked():
+            for table_name, table in self.tables.items():
+                self._table_dropped(table_name, table)
+            self.tables = {}
+            self._log('CreateDatabase', request)
         return Empty()
 
+    @durable
     def AddTable(self, request, context):
+        with self.catalog_lock.write_locked():
+            return self._add_table(request, context)
+
+    def _add_table(self, request, context):
         table_name = request.tableName
         if table_name not in self.tables:
-            dynamic_table = DynamicTable()
-            print(request)
-            for column_info in request.columnInfo:
-                dynamic_table.column_info.append((column_info.ColumnName, column_info.ColumnType))
+            try:
+                dynamic_table = DynamicTable((column_info.ColumnName, column_info.ColumnType) for column_info in request.columnInfo)
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return Empty()
             self.tables[table_name] = dynamic_table
+            dynamic_table.observer = functools.partial(self._table_changed, table_name, dynamic_table)
+            self.versions[table_name] = self.feed.publish(lambda: snapshot_events(table_name, dynamic_table, 0))
+            self._log('AddTable', request)
             return Empty()
         else:
             context.set_code(grpc.StatusCode.ALREADY_EXISTS)
             context.set_details(f'Table "{table_name}" already exists.')
             return Empty()
 
+    @durable
     def RemoveTable(self, request, context):
+        with self.catalog_lock.write_locked():
+            return self._remove_table(request, context)
+
+    def _remove_table(self, request, context):
         table_name = request.tableName
         if table_name in self.tables:
-            del self.tables[table_name]
+            self._table_dropped(table_name, self.tables.pop(table_name))
+            self._log('RemoveTable', request)
             return Empty()
         else:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f'Table "{table_name}" not found.')
             return Empty()
 
+    @durable
     def AddNewRow(self, request, context):
         table_name = request.tableName
-        if table_name in self.tables:
-            new_row = {}
-            for column_name, column_type in self.tables[table_name].column_info:
-                new_row[column_name] = None
-            self.tables[table_name].rows.append(new_row)
-            return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                row_index = table.add_new_row()
+                self._log('AddNewRow', request)
+                return AddRowResponse(rowId=table.row_id(row_index))
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return AddRowResponse()
 
+    @durable
     def AddRow(self, request, context):
         table_name = request.tableName
-        if table_name in self.tables:
-            new_row = {}
-            for i, value in enumerate(request.values):
-                column_name, column_type = self.tables[table_name].column_info[i]
-                if column_type == 'System.String' or column_type == 'System.Char':
-                    new_row[column_name] = value.str_value
-                elif column_type == 'System.Int32':
-                    new_row[column_name] = int(value.str_value)
-                elif column_type == 'System.Double':
-                    new_row[column_name] = float(value.str_value)
-            self.tables[table_name].rows.append(new_row)
-            return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                try:
+                    row_index = table.add_row(parse_row(table.column_info, request.values))
+                except UniqueViolation as e:
+                    context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+                    context.set_details(str(e))
+                    return AddRowResponse()
+                except ValueError as e:
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    context.set_details(str(e))
+                    return AddRowResponse()
+                self._log('AddRow', request)
+                return AddRowResponse(rowId=table.row_id(row_index))
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return AddRowResponse()
 
+    @durable
     def DeleteRow(self, request, context):
         table_name = request.tableName
-        row_index = request.rowIndex - 1
-        if table_name in self.tables and 0 <= row_index < len(self.tables[table_name].rows):
-            del self.tables[table_name].rows[row_index]
-            return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" or row index {row_index} not found.')
-            return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            row_index = find_row(table, request.rowId, request.rowIndex - 1) if table is not None else None
+            if row_index is not None:
+                table.remove_row(row_index)
+                self._log('DeleteRow', request)
+                return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" or row {request.rowId or request.rowIndex} not found.')
+                return Empty()
 
+    @durable
     def AddColumn(self, request, context):
         table_name = request.tableName
         column_info = request.columnInfo
-        if table_name in self.tables:
-            for existing_column_name, _ in self.tables[table_name].column_info:
-                if existing_column_name == column_info.ColumnName:
-                    context.set_code(grpc.StatusCode.ALREADY_EXISTS)
-                    context.set_details(f'Column "{column_info.ColumnName}" already exists in table "{table_name}".')
-                    return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                for existing_column_name, _ in table.column_info:
+                    if existing_column_name == column_info.ColumnName:
+                        context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+                        context.set_details(f'Column "{column_info.ColumnName}" already exists in table "{table_name}".')
+                        return Empty()
 
-            self.tables[table_name].column_info.append((column_info.ColumnName, column_info.ColumnType))
-            for row in self.tables[table_name].rows:
-                row[column_info.ColumnName] = None
-            return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return Empty()
+                table.add_column(column_info.ColumnName, column_info.ColumnType)
+                self._log('AddColumn', request)
+                return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
 
+    @durable
     def DeleteColumn(self, request, context):
         table_name = request.tableName
         column_name = request.columnName
-        if table_name in self.tables:
-            if any(existing_column_name == column_name for existing_column_name, _ in self.tables[table_name].column_info):
-                self.tables[table_name].column_info = [(existing_column_name, column_type) for existing_column_name, column_type in self.tables[table_name].column_info if existing_column_name != column_name]
-                for row in self.tables[table_name].rows:
-                    del row[column_name]
-                return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                if table.has_column(column_name):
+                    table.delete_column(column_name)
+                    self._log('DeleteColumn', request)
+                    return Empty()
+                else:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Column "{column_name}" not found in table "{table_name}".')
+                    return Empty()
             else:
                 context.set_code(grpc.StatusCode.NOT_FOUND)
-                context.set_details(f'Column "{column_name}" not found in table "{table_name}".')
+                context.set_details(f'Table "{table_name}" not found.')
                 return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return Empty()
 
+    @durable
     def RemoveDuplicates(self, request, context):
         table_name = request.tableName
-        if table_name in self.tables:
-            seen_rows = set()
-            unique_rows = []
-            for row in self.tables[table_name].rows:
-                values = tuple(row.values())
-                if values not in seen_rows:
-                    seen_rows.add(values)
-                    unique_rows.append(row)
-
-            self.tables[table_name].rows = unique_rows
-            return Empty()
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return Empty()
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                try:
+                    with profiling.phase('scan'):
+                        table.remove_duplicates(list(request.columns))
+                except ValueError as e:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(str(e))
+                    return Empty()
+                self._log('RemoveDuplicates', request)
+                return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
 
     def GetColumnsInfo(self, request, context):
         table_name = request.tableName
-        if table_name in self.tables:
-            columns_info = [TableInfo(ColumnName=column_name, ColumnType=column_type) for column_name, column_type in self.tables[table_name].column_info]
-            return ColumnsInfoResponse(columnsInfo=columns_info)
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return ColumnsInfoResponse()
+        with self._locked_table(table_name) as table:
+            if table is not None:
+                columns_info = [TableInfo(ColumnName=column_name, ColumnType=column_type) for column_name, column_type in table.column_info]
+                return ColumnsInfoResponse(columnsInfo=columns_info)
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return ColumnsInfoResponse()
 
     def GetTables(self, request, context):
-        tables = [table_name for table_name in self.tables]
-        print(tables)
-        return TablesResponse(tables=tables)
+        with self.catalog_lock.read_locked():
+            tables = [table_name for table_name in self.tables]
+            versions = [self.versions[table_name] for table_name in tables]
+        return TablesResponse(tables=tables, versions=versions)
 
+    # version is the feed sequence the rows are current as of, so a client can
+    # follow the table from there with Watch. A client that already holds the
+    # table as of version ifChangedSince gets an empty response marked
+    # notModified unless the table changed since.
     def DisplayTable(self, request, context):
         table_name = request.tableName
-        if table_name in self.tables:
-            rows = []
-            for row in self.tables[table_name].rows:
-                struct_values = {key: struct_pb2.Value(string_value=str(value)) if value != None else struct_pb2.Value(string_value="") for key, value in row.items()}
-                rows.append(struct_pb2.Struct(fields=struct_values))
-            return DisplayTableResponse(rows=rows)
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" not found.')
-            return DisplayTableResponse()
+        with self._locked_table(table_name) as table:
+            if table is None:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return DisplayTableResponse()
+            version = self.feed.sequence
+            if request.ifChangedSince and self.versions[table_name] <= request.ifChangedSince:
+                return DisplayTableResponse(version=version, notModified=True)
+            snapshot = table.snapshot()
+        with snapshot, profiling.phase('convert'):
+            profiling.note(result_rows=len(snapshot))
+            column_info = snapshot.column_info
+            columns_info = [TableInfo(ColumnName=column_name, ColumnType=column_type) for column_name, column_type in column_info]
+            column_names = [column_name for column_name, _ in column_info]
+            rows = [struct_row(column_names, row) for row in snapshot.iter_rows()]
+            return DisplayTableResponse(rows=rows, rowIds=snapshot.row_ids.data[:len(snapshot)].tolist(), columnsInfo=columns_info, version=version)
 
+    @durable
     def UpdateTableCell(self, request, context):
         table_name = request.tableName
-        row_index = request.row
         col_name = request.colName
         value = request.value
 
-        if table_name in self.tables and 0 <= row_index < len(self.tables[table_name].rows):
-            col_index = None
-            for i, (existing_col_name, _) in enumerate(self.tables[table_name].column_info):
-                if existing_col_name == col_name:
-                    col_index = i
-                    break
+        with self._locked_table(table_name, write=True) as table:
+            row_index = find_row(table, request.rowId, request.row) if table is not None else None
+            if row_index is not None:
+                col_index = None
+                for i, (existing_col_name, _) in enumerate(table.column_info):
+                    if existing_col_name == col_name:
+                        col_index = i
+                        break
 
-            if col_index is not None:
-                try:
-                    print(self.tables[table_name].column_info[col_index][1])
-                    if self.tables[table_name].column_info[col_index][1] == 'System.String':
-                        self.tables[table_name].rows[row_index][col_name] = value
-                    elif self.tables[table_name].column_info[col_index][1] == 'System.Int32':
-                        self.tables[table_name].rows[row_index][col_name] = int(value)
-                    elif self.tables[table_name].column_info[col_index][1] == 'System.Double':
-                        self.tables[table_name].rows[row_index][col_name] = float(value)
-                    elif self.tables[table_name].column_info[col_index][1] == 'System.Char':
-                        if len(value) > 1:
-                            return UpdateTableCellResponse(success=False)
-                        self.tables[table_name].rows[row_index][col_name] = value
+                if col_index is not None:
+                    try:
+                        column_type = table.column_info[col_index][1]
+                        table.set_cell(row_index, col_name, parse_text(column_type, value))
+                    except ValueError:
+                        return UpdateTableCellResponse(success=False)
+                    self._log('UpdateTableCell', request)
                     return UpdateTableCellResponse(success=True)
-                except:
+                else:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Column "{col_name}" not found in table "{table_name}".')
                     return UpdateTableCellResponse(success=False)
+
             else:
                 context.set_code(grpc.StatusCode.NOT_FOUND)
-                context.set_details(f'Column "{col_name}" not found in table "{table_name}".')
+                context.set_details(f'Table "{table_name}" or row {request.rowId or request.row} not found.')
                 return UpdateTableCellResponse(success=False)
 
-        else:
+    def StreamTable(self, request, context):
+        table_name = request.tableName
+        batch_size = request.batchSize or DEFAULT_STREAM_BATCH_SIZE
+        if not 0 < batch_size <= MAX_STREAM_BATCH_SIZE or request.startRow < 0:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f'batchSize must be between 1 and {MAX_STREAM_BATCH_SIZE} and startRow must not be negative.')
+            return
+        # Batches are built lazily: the server only pulls the next one from this
+        # generator once the previous message has been handed to the transport,
+        # so HTTP/2 flow control keeps a slow client from buffering the table.
+        # (The aio server pulls a short run of them at a time; see
+        # aio_server.take_messages.) The whole stream reads one pinned snapshot, so it is consistent and
+        # writers are never blocked by it.
+        with self._table_snapshot(table_name) as snapshot:
+            if snapshot is None:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return
+            column_names = [column_name for column_name, _ in snapshot.column_info]
+            start_row = request.startRow
+            profiling.note(result_rows=max(0, len(snapshot) - request.startRow))
+            while start_row < len(snapshot) and context.is_active():
+                next_row = min(start_row + batch_size, len(snapshot))
+                with profiling.phase('convert'):
+                    if request.typed:
+                        # Column names and types only go out with the first batch.
+                        data = encode_table_data(snapshot, start_row, next_row, header=start_row == request.startRow)
+                        response = StreamTableResponse(startRow=start_row, nextRow=next_row, data=data)
+                    else:
+                        rows = [struct_row(column_names, row) for row in snapshot.iter_rows(start_row, next_row)]
+                        row_ids = snapshot.row_ids.data[start_row:next_row].tolist()
+                        response = StreamTableResponse(rows=rows, startRow=start_row, nextRow=next_row, rowIds=row_ids)
+                yield response
+                start_row = next_row
+
+    def GetTableData(self, request, context):
+        table_name = request.tableName
+        with self._table_snapshot(table_name) as snapshot:
+            if snapshot is not None:
+                profiling.note(result_rows=len(snapshot))
+                with profiling.phase('convert'):
+                    return encode_table_data(snapshot)
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return TableData()
+
+    @durable
+    def BatchMutate(self, request, context):
+        table_name = request.tableName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                applied, results = self._apply_mutations(table, request.mutations)
+                if applied:
+                    self._log('BatchMutate', request)
+                return BatchMutateResponse(applied=applied, results=results)
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return BatchMutateResponse()
+
+    # Each message is applied as a BatchMutate of its own, all or nothing, and
+    # the stream stops at the first message that fails; the messages after it
+    # are not read. A message whose mutations fail ends the call with
+    # applied=false and the results of every message up to and including that
+    # one, so the client can tell which were committed. A message naming a
+    # missing table ends it with NOT_FOUND, and the details say how many
+    # messages before it were applied.
+    @durable
+    def BatchMutateStream(self, request_iterator, context):
+        response = BatchMutateResponse(applied=True)
+        for applied_messages, request in enumerate(request_iterator):
+            table_name = request.tableName
+            with self._locked_table(table_name, write=True) as table:
+                if table is None:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Table "{table_name}" not found. Messages applied before it: {applied_messages}.')
+                    return BatchMutateResponse()
+                applied, results = self._apply_mutations(table, request.mutations)
+                if applied:
+                    self._log('BatchMutate', request)
+            response.results.extend(results)
+            if not applied:
+                response.applied = False
+                return response
+        return response
+
+    @durable
+    def BulkLoad(self, request_iterator, context):
+        started = time.perf_counter()
+        first = next(request_iterator, None)
+        if first is None:
+            return BulkLoadResponse()
+        table_name = first.tableName
+        table = self._get_table(table_name)
+        if table is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f'Table "{table_name}" or row index {row_index} not found.')
-            return UpdateTableCellResponse(success=False)
+            context.set_details(f'Table "{table_name}" not found.')
+            return BulkLoadResponse()
+        loader = BulkLoader(table, functools.partial(self._append_columns, table_name, table))
+        chunks = iter_chunks(itertools.chain([first], request_iterator))
+        try:
+            if first.format == BulkLoadRequest.CSV:
+                loader.load_csv(chunks, first.hasHeader)
+            elif first.format == BulkLoadRequest.NDJSON:
+                loader.load_ndjson(chunks)
+            else:
+                loader.load_arrow(chunks)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f'{e} ({loader.rows_loaded} rows were loaded before the error.)')
+            return BulkLoadResponse(rowsLoaded=loader.rows_loaded)
+        except NotImplementedError as e:
+            context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+            context.set_details(str(e))
+            return BulkLoadResponse()
+        seconds = time.perf_counter() - started
+        rows_per_second = loader.rows_loaded / seconds if seconds > 0 else 0.0
+        return BulkLoadResponse(rowsLoaded=loader.rows_loaded, seconds=seconds, rowsPerSecond=rows_per_second)
 
-def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    add_MyDatabaseServiceServicer_to_server(DatabaseService(), server)
-    server.add_insecure_port('[::]:5031')
+    # Each loaded batch is journaled as the typed rows it turned into, so the
+    # log never has to parse the original CSV or Arrow stream again.
+    def _append_columns(self, table_name, table, columns):
+        with self._locked_table(table_name, write=True) as current:
+            if current is not table:
+                raise ValueError(f'Table "{table_name}" was removed during the load.')
+            start = len(table)
+            table.extend_columns(columns)
+            self._log('AppendTableData', AppendTableDataRequest(tableName=table_name, data=encode_table_data(table, start, row_ids=False)))
+
+    @durable
+    def AppendTableData(self, request, context):
+        table_name = request.tableName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                try:
+                    table.extend_columns(decode_columns(request.data, table.column_info))
+                except UniqueViolation as e:
+                    context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+                    context.set_details(str(e))
+                    return BulkLoadResponse()
+                except ValueError as e:
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    context.set_details(str(e))
+                    return BulkLoadResponse()
+                self._log('AppendTableData', request)
+                return BulkLoadResponse(rowsLoaded=request.data.rowCount)
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return BulkLoadResponse()
+
+    @durable
+    def CreateIndex(self, request, context):
+        table_name = request.tableName
+        column_name = request.columnName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                if not table.has_column(column_name):
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Column "{column_name}" not found in table "{table_name}".')
+                    return Empty()
+                if column_name in table.indexes:
+                    context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+                    context.set_details(f'Column "{column_name}" of table "{table_name}" is already indexed.')
+                    return Empty()
+                table.create_index(column_name, CreateIndexRequest.Kind.Name(request.kind))
+                self._log('CreateIndex', request)
+                return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
+
+    @durable
+    def DropIndex(self, request, context):
+        table_name = request.tableName
+        column_name = request.columnName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                if column_name in table.indexes:
+                    table.drop_index(column_name)
+                    self._log('DropIndex', request)
+                    return Empty()
+                else:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Column "{column_name}" of table "{table_name}" has no index.')
+                    return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
+
+    @durable
+    def SetUniqueConstraint(self, request, context):
+        table_name = request.tableName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                try:
+                    table.set_unique(list(request.columns), SetUniqueConstraintRequest.OnConflict.Name(request.onConflict))
+                except ValueError as e:
+                    context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+                    context.set_details(str(e))
+                    return Empty()
+                self._log('SetUniqueConstraint', request)
+                return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
+
+    @durable
+    def DropUniqueConstraint(self, request, context):
+        table_name = request.tableName
+        with self._locked_table(table_name, write=True) as table:
+            if table is not None:
+                if table.unique is not None:
+                    table.drop_unique()
+                    self._log('DropUniqueConstraint', request)
+                    return Empty()
+                else:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(f'Table "{table_name}" has no unique constraint.')
+                    return Empty()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return Empty()
+
+    # Indexes are live structures rather than versioned ones, so a lookup reads
+    # them, and pins the snapshot it takes the matching rows from, under the
+    # table's read lock.
+    def Lookup(self, request, context):
+        table_name = request.tableName
+        column_name = request.columnName
+        with self._locked_table(table_name) as table:
+            if table is None:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return LookupResponse()
+            index = table.indexes.get(column_name)
+            if index is None:
+                context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+                context.set_details(f'Column "{column_name}" of table "{table_name}" has no index.')
+                return LookupResponse()
+            column_type = table.column_info[table.column_index(column_name)][1]
+            try:
+                if request.HasField('equals'):
+                    rows = index.equal(parse_value(column_type, request.equals))
+                else:
+                    low = parse_value(column_type, request.low) if request.HasField('low') else None
+                    high = parse_value(column_type, request.high) if request.HasField('high') else None
+                    rows = index.range(low, high, request.excludeLow, request.excludeHigh)
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return LookupResponse()
+            if request.limit > 0:
+                rows = rows[:request.limit]
+            rows = table.positions(rows)
+            snapshot = table.snapshot()
+        profiling.note(result_rows=len(rows))
+        with snapshot, profiling.phase('convert'):
+            return LookupResponse(rows=rows, data=encode_table_rows(snapshot, rows))
+
+    # Filters, sorts and pages inside the server so only the requested slice
+    # of the requested columns goes over the wire. Index positions are taken
+    # and the snapshot pinned under one read lock; the scan runs unlocked.
+    def Query(self, request, context):
+        table_name = request.tableName
+        with self._locked_table(table_name) as table:
+            if table is None:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return QueryResponse()
+            try:
+                plan = QueryPlan(request, table.column_info)
+                rows, predicates = plan.index_candidates(table)
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return QueryResponse()
+            snapshot = table.snapshot()
+            version = self.feed.sequence
+        with snapshot:
+            with profiling.phase('scan'):
+                rows, total_rows = plan.run(snapshot, rows, predicates)
+            profiling.note(result_rows=len(rows))
+            columns = [snapshot.columns[i] for i in plan.column_indexes]
+            with profiling.phase('convert'):
+                return QueryResponse(data=encode_table_rows(snapshot, rows, columns=columns), rows=rows, totalRows=total_rows, version=version)
+
+    def Aggregate(self, request, context):
+        table_name = request.tableName
+        with self._table_snapshot(table_name) as snapshot:
+            if snapshot is not None:
+                try:
+                    plan = AggregatePlan(request, snapshot.column_info)
+                    with profiling.phase('scan'):
+                        result = plan.run(snapshot)
+                    profiling.note(result_rows=len(result))
+                    with profiling.phase('convert'):
+                        return AggregateResponse(data=encode_table_data(result, row_ids=False))
+                except ValueError as e:
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    context.set_details(str(e))
+                    return AggregateResponse()
+            else:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f'Table "{table_name}" not found.')
+                return AggregateResponse()
+
+    # Streams every change to the requested tables, or to all tables if none
+    # are named. The stream opens with a DROP_TABLE event without a table
+    # name, telling the client to forget the tables it watches, followed by a
+    # SNAPSHOT of each one that exists; after that come the changes in the
+    # order they were applied. A client that reconnects with the sequence of the last event
+    # it saw gets only what it missed, unless the server no longer has those
+    # events, in which case it starts over with snapshots. A watcher that
+    # falls too far behind is restarted the same way. With skipSnapshots the
+    # snapshots are left out, for clients that read the rows they need with
+    # Query and only want to know what to read again.
+    def Watch(self, request, context):
+        if not take_watch_slot(self.watch_slots, context):
+            return
+        table_names = set(request.tables)
+        after = self.feed.subscribe()
+        try:
+            if request.fromSequence and self.feed.can_resume(request.fromSequence):
+                after = request.fromSequence
+            else:
+                after = yield from self._watch_snapshots(table_names, request.skipSnapshots)
+            while context.is_active():
+                events = self.feed.wait(after, WATCH_POLL_SECONDS)
+                if events is None:
+                    after = yield from self._watch_snapshots(table_names, request.skipSnapshots)
+                    continue
+                for event in events:
+                    after = event.sequence
+                    if not table_names or event.tableName in table_names:
+                        yield event
+        finally:
+            self.feed.unsubscribe()
+            if self.watch_slots is not None:
+                self.watch_slots.release()
+
+    # Pins every watched table under its read lock at once, so all snapshots
+    # show the same point in the feed, and returns that point's sequence.
+    # The locks are taken in name order, so two watchers cannot deadlock.
+    def _watch_snapshots(self, table_names, skip_snapshots=False):
+        if skip_snapshots:
+            sequence = self.feed.sequence
+            yield ChangeEvent(sequence=sequence, kind=ChangeEvent.DROP_TABLE)
+            return sequence
+        with ExitStack() as snapshots:
+            with self.catalog_lock.read_locked(), ExitStack() as locks:
+                tables = sorted((table_name, table) for table_name, table in self.tables.items() if not table_names or table_name in table_names)
+                for _, table in tables:
+                    locks.enter_context(table.lock.read_locked())
+                sequence = self.feed.sequence
+                pinned = [(table_name, snapshots.enter_context(table.snapshot())) for table_name, table in tables]
+            yield ChangeEvent(sequence=sequence, kind=ChangeEvent.DROP_TABLE)
+            for table_name, snapshot in pinned:
+                yield from snapshot_events(table_name, snapshot, sequence)
+        return sequence
+
+    # Samples what the server's threads are doing for the requested time and
+    # returns the stacks in the collapsed format flame graph tools read.
+    # Threads with nothing to do are left out unless includeIdle is set.
+    def Profile(self, request, context):
+        seconds = profiling.profile_seconds(request.seconds)
+        interval = (request.intervalMs or profiling.DEFAULT_INTERVAL_MS) / 1000
+        stacks, samples = profiling.sample_stacks(seconds, interval, request.includeIdle, context.is_active)
+        return ProfileResponse(collapsedStacks=profiling.collapse(stacks), samples=samples)
+
+    # Callers hold the table's write lock. If a mutation fails, the ones before
+    # it are undone in reverse order so the table never shows a partially
+    # applied batch.
+    def _apply_mutations(self, table, mutations):
+        results = []
+        undo = []
+        for mutation in mutations:
+            try:
+                results.append(self._apply_mutation(table, mutation, undo))
+            except ValueError as e:
+                results.append(MutationResult(success=False, error=str(e)))
+                for action in reversed(undo):
+                    action()
+                skipped = len(mutations) - len(results)
+                results.extend(MutationResult(success=False, error='Not applied: an earlier mutation failed.') for _ in range(skipped))
+                return False, results
+        return True, results
+
+    def _apply_mutation(self, table, mutation, undo):
+        op = mutation.WhichOneof('op')
+        if op == 'insert':
+            values = parse_row(table.column_info, mutation.insert.values)
+            replaced = table.conflicting_row(values)
+            old_values = table.row_values(replaced) if replaced is not None else None
+            row_index = table.add_row(values)
+            row_id = table.row_id(row_index)
+            if row_index == replaced:
+                undo.append(lambda: table.replace_row(table.position(row_id), old_values))
+            else:
+                undo.append(lambda: table.remove_row(table.position(row_id)))
+            return MutationResult(success=True, row=row_index, rowId=row_id)
+        elif op == 'delete':
+            row_index = mutation_row(table, mutation.delete)
+            row_id = table.row_id(row_index)
+            values = table.row_values(row_index)
+            table.remove_row(row_index)
+            undo.append(lambda: table.restore_row(row_id, values))
+            return MutationResult(success=True, row=row_index, rowId=row_id)
+        elif op == 'update':
+            row_index = mutation_row(table, mutation.update)
+            row_id = table.row_id(row_index)
+            col_name = mutation.update.colName
+            column_type = table.column_info[table.column_index(col_name)][1]
+            old_value = table.get_cell(row_index, col_name)
+            table.set_cell(row_index, col_name, parse_text(column_type, mutation.update.value))
+            undo.append(lambda: table.set_cell(table.position(row_id), col_name, old_value))
+            return MutationResult(success=True, row=row_index, rowId=row_id)
+        raise ValueError('Mutation has no operation set')
+
+def serve(port=5031, max_workers=10, service=None, interceptors=(), options=()):
+    service = service or DatabaseService()
+    service.watch_slots = watch_slots(max_workers)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), interceptors=interceptors, options=KEEPALIVE_OPTIONS + list(options))
+    add_MyDatabaseServiceServicer_to_server(service, server)
+    server.add_insecure_port(f'[::]:{port}')
     server.start()
     server.wait_for_termination()
 
+# gRPC options for the largest messages the server sends and accepts. None
+# keeps gRPC's own limit, which is none for sending and 4 MB for receiving.
+def message_size_options(max_send_bytes=None, max_receive_bytes=DEFAULT_MAX_RECEIVE_BYTES):
+    options = []
+    if max_send_bytes is not None:
+        options.append(('grpc.max_send_message_length', max_send_bytes))
+    if max_receive_bytes is not None:
+        options.append(('grpc.max_receive_message_length', max_receive_bytes))
+    return options
+
+def compression_interceptors(compression, compress_above, asynchronous=False):
+    if compression == 'none':
+        return []
+    if asynchronous:
+        return [wire_compression.AsyncCompressionInterceptor(compress_above)]
+    return [wire_compression.CompressionInterceptor(compression, compress_above)]
+
+# Sets up the metrics endpoint, slow request log and profiling signal that
+# monitor_options ask for, and returns the interceptors to install. Worker i
+# of a multi-process server serves its metrics on the metrics port + i.
+def monitoring_interceptors(service, monitor_options, asynchronous=False, worker_index=0):
+    interceptors = []
+    if monitor_options.get('metrics') is not None:
+        import metrics
+        collected = metrics.Metrics()
+        collected.add_collector(metrics.table_collector(service))
+        metrics.start_http_server(collected, monitor_options['metrics']['port'] + worker_index, monitor_options['metrics']['host'])
+        interceptors.append((metrics.AsyncMetricsInterceptor if asynchronous else metrics.MetricsInterceptor)(collected))
+    if monitor_options.get('slow_requests') is not None:
+        log = profiling.SlowRequestLog(monitor_options['slow_requests']['threshold'], monitor_options['slow_requests']['path'])
+        interceptors.append((profiling.AsyncSlowRequestInterceptor if asynchronous else profiling.SlowRequestInterceptor)(log))
+    if monitor_options.get('profile_directory') is not None:
+        profiling.install_signal_handler(monitor_options['profile_directory'])
+    return interceptors
+
+def create_service(log_options=None):
+    service = DatabaseService()
+    if log_options is not None:
+        service.open_log(**log_options)
+    return service
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the database gRPC server.')
+    parser.add_argument('--port', type=int, default=5031)
+    parser.add_argument('--mode', choices=['thread', 'aio'], default='thread', help='thread pool server or grpc.aio event loop server')
+    parser.add_argument('--max-workers', type=int, default=10, help='handler threads (in aio mode they only run handler bodies)')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes sharing the port through SO_REUSEPORT')
+    parser.add_argument('--data-dir', help='keep a write-ahead log and checkpoints here and recover from them on start (default: memory only)')
+    parser.add_argument('--fsync', choices=['request', 'interval', 'off'], default='request', help='fsync before every reply (group committed), every --fsync-interval-ms, or never')
+    parser.add_argument('--fsync-interval-ms', type=float, default=10)
+    parser.add_argument('--checkpoint-mb', type=float, default=DEFAULT_CHECKPOINT_BYTES >> 20, help='checkpoint once this much log has been written since the last one')
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this port at /metrics (with --processes, worker i uses this port + i)')
+    parser.add_argument('--metrics-host', default='127.0.0.1', help='address the metrics endpoint listens on')
+    parser.add_argument('--slow-request-ms', type=float, help='log every call that takes at least this long, with its table, row counts and where the time went')
+    parser.add_argument('--slow-request-log', help='append the slow request log to this file (default: stderr)')
+    parser.add_argument('--max-send-mb', type=float, help='largest message the server sends (default: no limit)')
+    parser.add_argument('--max-receive-mb', type=float, default=DEFAULT_MAX_RECEIVE_BYTES >> 20, help='largest message the server accepts')
+    parser.add_argument('--compression', choices=list(wire_compression.ALGORITHMS), default='gzip', help='compress responses of at least --compress-above-kb with this algorithm')
+    parser.add_argument('--compress-above-kb', type=float, default=wire_compression.DEFAULT_COMPRESS_ABOVE_BYTES >> 10)
+    parser.add_argument('--profile-dir', default='.', help='where kill -USR1 <pid> writes a profile of the next 10 seconds')
+    args = parser.parse_args()
+    if args.processes > 1 and args.mode == 'aio':
+        parser.error('--processes is only supported in thread mode')
+
+    log_options = None
+    if args.data_dir is not None:
+        log_options = {
+            'directory': args.data_dir,
+            'sync_mode': args.fsync,
+            'sync_interval': args.fsync_interval_ms / 1000,
+            'checkpoint_bytes': int(args.checkpoint_mb * (1 << 20)),
+        }
+    monitor_options = {'profile_directory': args.profile_dir}
+    if args.metrics_port is not None:
+        monitor_options['metrics'] = {'port': args.metrics_port, 'host': args.metrics_host}
+    if args.slow_request_ms is not None:
+        monitor_options['slow_requests'] = {'threshold': args.slow_request_ms / 1000, 'path': args.slow_request_log}
+    transport_options = {
+        'options': message_size_options(
+            int(args.max_send_mb * (1 << 20)) if args.max_send_mb is not None else None,
+            int(args.max_receive_mb * (1 << 20))),
+        'compression': args.compression,
+        'compress_above': int(args.compress_above_kb * (1 << 10)),
+    }
+    if args.processes > 1:
+        import multiproc
+        multiproc.serve_processes(args.port, args.processes, args.max_workers, log_options, monitor_options, transport_options)
+        return
+    service = create_service(log_options)
+    asynchronous = args.mode == 'aio'
+    # Compression goes first so that it sees, and the metrics count, the
+    # responses as the other interceptors serialize them.
+    interceptors = compression_interceptors(transport_options['compression'], transport_options['compress_above'], asynchronous)
+    interceptors += monitoring_interceptors(service, monitor_options, asynchronous)
+    if asynchronous:
+        import aio_server
+        asyncio.run(aio_server.serve(service, args.port, args.max_workers, options=transport_options['options'], interceptors=interceptors,
+                                     compression=wire_compression.server_compression(args.compression)))
+    else:
+        serve(args.port, args.max_workers, service, interceptors, transport_options['options'])
+
 if __name__ == '__main__':
-    serve()
+    main()
@@ -0,0 +1,875 @@
+import bisect
+import threading
+from array import array
+from index import INDEX_TYPES, UniqueConstraint
+from locks import ReadWriteLock
+
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+# Strings a column's dictionary may hold beyond twice its row count before it
+# is rebuilt without the ones no row uses any more.
+DICTIONARY_SLACK = 1024
+
+# Typecodes of the buffer holding each column type. Strings and chars are
+# dictionary encoded, so their buffer holds int32 codes into Column.dictionary.
+# Code 0 is always the empty string, which is also what null cells point at.
+TYPECODES = {
+    'System.Int32': 'i',
+    'System.Double': 'd',
+    'System.String': 'i',
+    'System.Char': 'i',
+}
+
+
+def is_dictionary_type(column_type):
+    return column_type not in ('System.Int32', 'System.Double')
+
+
+# Raised when a change would give two rows the same key under a table's unique
+# constraint.
+class UniqueViolation(ValueError):
+    pass
+
+
+def parse_text(column_type, text):
+    if column_type == 'System.Int32':
+        return int(text)
+    elif column_type == 'System.Double':
+        return float(text)
+    elif column_type == 'System.Char':
+        if len(text) > 1:
+            raise ValueError(f'"{text}" is not a single character')
+        return text
+    return text
+
+
+class Bitmap:
+    def __init__(self, length=0, value=False):
+        self.length = 0
+        self.bits = bytearray()
+        self.extend(length, value)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, value):
+        if value:
+            self.bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def append(self, value):
+        if self.length & 7 == 0:
+            self.bits.append(0)
+        self.length += 1
+        if value:
+            self[self.length - 1] = True
+
+    def extend(self, count, value):
+        if count <= 0:
+            return
+        start = self.length
+        self.length += count
+        self.bits.extend(bytes((self.length + 7) // 8 - len(self.bits)))
+        if value:
+            for index in range(start, min(self.length, (start + 7) & ~7)):
+                self[index] = True
+            first_full = ((start + 7) & ~7) >> 3
+            last_full = self.length >> 3
+            if last_full > first_full:
+                self.bits[first_full:last_full] = b'\xff' * (last_full - first_full)
+            for index in range(max(start, last_full << 3), self.length):
+                self[index] = True
+
+    def extend_flags(self, flags):
+        index = 0
+        while index < len(flags) and self.length & 7:
+            self.append(flags[index])
+            index += 1
+        rest = flags[index:]
+        if rest:
+            packed = int(''.join('1' if flag else '0' for flag in reversed(rest)), 2)
+            self.bits.extend(packed.to_bytes((len(rest) + 7) // 8, 'little'))
+            self.length += len(rest)
+
+    def copy(self):
+        bitmap = Bitmap()
+        bitmap.length = self.length
+        bitmap.bits = bytearray(self.bits)
+        return bitmap
+
+    # Inserting in the middle shifts every later bit. Only the bytes from the
+    # changed one on are rewritten, and the shift is done on a Python int so
+    # it runs in C instead of looping over the bytes.
+    def insert(self, index, value):
+        start = index >> 3
+        packed = int.from_bytes(self.bits[start:], 'little')
+        offset = index & 7
+        packed = (packed & ((1 << offset) - 1)) | (int(bool(value)) << offset) | (packed >> offset << (offset + 1))
+        self.length += 1
+        self.bits[start:] = packed.to_bytes(((self.length + 7) >> 3) - start, 'little')
+
+    def slice(self, start, stop):
+        length = stop - start
+        packed = int.from_bytes(self.bits[start >> 3:(stop + 7) >> 3], 'little') >> (start & 7)
+        return (packed & ((1 << length) - 1)).to_bytes((length + 7) // 8, 'little')
+
+    def flags(self, start, stop):
+        return format(int.from_bytes(self.slice(start, stop), 'little'), 'b').zfill(stop - start)[::-1]
+
+    # The inverse of flags(): a string of '0' and '1', first bit first.
+    def extend_text(self, text):
+        if self.length & 7:
+            self.extend_flags([flag == '1' for flag in text])
+            return
+        if text:
+            self.bits.extend(int(text[::-1], 2).to_bytes((len(text) + 7) // 8, 'little'))
+            self.length += len(text)
+
+    def all_set(self, start, stop):
+        length = stop - start
+        packed = int.from_bytes(self.bits[start >> 3:(stop + 7) >> 3], 'little') >> (start & 7)
+        return packed & ((1 << length) - 1) == (1 << length) - 1
+
+    def count(self):
+        return sum(bin(byte).count('1') for byte in self.bits)
+
+
+class Column:
+    def __init__(self, name, column_type, length=0):
+        self.name = name
+        self.type = column_type
+        typecode = TYPECODES.get(column_type, 'i')
+        self.data = array(typecode, bytes(array(typecode).itemsize * length))
+        self.valid = Bitmap(length, False)
+        self.dictionary = [''] if is_dictionary_type(column_type) else None
+        self.codes = {'': 0} if is_dictionary_type(column_type) else None
+        self.pins = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def typecode(self):
+        return TYPECODES.get(self.type, 'i')
+
+    # Columns loaded from a checkpoint read straight from the mapped file and
+    # must be cloned before they are changed.
+    @property
+    def mapped(self):
+        return isinstance(self.data, memoryview)
+
+    # A shared dictionary is only ever appended to, so a copy can share it with
+    # the original: codes already handed out never change meaning.
+    def clone(self):
+        column = Column.__new__(Column)
+        column.name = self.name
+        column.type = self.type
+        if self.mapped:
+            column.data = array(self.typecode)
+            column.data.frombytes(self.data.cast('B'))
+        else:
+            column.data = array(self.typecode, self.data)
+        column.valid = self.valid.copy()
+        column.dictionary = self.dictionary
+        column.codes = self.codes
+        column.pins = 0
+        return column
+
+    def validate(self, value):
+        if value is None:
+            return None
+        if self.type == 'System.Int32':
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f'Invalid type for column "{self.name}". Expected {self.type}, got {type(value)}')
+            if not INT32_MIN <= value <= INT32_MAX:
+                raise ValueError(f'Value {value} is out of range for column "{self.name}"')
+            return value
+        if self.type == 'System.Double':
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f'Invalid type for column "{self.name}". Expected {self.type}, got {type(value)}')
+            return float(value)
+        if not isinstance(value, str):
+            raise ValueError(f'Invalid type for column "{self.name}". Expected {self.type}, got {type(value)}')
+        if self.type == 'System.Char' and len(value) > 1:
+            raise ValueError(f'Value "{value}" is too long for column "{self.name}"')
+        return value
+
+    def encode(self, value):
+        if self.dictionary is None:
+            return value
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self.codes[value] = code
+        return code
+
+    # Overwritten and deleted strings stay in the dictionary, so a column whose
+    # cells keep changing to new strings would grow without bound.
+    def dictionary_bloated(self):
+        return self.dictionary is not None and len(self.dictionary) > 2 * len(self.data) + DICTIONARY_SLACK
+
+    # Gives the column a new dictionary of the strings its rows still use and
+    # renumbers the codes in place; code 0 stays the empty string. The old
+    # dictionary is left to the copies sharing it. The column must not be
+    # pinned or mapped.
+    def rebuild_dictionary(self):
+        dictionary = self.dictionary
+        used = sorted(set(self.data) - {0})
+        remap = [0] * len(dictionary)
+        for code, old_code in enumerate(used, 1):
+            remap[old_code] = code
+        self.data = array(self.typecode, map(remap.__getitem__, self.data))
+        self.dictionary = [''] + [dictionary[code] for code in used]
+        self.codes = {value: code for code, value in enumerate(self.dictionary)}
+
+    def decode(self, raw):
+        if self.dictionary is None:
+            return raw
+        return self.dictionary[raw]
+
+    def get(self, index):
+        if not self.valid[index]:
+            return None
+        return self.decode(self.data[index])
+
+    def set(self, index, value):
+        value = self.validate(value)
+        if value is None:
+            self.data[index] = 0
+            self.valid[index] = False
+        else:
+            self.data[index] = self.encode(value)
+            self.valid[index] = True
+
+    def append(self, value):
+        value = self.validate(value)
+        if value is None:
+            self.data.append(0)
+            self.valid.append(False)
+        else:
+            self.data.append(self.encode(value))
+            self.valid.append(True)
+
+    # Converts a whole batch of values into a buffer and validity flags without
+    # touching the column, so a table can check every column before appending.
+    def pack(self, values):
+        flags = [value is not None for value in values]
+        if self.dictionary is None:
+            try:
+                data = array(self.typecode, [0 if value is None else value for value in values])
+            except (OverflowError, TypeError) as e:
+                raise ValueError(f'Invalid value for column "{self.name}": {e}')
+        else:
+            validate, encode = self.validate, self.encode
+            data = array(self.typecode, [0 if value is None else encode(validate(value)) for value in values])
+        return data, flags
+
+    def extend_packed(self, data, flags):
+        self.data.extend(data)
+        self.valid.extend_flags(flags)
+
+    def insert(self, index, value):
+        value = self.validate(value)
+        if value is None:
+            self.data.insert(index, 0)
+            self.valid.insert(index, False)
+        else:
+            self.data.insert(index, self.encode(value))
+            self.valid.insert(index, True)
+
+    def values(self, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self.data))
+        data = self.data[start:stop]
+        flags = self.valid.flags(start, stop) if stop > start else ''
+        if self.dictionary is None:
+            return [value if flag == '1' else None for value, flag in zip(data, flags)]
+        dictionary = self.dictionary
+        return [dictionary[code] if flag == '1' else None for code, flag in zip(data, flags)]
+
+    # Like values(), but strings stay as their dictionary codes. Every string
+    # has exactly one code, so these compare and hash the same way as the
+    # values without decoding them.
+    def keys(self, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self.data))
+        data = self.data[start:stop]
+        flags = self.valid.flags(start, stop) if stop > start else ''
+        return [value if flag == '1' else None for value, flag in zip(data, flags)]
+
+    # A new column holding the rows of the given (start, stop) ranges, in
+    # order. The original is left as it is for the snapshots still reading it.
+    # Strings only the dropped rows used go with them once they are too many.
+    def take(self, ranges):
+        flags = self.valid.flags(0, len(self.data)) if len(self.data) else ''
+        column = Column.__new__(Column)
+        column.name = self.name
+        column.type = self.type
+        column.data = array(self.typecode)
+        view = memoryview(self.data)
+        for start, stop in ranges:
+            column.data.frombytes(view[start:stop].cast('B'))
+        view.release()
+        column.valid = Bitmap()
+        column.valid.extend_text(''.join(flags[start:stop] for start, stop in ranges))
+        column.dictionary = self.dictionary
+        column.codes = self.codes
+        column.pins = 0
+        if column.dictionary_bloated():
+            column.rebuild_dictionary()
+        return column
+
+    def nbytes(self):
+        size = self.data.itemsize * len(self.data) + len(self.valid.bits)
+        if self.dictionary is not None:
+            size += sum(len(value) for value in self.dictionary)
+        return size
+
+
+# The (start, stop) ranges of consecutive numbers in a sorted list.
+def runs(indexes):
+    ranges = []
+    for index in indexes:
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return ranges
+
+
+def iter_column_rows(columns, row_count, start=0, stop=None):
+    start, stop, _ = slice(start, stop).indices(row_count)
+    if not columns:
+        return iter([()] * max(stop - start, 0))
+    return zip(*(column.values(start, stop) for column in columns))
+
+
+# Stable 64-bit row ids, one per slot and parallel to the columns. New rows
+# get ids above every existing one and rows never move past each other, so
+# the ids stay sorted and a row's slot is found by binary search instead of
+# through a map that every delete would have to renumber. Like a column, the
+# buffer is pinned by snapshots and copied before it is changed.
+class RowIds:
+    def __init__(self, data=None):
+        self.data = array('q') if data is None else data
+        self.pins = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def mapped(self):
+        return isinstance(self.data, memoryview)
+
+    def clone(self):
+        if self.mapped:
+            data = array('q')
+            data.frombytes(self.data.cast('B'))
+        else:
+            data = array('q', self.data)
+        return RowIds(data)
+
+    def take(self, ranges):
+        data = array('q')
+        view = memoryview(self.data)
+        for start, stop in ranges:
+            data.frombytes(view[start:stop].cast('B'))
+        view.release()
+        return RowIds(data)
+
+
+class TableSnapshot:
+    def __init__(self, table, columns, row_ids, row_count, version, next_id):
+        self.table = table
+        self.columns = columns
+        self.row_ids = row_ids
+        self.row_count = row_count
+        self.version = version
+        self.next_id = next_id
+
+    def __len__(self):
+        return self.row_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def column_info(self):
+        return [(column.name, column.type) for column in self.columns]
+
+    def iter_rows(self, start=0, stop=None):
+        return iter_column_rows(self.columns, self.row_count, start, stop)
+
+    # Snapshots never see deleted slots, so a row is stored at its position.
+    def slot(self, row_index):
+        return row_index
+
+    def release(self):
+        if self.columns is not None:
+            self.table.release_snapshot(self)
+            self.columns = None
+
+
+# Multi-version reads: a snapshot pins the columns it saw. Writers that are
+# about to change existing cells of a pinned column replace it with a private
+# copy, so the snapshot keeps the old version until it is released and the old
+# column is freed. Appends go straight into the live buffers, which is safe
+# because a snapshot never reads past its own row_count.
+#
+# Rows live in slots. Deleting a row only adds its slot to the sorted list of
+# dead slots, so no buffer moves; positions skip the dead slots, and a
+# position and a slot are turned into each other by binary search over that
+# list. The table is compacted once a quarter of its slots are dead, and
+# before a snapshot is taken, so snapshots and everything that reads them
+# only ever see live rows.
+class DynamicTable:
+    def __init__(self, column_info=()):
+        self.columns = []
+        self.row_count = 0
+        self.version = 0
+        self.snapshots = 0
+        self.indexes = {}
+        self.unique = None
+        self.row_ids = RowIds()
+        self.dead = []
+        self.next_id = 1
+        self.observer = None
+        self.lock = ReadWriteLock()
+        self.pin_lock = threading.Lock()
+        for column_name, column_type in column_info:
+            self.add_column(column_name, column_type)
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def column_info(self):
+        return [(column.name, column.type) for column in self.columns]
+
+    def column_index(self, column_name):
+        for i, column in enumerate(self.columns):
+            if column.name == column_name:
+                return i
+        raise ValueError(f'Column "{column_name}" does not exist')
+
+    # Readers holding the table's read lock may compact it here, so every
+    # reader that turns ids into positions does so under the pin lock.
+    def snapshot(self):
+        with self.pin_lock:
+            self._compact()
+            columns = tuple(self.columns)
+            for column in columns:
+                column.pins += 1
+            self.row_ids.pins += 1
+            self.snapshots += 1
+        return TableSnapshot(self, columns, self.row_ids, self.row_count, self.version, self.next_id)
+
+    def release_snapshot(self, snapshot):
+        with self.pin_lock:
+            for column in snapshot.columns:
+                column.pins -= 1
+            snapshot.row_ids.pins -= 1
+            self.snapshots -= 1
+
+    # Tells the observer, if any, about a change that has just been applied:
+    #   INSERT  (start, stop), the positions of the new rows
+    #   UPDATE  the position of a row whose cells changed
+    #   DELETE  the ids of the removed rows
+    #   SCHEMA  a column was added or deleted
+    def _changed(self, kind, argument=None):
+        if self.observer is not None:
+            self.observer(kind, argument)
+
+    @property
+    def slot_count(self):
+        return len(self.row_ids)
+
+    # The slot holding the row at a position: the position plus the number of
+    # dead slots before it. dead[i] - i, the live slots before dead slot i,
+    # never decreases, so that number is found by bisecting on it.
+    def slot(self, row_index):
+        dead = self.dead
+        low, high = 0, len(dead)
+        while low < high:
+            middle = (low + high) // 2
+            if dead[middle] - middle <= row_index:
+                low = middle + 1
+            else:
+                high = middle
+        return row_index + low
+
+    def row_id(self, row_index):
+        self.check_row(row_index)
+        return self.row_ids.data[self.slot(row_index)]
+
+    def position(self, row_id):
+        slot = bisect.bisect_left(self.row_ids.data, row_id, 0, self.slot_count)
+        if slot == self.slot_count or self.row_ids.data[slot] != row_id:
+            raise ValueError(f'Row id {row_id} does not exist')
+        dead_before = bisect.bisect_left(self.dead, slot)
+        if dead_before < len(self.dead) and self.dead[dead_before] == slot:
+            raise ValueError(f'Row id {row_id} does not exist')
+        return slot - dead_before
+
+    def positions(self, row_ids):
+        with self.pin_lock:
+            return [self.position(row_id) for row_id in row_ids]
+
+    # Drops the dead slots by building new buffers from the live ranges; the
+    # old ones stay with the snapshots pinning them. Positions do not change.
+    # Callers hold the write lock, or the pin lock under the read lock.
+    def _compact(self):
+        if not self.dead:
+            return
+        live, start = [], 0
+        for slot in self.dead:
+            if slot > start:
+                live.append((start, slot))
+            start = slot + 1
+        if start < self.slot_count:
+            live.append((start, self.slot_count))
+        self.columns = [column.take(live) for column in self.columns]
+        self.row_ids = self.row_ids.take(live)
+        self.dead = []
+
+    def compact(self):
+        with self.pin_lock:
+            self._compact()
+
+    def writable_row_ids(self):
+        with self.pin_lock:
+            if self.row_ids.pins or self.row_ids.mapped:
+                self.row_ids = self.row_ids.clone()
+            return self.row_ids
+
+    def appendable_row_ids(self):
+        return self.writable_row_ids() if self.row_ids.mapped else self.row_ids
+
+    def writable_column(self, index):
+        with self.pin_lock:
+            if self.columns[index].pins or self.columns[index].mapped:
+                self.columns[index] = self.columns[index].clone()
+            return self.columns[index]
+
+    def writable_columns(self):
+        return [self.writable_column(i) for i in range(len(self.columns))]
+
+    # Appends never touch rows a snapshot can see, so only mapped columns
+    # need a private copy first.
+    def appendable_columns(self):
+        return [self.writable_column(i) if column.mapped else column for i, column in enumerate(self.columns)]
+
+    def has_column(self, column_name):
+        return any(column.name == column_name for column in self.columns)
+
+    def add_column(self, column_name, column_type):
+        if self.has_column(column_name):
+            raise ValueError(f'Column "{column_name}" already exists')
+        self.columns.append(Column(column_name, column_type, self.slot_count))
+        self.version += 1
+        self._changed('SCHEMA')
+
+    def delete_column(self, column_name):
+        del self.columns[self.column_index(column_name)]
+        self.indexes.pop(column_name, None)
+        if self.unique is not None and column_name in self.unique.column_names:
+            self.unique = None
+        self.version += 1
+        self._changed('SCHEMA')
+
+    def create_index(self, column_name, kind):
+        if column_name in self.indexes:
+            raise ValueError(f'Column "{column_name}" is already indexed')
+        if kind not in INDEX_TYPES:
+            raise ValueError(f'Unknown index kind "{kind}"')
+        self.compact()
+        column = self.columns[self.column_index(column_name)]
+        self.indexes[column_name] = INDEX_TYPES[kind](self.row_ids.data, column.values(0, self.row_count))
+
+    def drop_index(self, column_name):
+        if self.indexes.pop(column_name, None) is None:
+            raise ValueError(f'Column "{column_name}" is not indexed')
+
+    def _indexed_values(self, slot):
+        return {column_name: self.columns[self.column_index(column_name)].get(slot) for column_name in self.indexes}
+
+    def set_unique(self, column_names, on_conflict):
+        self.compact()
+        column_indexes = [self.column_index(column_name) for column_name in column_names]
+        keys = iter_column_rows([self.columns[i] for i in column_indexes], self.row_count)
+        self.unique = UniqueConstraint(column_names, on_conflict, self.row_ids.data, keys)
+
+    def drop_unique(self):
+        if self.unique is None:
+            raise ValueError('The table has no unique constraint')
+        self.unique = None
+
+    def unique_key(self, values):
+        return tuple(values[self.column_index(column_name)] for column_name in self.unique.column_names)
+
+    # The position of the row that already holds the key of the given values,
+    # if any.
+    def conflicting_row(self, values):
+        if self.unique is None:
+            return None
+        row_id = self.unique.find(self.unique_key(values))
+        return self.position(row_id) if row_id is not None else None
+
+    def _check_unique(self, key, row_id=None):
+        existing = self.unique.find(key)
+        if existing is not None and existing != row_id:
+            raise UniqueViolation(f'Row id {existing} already has the key {key} of the unique constraint on {", ".join(self.unique.column_names)}')
+
+    # Returns the row a new row with these values should replace, or None if
+    # it is to be added. Raises in REJECT mode.
+    def _resolve_conflict(self, values):
+        if self.unique is None:
+            return None
+        if self.unique.on_conflict == 'REJECT':
+            self._check_unique(self.unique_key(values))
+        return self.conflicting_row(values)
+
+    # Adds a row with the next row id and returns its index, or, when the
+    # unique constraint replaces an existing row instead, the index of that row.
+    def add_row(self, values):
+        if len(values) != len(self.columns):
+            raise ValueError("Number of values must match the number of columns")
+        validated_values = [column.validate(value) for column, value in zip(self.columns, values)]
+        existing = self._resolve_conflict(validated_values)
+        if existing is not None:
+            self.replace_row(existing, validated_values)
+            return existing
+        slot = self.slot_count
+        for column, value in zip(self.appendable_columns(), validated_values):
+            column.append(value)
+        row_id = self.next_id
+        self.appendable_row_ids().data.append(row_id)
+        self.next_id += 1
+        for column_name, index in self.indexes.items():
+            index.add(row_id, self.columns[self.column_index(column_name)].get(slot))
+        if self.unique is not None:
+            self.unique.add(row_id, self.unique_key(validated_values))
+        self.row_count += 1
+        self.version += 1
+        self._changed('INSERT', (self.row_count - 1, self.row_count))
+        return self.row_count - 1
+
+    def extend_columns(self, columns):
+        if len(columns) != len(self.columns):
+            raise ValueError("Number of values must match the number of columns")
+        row_count = len(columns[0]) if columns else 0
+        if any(len(values) != row_count for values in columns):
+            raise ValueError("All columns must have the same number of values")
+        if self.unique is not None:
+            columns = self._merge_unique(columns)
+            row_count = len(columns[0]) if columns else 0
+        packed = [column.pack(values) for column, values in zip(self.columns, columns)]
+        slot = self.slot_count
+        for column, (data, flags) in zip(self.appendable_columns(), packed):
+            column.extend_packed(data, flags)
+        row_ids = range(self.next_id, self.next_id + row_count)
+        self.appendable_row_ids().data.extend(row_ids)
+        self.next_id += row_count
+        for column_name, index in self.indexes.items():
+            index.extend(row_ids, self.columns[self.column_index(column_name)].values(slot, slot + row_count))
+        if self.unique is not None:
+            key_columns = [columns[self.column_index(column_name)] for column_name in self.unique.column_names]
+            self.unique.extend(row_ids, zip(*key_columns))
+        self.row_count += row_count
+        self.version += 1
+        if row_count:
+            self._changed('INSERT', (self.row_count - row_count, self.row_count))
+
+    # Checks a batch against the unique constraint and returns the columns of
+    # the rows that still have to be appended. In REPLACE mode rows whose key
+    # is already in the table overwrite that row, and of several rows in the
+    # batch with the same key the last one wins. Every value is validated
+    # before anything changes, so a bad batch leaves the table untouched.
+    def _merge_unique(self, columns):
+        columns = [[column.validate(value) for value in values] for column, values in zip(self.columns, columns)]
+        key_columns = [columns[self.column_index(column_name)] for column_name in self.unique.column_names]
+        keys = list(zip(*key_columns)) if key_columns else []
+        if self.unique.on_conflict == 'REJECT':
+            seen = set()
+            for key in keys:
+                if None in key:
+                    continue
+                if key in seen:
+                    raise UniqueViolation(f'The batch has the key {key} of the unique constraint on {", ".join(self.unique.column_names)} more than once')
+                self._check_unique(key)
+                seen.add(key)
+            return columns
+        latest = {}
+        appended = []
+        for position, key in enumerate(keys):
+            if None in key:
+                appended.append(position)
+            else:
+                latest[key] = position
+        for key, position in latest.items():
+            existing = self.unique.find(key)
+            if existing is None:
+                appended.append(position)
+            else:
+                self.replace_row(self.position(existing), [values[position] for values in columns])
+        appended.sort()
+        return [[values[position] for position in appended] for values in columns]
+
+    # Puts a removed row back under its old id, at the position that id sorts
+    # to, which is where it was. Used to undo a delete.
+    def restore_row(self, row_id, values):
+        if len(values) != len(self.columns):
+            raise ValueError("Number of values must match the number of columns")
+        self.compact()
+        row_index = bisect.bisect_left(self.row_ids.data, row_id, 0, self.row_count)
+        if row_index < self.row_count and self.row_ids.data[row_index] == row_id:
+            raise ValueError(f'Row id {row_id} already exists')
+        validated_values = [column.validate(value) for column, value in zip(self.columns, values)]
+        if self.unique is not None:
+            self._check_unique(self.unique_key(validated_values))
+        for column, value in zip(self.writable_columns(), validated_values):
+            column.insert(row_index, value)
+        self.writable_row_ids().data.insert(row_index, row_id)
+        self.next_id = max(self.next_id, row_id + 1)
+        self.row_count += 1
+        for column_name, index in self.indexes.items():
+            index.add(row_id, validated_values[self.column_index(column_name)])
+        if self.unique is not None:
+            self.unique.add(row_id, self.unique_key(validated_values))
+        self.version += 1
+        self._changed('INSERT', (row_index, row_index + 1))
+        return row_index
+
+    def add_new_row(self):
+        return self.add_row([None] * len(self.columns))
+
+    def check_row(self, row_index):
+        if not (0 <= row_index < self.row_count):
+            raise ValueError("Invalid row index")
+
+    def remove_row(self, row_index):
+        self.check_row(row_index)
+        slot = self.slot(row_index)
+        row_id = self.row_ids.data[slot]
+        for column_name, value in self._indexed_values(slot).items():
+            self.indexes[column_name].remove(row_id, value)
+        if self.unique is not None:
+            self.unique.remove(row_id, self.unique_key(self._slot_values(slot)))
+        bisect.insort(self.dead, slot)
+        self.row_count -= 1
+        if len(self.dead) * 4 > self.slot_count:
+            self.compact()
+        self.version += 1
+        self._changed('DELETE', [row_id])
+
+    def get_cell(self, row_index, column_name):
+        self.check_row(row_index)
+        return self.columns[self.column_index(column_name)].get(self.slot(row_index))
+
+    # An edit that would duplicate another row's key is rejected whatever the
+    # constraint's conflict mode; only new rows are merged.
+    def set_cell(self, row_index, column_name, value):
+        self.check_row(row_index)
+        column_index = self.column_index(column_name)
+        value = self.columns[column_index].validate(value)
+        slot = self.slot(row_index)
+        if self.unique is not None and column_name in self.unique.column_names:
+            old_values = self._slot_values(slot)
+            new_values = list(old_values)
+            new_values[column_index] = value
+            self._update_unique(slot, self.unique_key(old_values), self.unique_key(new_values))
+        self._set_cell(slot, column_index, value)
+        self.version += 1
+        self._changed('UPDATE', row_index)
+
+    # Overwrites every cell of a row with already validated values.
+    def replace_row(self, row_index, values):
+        self.check_row(row_index)
+        slot = self.slot(row_index)
+        if self.unique is not None:
+            self._update_unique(slot, self.unique_key(self._slot_values(slot)), self.unique_key(values))
+        for column_index, value in enumerate(values):
+            self._set_cell(slot, column_index, value)
+        self.version += 1
+        self._changed('UPDATE', row_index)
+
+    def _update_unique(self, slot, old_key, new_key):
+        if old_key != new_key:
+            row_id = self.row_ids.data[slot]
+            self._check_unique(new_key, row_id)
+            self.unique.remove(row_id, old_key)
+            self.unique.add(row_id, new_key)
+
+    def _set_cell(self, slot, column_index, value):
+        index = self.indexes.get(self.columns[column_index].name)
+        if index is not None:
+            index.remove(self.row_ids.data[slot], self.columns[column_index].get(slot))
+        column = self.writable_column(column_index)
+        column.set(slot, value)
+        if column.dictionary_bloated():
+            column.rebuild_dictionary()
+        if index is not None:
+            index.add(self.row_ids.data[slot], self.columns[column_index].get(slot))
+
+    def row(self, row_index):
+        self.check_row(row_index)
+        slot = self.slot(row_index)
+        return {column.name: column.get(slot) for column in self.columns}
+
+    def _slot_values(self, slot):
+        return [column.get(slot) for column in self.columns]
+
+    def row_values(self, row_index):
+        self.check_row(row_index)
+        return self._slot_values(self.slot(row_index))
+
+    def iter_rows(self, start=0, stop=None):
+        self.compact()
+        return iter_column_rows(self.columns, self.row_count, start, stop)
+
+    # Keeps the first row of every group of rows that agree on the given
+    # columns (all of them by default) and returns how many were removed.
+    # Rows are compared on their raw buffers, strings by dictionary code, and
+    # unlike the unique constraint two nulls count as equal here.
+    def remove_duplicates(self, column_names=None):
+        self.compact()
+        if column_names:
+            key_columns = [self.columns[self.column_index(column_name)] for column_name in column_names]
+        else:
+            key_columns = self.columns
+        if not key_columns:
+            keys = [()] * self.row_count
+        else:
+            keys = zip(*(column.keys(0, self.row_count) for column in key_columns))
+        seen_keys = set()
+        keep = []
+        for i, key in enumerate(keys):
+            if key not in seen_keys:
+                seen_keys.add(key)
+                keep.append(i)
+        removed = self.row_count - len(keep)
+        if not removed:
+            return 0
+        kept = set(keep)
+        removed_ids = [row_id for i, row_id in enumerate(self.row_ids.data[:self.row_count]) if i not in kept]
+        keep = runs(keep)
+        with self.pin_lock:
+            self.columns = [column.take(keep) for column in self.columns]
+            self.row_ids = self.row_ids.take(keep)
+        self.row_count = self.slot_count
+        for column_name, index in self.indexes.items():
+            self.indexes[column_name] = type(index)(self.row_ids.data, self.columns[self.column_index(column_name)].values())
+        if self.unique is not None:
+            self.set_unique(self.unique.column_names, self.unique.on_conflict)
+        self.version += 1
+        self._changed('DELETE', removed_ids)
+        return removed
+
+    def nbytes(self):
+        return sum(column.nbytes() for column in self.columns)
@@ -0,0 +1,253 @@
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+import my_database_pb2
+from my_database_pb2 import DESCRIPTOR
+from checkpoint import load_tables, release, write_tables
+
+SERVICE = DESCRIPTOR.services_by_name['MyDatabaseService']
+REQUEST_TYPES = {method.name: getattr(my_database_pb2, method.input_type.name) for method in SERVICE.methods}
+
+SYNC_MODES = ('request', 'interval', 'off')
+
+# Every record is framed as payload length, crc32 of the payload and the
+# length of the method name, followed by the method name and the serialized
+# request. A torn or corrupt record ends the segment.
+HEADER = struct.Struct('<IIH')
+
+SEGMENT_PATTERN = re.compile(r'^wal-(\d{6})\.log$')
+CHECKPOINT_PATTERN = re.compile(r'^checkpoint-(\d{6})\.db$')
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, f'wal-{number:06d}.log')
+
+
+def checkpoint_path(directory, number):
+    return os.path.join(directory, f'checkpoint-{number:06d}.db')
+
+
+def numbered_files(directory, pattern):
+    numbers = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def encode_record(method, request):
+    name = method.encode('utf-8')
+    payload = name + request.SerializeToString()
+    return HEADER.pack(len(payload), zlib.crc32(payload), len(name)) + payload
+
+
+def read_records(path):
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc, name_length = HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            method = payload[:name_length].decode('utf-8')
+            yield method, REQUEST_TYPES[method].FromString(payload[name_length:])
+
+
+# Handed to the handlers while the log is replayed. Only requests that were
+# applied are journaled, so they apply again and any status is dropped.
+class ReplayContext:
+    def set_code(self, code):
+        pass
+
+    def set_details(self, details):
+        pass
+
+    def is_active(self):
+        return True
+
+
+def replay(service, path):
+    context = ReplayContext()
+    count = 0
+    for method, request in read_records(path):
+        getattr(service, method)(request, context)
+        count += 1
+    return count
+
+
+# Rebuilds the service from the newest checkpoint and the log segments written
+# after it, and returns how many bytes of log had to be replayed.
+def recover(service, directory):
+    checkpoints = numbered_files(directory, CHECKPOINT_PATTERN)
+    first_segment = checkpoints[-1] if checkpoints else 0
+    if checkpoints:
+        service.tables = load_tables(checkpoint_path(directory, first_segment))
+    replayed_bytes = 0
+    for number in numbered_files(directory, SEGMENT_PATTERN):
+        if number >= first_segment:
+            replay(service, segment_path(directory, number))
+            replayed_bytes += os.path.getsize(segment_path(directory, number))
+    return replayed_bytes
+
+
+# Checkpoint number N holds the state before segment N. It only appears under
+# its final name once it is complete, and the older ones are then deleted.
+# One that tables still read from, or that cannot be deleted yet, is tried
+# again after the next checkpoint; recovery only reads the newest.
+def write_checkpoint(directory, number, snapshots, sync=True):
+    path = checkpoint_path(directory, number)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        write_tables(file, snapshots)
+        file.flush()
+        if sync:
+            os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+    if sync:
+        fsync_directory(directory)
+    for old in numbered_files(directory, CHECKPOINT_PATTERN):
+        old_path = checkpoint_path(directory, old)
+        if old < number and release(old_path):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+# Append-only log split into numbered segments. Writers append while holding
+# the lock that orders their change and call commit() once they have let go
+# of it. Records reach the OS on commit; how they reach the disk depends on
+# sync_mode:
+#   request   commit() returns after an fsync that covers the record. Callers
+#             that arrive while an fsync is running are covered together by
+#             the next one (group commit).
+#   interval  a background thread fsyncs every sync_interval seconds, so a
+#             machine crash loses at most that window.
+#   off       never fsync; only a process crash is survived.
+class WriteAheadLog:
+    def __init__(self, directory, sync_mode='request', sync_interval=0.01):
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f'Unknown sync mode "{sync_mode}"')
+        self.directory = directory
+        self.sync_mode = sync_mode
+        self.sync_interval = sync_interval
+        self.condition = threading.Condition(threading.Lock())
+        self.local = threading.local()
+        self.written = 0
+        self.flushed = 0
+        self.synced = 0
+        self.syncing = False
+        self.closed = False
+        segments = numbered_files(directory, SEGMENT_PATTERN)
+        # A new process never appends to an old segment, whose tail may be torn.
+        self.segment = segments[-1] + 1 if segments else 1
+        self.segment_bytes = 0
+        self.file = open(segment_path(directory, self.segment), 'ab')
+        self.sync_thread = None
+        if sync_mode == 'interval':
+            self.sync_thread = threading.Thread(target=self._sync_periodically, daemon=True)
+            self.sync_thread.start()
+
+    def append(self, method, request):
+        record = encode_record(method, request)
+        with self.condition:
+            self.file.write(record)
+            self.written += len(record)
+            self.segment_bytes += len(record)
+            self.local.position = self.written
+
+    def commit(self):
+        position = getattr(self.local, 'position', 0)
+        if not position:
+            return
+        self.local.position = 0
+        with self.condition:
+            if self.flushed < position:
+                self._flush()
+            if self.sync_mode != 'request':
+                return
+            while self.synced < position:
+                if self.syncing:
+                    self.condition.wait()
+                else:
+                    self._sync()
+
+    # Closes the current segment and starts the next one. Everything up to the
+    # returned segment number is on disk when this returns.
+    def rotate(self):
+        with self.condition:
+            while self.syncing:
+                self.condition.wait()
+            self._flush()
+            if self.sync_mode != 'off':
+                os.fsync(self.file.fileno())
+            self.synced = self.written
+            self.file.close()
+            self.segment += 1
+            self.segment_bytes = 0
+            self.file = open(segment_path(self.directory, self.segment), 'ab')
+            self.condition.notify_all()
+            return self.segment
+
+    def remove_segments(self, before):
+        for number in numbered_files(self.directory, SEGMENT_PATTERN):
+            if number < before:
+                os.remove(segment_path(self.directory, number))
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            while self.syncing:
+                self.condition.wait()
+            self._flush()
+            if self.sync_mode != 'off':
+                os.fsync(self.file.fileno())
+            self.file.close()
+        if self.sync_thread is not None:
+            self.sync_thread.join()
+
+    # The helpers below are called with the condition held. _sync lets go of
+    # it for the fsync itself so writers can keep appending meanwhile.
+    def _flush(self):
+        self.file.flush()
+        self.flushed = self.written
+
+    def _sync(self):
+        self.syncing = True
+        self._flush()
+        target, fd = self.flushed, self.file.fileno()
+        self.condition.release()
+        try:
+            os.fsync(fd)
+        finally:
+            self.condition.acquire()
+            self.syncing = False
+            self.condition.notify_all()
+        self.synced = max(self.synced, target)
+
+    def _sync_periodically(self):
+        next_sync = time.monotonic() + self.sync_interval
+        with self.condition:
+            while not self.closed:
+                remaining = next_sync - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                next_sync = time.monotonic() + self.sync_interval
+                if not self.syncing and self.synced < self.written:
+                    self._sync()
@@ -0,0 +1,109 @@
+import grpc
+
+ALGORITHMS = {
+    'none': grpc.Compression.NoCompression,
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate,
+}
+# Responses smaller than this are sent as they are: compressing them saves
+# few bytes and costs the same fixed overhead on both ends.
+DEFAULT_COMPRESS_ABOVE_BYTES = 32 << 10
+
+
+# Compresses the responses that serialize to at least threshold bytes with
+# algorithm, and sends the rest uncompressed. The decision needs the
+# serialized size, so the interceptor serializes responses itself and hands
+# gRPC the bytes. A unary call is compressed as a whole; a stream announces
+# the algorithm up front and then sends each small message uncompressed.
+# Every gRPC client accepts gzip and deflate, so nothing has to be agreed on
+# beyond the grpc-encoding header gRPC sends.
+def compressed(algorithm, threshold, handler):
+    serialize = handler.response_serializer or passthrough
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        def behavior(request, context):
+            context.set_compression(algorithm)
+            for response in inner(request, context):
+                data = serialize(response)
+                if len(data) < threshold:
+                    context.disable_next_message_compression()
+                yield data
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        def behavior(request, context):
+            data = serialize(inner(request, context))
+            if len(data) >= threshold:
+                context.set_compression(algorithm)
+            return data
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, response_serializer=passthrough)
+
+
+# The aio server ignores set_compression, so there the algorithm is the
+# server's default (see server_compression) and small messages are sent
+# uncompressed instead.
+def compressed_async(threshold, handler):
+    serialize = handler.response_serializer or passthrough
+    if handler.response_streaming:
+        inner = handler.unary_stream or handler.stream_stream
+
+        async def behavior(request, context):
+            async for response in inner(request, context):
+                data = serialize(response)
+                if len(data) < threshold:
+                    context.disable_next_message_compression()
+                yield data
+    else:
+        inner = handler.unary_unary or handler.stream_unary
+
+        async def behavior(request, context):
+            data = serialize(await inner(request, context))
+            if len(data) < threshold:
+                context.disable_next_message_compression()
+            return data
+
+    kind = ('stream' if handler.request_streaming else 'unary') + '_' + ('stream' if handler.response_streaming else 'unary')
+    return handler._replace(**{kind: behavior}, response_serializer=passthrough)
+
+
+def server_compression(algorithm):
+    return ALGORITHMS[algorithm]
+
+
+def passthrough(data):
+    return data
+
+
+class CompressionInterceptor(grpc.ServerInterceptor):
+    def __init__(self, algorithm, threshold=DEFAULT_COMPRESS_ABOVE_BYTES):
+        self.algorithm = ALGORITHMS[algorithm]
+        self.threshold = threshold
+        self.handlers = {}
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, compressed(self.algorithm, self.threshold, handler))
+        return cached[1]
+
+
+# Needs a server created with compression=server_compression(algorithm).
+class AsyncCompressionInterceptor(grpc.aio.ServerInterceptor):
+    def __init__(self, threshold=DEFAULT_COMPRESS_ABOVE_BYTES):
+        self.threshold = threshold
+        self.handlers = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        cached = self.handlers.get(handler_call_details.method)
+        if cached is None or cached[0] is not handler:
+            cached = self.handlers[handler_call_details.method] = (handler, compressed_async(self.threshold, handler))
+        return cached[1]